@@ -1994,6 +1994,10 @@ def configure_gitignore(project_root):
         '',
         '# cc-sessions runtime files',
         'sessions/sessions-state.json',
+        'sessions/sessions-state.history.jsonl',
+        'sessions/perf/',
+        'sessions/cache/',
+        'sessions/logs/',
         'sessions/transcripts/',
         'sessions/.archived/',
         ''
@@ -44,7 +44,11 @@ def main():
     parser.add_argument('--json', action='store_true', help='Output in JSON format')
     parser.add_argument('--from-slash', action='store_true', help='Indicates call from slash command')
 
-    args = parser.parse_args()
+    args, passthrough = parser.parse_known_args()
+    if passthrough:
+        # Subcommand options (e.g. policy check --batch FILE) stay in place among the arguments
+        positional = [a for a in sys.argv[1:] if a not in ('--json', '--from-slash')]
+        args.command, args.args = positional[0], positional[1:]
 
     try:
         result = route_command(args.command, args.args, json_output=args.json, from_slash=args.from_slash)
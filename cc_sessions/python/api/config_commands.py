@@ -4,6 +4,7 @@
 
 ## ===== STDLIB ===== ##
 from typing import Any, List, Optional, Dict
+from dataclasses import asdict
 import json
 ##-##
 
@@ -12,6 +13,7 @@ import json
 
 ## ===== LOCAL ===== ##
 from hooks.shared_state import load_config, edit_config, TriggerCategory, GitAddPattern, GitCommitStyle, UserOS, UserShell, CCTools, IconStyle
+from hooks.statusline_cache import BUILTIN_SEGMENTS, DEFAULT_LAYOUT
 ##-##
 
 #-#
@@ -40,6 +42,8 @@ def handle_config_command(args: List[str], json_output: bool = False, from_slash
         config git <operation>          - Manage git preferences
         config env <operation>          - Manage environment settings
         config features <operation>     - Manage feature toggles
+        config statusline <operation>   - Manage statusline settings
+        config snapshots <operation>    - Manage subagent snapshot pruning
         config validate                 - Validate configuration
     """
     # Handle no args and help
@@ -65,13 +69,15 @@ def handle_config_command(args: List[str], json_output: bool = False, from_slash
     elif section == 'git': return handle_git_command(section_args, json_output, from_slash)
     elif section == 'env': return handle_env_command(section_args, json_output, from_slash)
     elif section == 'features': return handle_features_command(section_args, json_output, from_slash)
+    elif section == 'statusline': return handle_statusline_command(section_args, json_output, from_slash)
+    elif section == 'snapshots': return handle_snapshots_command(section_args, json_output, from_slash)
     elif section == 'read': return handle_read_command(section_args, json_output, from_slash)
     elif section == 'write': return handle_write_command(section_args, json_output, from_slash)
     elif section == 'tools': return handle_tools_command(section_args, json_output, from_slash)
     elif section == 'validate': return validate_config(json_output)
     else:
         if from_slash: return f"Unknown command: {section}\n\n{format_config_help()}"
-        raise ValueError(f"Unknown config section: {section}. Valid sections: phrases, git, env, features, readonly, validate")
+        raise ValueError(f"Unknown config section: {section}. Valid sections: phrases, git, env, features, statusline, snapshots, readonly, validate")
 
 def format_config_help() -> str:
     """Format help output for slash command."""
@@ -81,6 +87,8 @@ def format_config_help() -> str:
                 "  /sessions config git ...        - Manage git preferences",
                 "  /sessions config env ...        - Manage environment settings",
                 "  /sessions config features ...   - Manage feature toggles",
+                "  /sessions config statusline ... - Manage statusline settings",
+                "  /sessions config snapshots ...  - Manage subagent snapshot pruning",
                 "  /sessions config read ...       - Manage bash read patterns",
                 "  /sessions config write ...      - Manage bash write patterns",
                 "  /sessions config tools ...      - Manage blocked tools", "",
@@ -115,7 +123,16 @@ def format_config_human(config) -> str:
                             f"  Auto Ultrathink: {config.features.auto_ultrathink}",
                             f"  Icon Style: {get_value(config.features.icon_style)}",
                             f"  Context Warnings (85%): {config.features.context_warnings.warn_85}",
-                            f"  Context Warnings (90%): {config.features.context_warnings.warn_90}", ])
+                            f"  Context Warnings (90%): {config.features.context_warnings.warn_90}", "",
+                        "Statusline:",
+                            f"  Cache TTL: {config.statusline.cache_ttl}s",
+                            f"  Render Deadline: {config.statusline.render_deadline_ms}ms",
+                            f"  Latency Warning: {config.statusline.latency_warn_ms}ms", "",
+                        "Subagent Snapshots:",
+                            f"  Prune: {config.snapshots.prune}",
+                            f"  Tool Result Max: {config.snapshots.tool_result_max_chars} chars (excerpts: {config.snapshots.excerpt_chars})",
+                            f"  Dedupe Reads: {config.snapshots.dedupe_reads}",
+                            f"  Collapse Failures: {config.snapshots.collapse_failures}", ])
 
     return "\n".join(lines)
 #!<
@@ -707,6 +724,189 @@ def format_features_help() -> str:
     return "\n".join(lines)
 #!<
 
+#!> Statusline settings handlers
+def handle_statusline_command(args: List[str], json_output: bool = False, from_slash: bool = False) -> Any:
+    """
+    Handle statusline settings commands.
+
+    Usage:
+        config statusline show
+        config statusline set <key> <value>
+        config statusline segments
+        config statusline layout ["<seg> <seg>" "<seg> ..." | reset]
+        config statusline custom add <name> <command> [input=<path> ...] [ttl=<seconds>]
+        config statusline custom remove <name>
+    """
+    if not args or args[0].lower() == 'show':
+        settings = load_config().statusline
+        if json_output: return {"statusline": asdict(settings)}
+        lines = ["Statusline Settings:", f"  cache_ttl: {settings.cache_ttl}", f"  render_deadline_ms: {settings.render_deadline_ms}",
+                 f"  latency_warn_ms: {settings.latency_warn_ms}", "  layout:"]
+        lines.extend(f"    {' | '.join(line)}" for line in settings.layout)
+        if settings.custom_segments:
+            lines.append("  custom_segments:")
+            lines.extend(f"    {name}: {spec.get('command', '')}" for name, spec in settings.custom_segments.items())
+        return "\n".join(lines)
+
+    if args[0].lower() == 'help': return format_statusline_help()
+
+    action = args[0].lower()
+    if action == 'set':
+        if len(args) < 3: raise ValueError("Usage: config statusline set <key> <value>")
+        key, value = args[1].lower(), args[2]
+        if key == 'cache_ttl':
+            try: final_value = float(value)
+            except ValueError: raise ValueError(f"Invalid cache_ttl value: {value}. Use a number of seconds (0 disables the cache)")
+        elif key == 'render_deadline_ms':
+            try: final_value = int(value)
+            except ValueError: raise ValueError(f"Invalid render_deadline_ms value: {value}. Use a whole number of milliseconds (0 waits for every segment)")
+        elif key == 'latency_warn_ms':
+            try: final_value = int(value)
+            except ValueError: raise ValueError(f"Invalid latency_warn_ms value: {value}. Use a whole number of milliseconds")
+        else: raise ValueError(f"Unknown statusline setting: {key}. Valid settings: cache_ttl, render_deadline_ms, latency_warn_ms")
+        if final_value < 0: raise ValueError(f"{key} cannot be negative")
+
+        with edit_config() as config: setattr(config.statusline, key, final_value)
+
+        if json_output: return {"updated": key, "value": final_value}
+        return f"Updated statusline.{key} to {final_value}"
+
+    if action == 'segments':
+        custom = load_config().statusline.custom_segments
+        if json_output: return {"builtin": BUILTIN_SEGMENTS, "custom": custom}
+        lines = ["Built-in Segments:"] + [f"  {name:<12} - {desc}" for name, desc in BUILTIN_SEGMENTS.items()]
+        if custom: lines += ["", "Custom Segments:"] + [f"  {name:<12} - {spec.get('command', '')}" for name, spec in custom.items()]
+        return "\n".join(lines)
+
+    if action == 'layout':
+        if len(args) == 1: return handle_statusline_command(['show'], json_output, from_slash)
+        if args[1].lower() == 'reset': layout = [list(line) for line in DEFAULT_LAYOUT]
+        else: layout = [line for line in ([n for n in arg.replace(",", " ").split() if n] for arg in args[1:]) if line]
+        with edit_config() as config:
+            known = set(BUILTIN_SEGMENTS) | set(config.statusline.custom_segments)
+            unknown = [name for line in layout for name in line if name not in known]
+            if unknown: raise ValueError(f"Unknown statusline segment(s): {', '.join(unknown)}. Available: {', '.join(sorted(known))}")
+            config.statusline.layout = layout
+        if json_output: return {"layout": layout}
+        return "Updated statusline layout:\n" + "\n".join(f"  {' | '.join(line)}" for line in layout)
+
+    if action == 'custom':
+        sub = args[1].lower() if len(args) > 1 else ''
+        # Custom segments run shell commands on every render, outside the hooks: only the user may change them
+        if sub in ('add', 'remove') and not from_slash:
+            raise ValueError("Cannot change custom statusline segments via API. Use the /sessions slash command instead: /sessions config statusline custom ...")
+        if sub == 'add':
+            if len(args) < 4: raise ValueError("Usage: config statusline custom add <name> <command> [input=<path> ...] [ttl=<seconds>]")
+            name, spec = args[2], {"command": args[3], "inputs": []}
+            if name in BUILTIN_SEGMENTS: raise ValueError(f"'{name}' is a built-in segment")
+            for option in args[4:]:
+                key, sep, value = option.partition("=")
+                if not sep or key not in ('input', 'ttl'): raise ValueError(f"Unknown option: {option}. Use input=<path> or ttl=<seconds>")
+                if key == 'input': spec["inputs"].append(value)
+                else:
+                    try: spec["ttl"] = float(value)
+                    except ValueError: raise ValueError(f"Invalid ttl value: {value}")
+            with edit_config() as config: config.statusline.custom_segments[name] = spec
+            if json_output: return {"added": name, "segment": spec}
+            return f"Added custom segment '{name}'. Add it to the layout with: config statusline layout ..."
+        if sub == 'remove':
+            if len(args) < 3: raise ValueError("Usage: config statusline custom remove <name>")
+            name = args[2]
+            with edit_config() as config:
+                if config.statusline.custom_segments.pop(name, None) is None: raise ValueError(f"No custom segment named '{name}'")
+                config.statusline.layout = [line for line in ([n for n in line if n != name] for line in config.statusline.layout) if line]
+            if json_output: return {"removed": name}
+            return f"Removed custom segment '{name}' (and its layout entries)"
+        raise ValueError("Usage: config statusline custom <add|remove> ...")
+
+    if from_slash: return f"Unknown statusline action: {action}\n\n{format_statusline_help()}"
+    raise ValueError(f"Unknown statusline action: {action}. Valid actions: show, set, segments, layout, custom")
+
+def format_statusline_help() -> str:
+    """Format statusline help for slash command."""
+    lines = [
+        "Statusline Settings Commands:",
+        "",
+        "  /sessions config statusline show              - Display statusline settings",
+        "  /sessions config statusline set <key> <value> - Set a statusline setting",
+        "  /sessions config statusline segments          - List built-in and custom segments",
+        "  /sessions config statusline layout <line> ... - Set lines of segments (each line one argument)",
+        "  /sessions config statusline layout reset      - Restore the default layout",
+        "  /sessions config statusline custom add <name> <command> [input=<path> ...] [ttl=<seconds>]",
+        "  /sessions config statusline custom remove <name>",
+        "",
+        "Available Settings:",
+        "  cache_ttl           - Max seconds a cached statusline segment is reused (default: 5, 0 disables the cache)",
+        "  render_deadline_ms  - Segments still computing after this are shown stale (default: 500, 0 waits for all)",
+        "  latency_warn_ms     - Latency segment warns when an enforcement/post-tool hook's p95 exceeds this (default: 250)",
+        "",
+        "Examples:",
+        "  /sessions config statusline set cache_ttl 10",
+        "  /sessions config statusline set render_deadline_ms 200",
+        "  /sessions config statusline layout \"context task\" \"mode edited branch\"",
+        "  /sessions config statusline custom add tests 'cat .test-status' input=.test-status ttl=0",
+    ]
+    return "\n".join(lines)
+#!<
+
+#!> Snapshot settings handlers
+def handle_snapshots_command(args: List[str], json_output: bool = False, from_slash: bool = False) -> Any:
+    """
+    Handle subagent snapshot settings commands.
+
+    Usage:
+        config snapshots show
+        config snapshots set <key> <value>
+    """
+    if not args or args[0].lower() == 'show':
+        settings = load_config().snapshots
+        if json_output: return {"snapshots": asdict(settings)}
+        return "\n".join(["Subagent Snapshot Settings:"] + [f"  {key}: {value}" for key, value in asdict(settings).items()])
+
+    if args[0].lower() == 'help': return format_snapshots_help()
+
+    action = args[0].lower()
+    if action == 'set':
+        if len(args) < 3: raise ValueError("Usage: config snapshots set <key> <value>")
+        key, value = args[1].lower(), args[2]
+        if key in ['prune', 'dedupe_reads', 'collapse_failures']:
+            final_value = value.lower() in ['true', '1', 'yes', 'on']
+        elif key in ['tool_result_max_chars', 'excerpt_chars']:
+            try: final_value = int(value)
+            except ValueError: raise ValueError(f"Invalid {key} value: {value}. Use a whole number of characters")
+            if final_value < 0: raise ValueError(f"{key} cannot be negative")
+        else: raise ValueError(f"Unknown snapshots setting: {key}. Valid settings: prune, tool_result_max_chars, excerpt_chars, dedupe_reads, collapse_failures")
+
+        with edit_config() as config: setattr(config.snapshots, key, final_value)
+
+        if json_output: return {"updated": key, "value": final_value}
+        return f"Updated snapshots.{key} to {final_value}"
+
+    if from_slash: return f"Unknown snapshots action: {action}\n\n{format_snapshots_help()}"
+    raise ValueError(f"Unknown snapshots action: {action}. Valid actions: show, set")
+
+def format_snapshots_help() -> str:
+    """Format snapshots help for slash command."""
+    lines = [
+        "Subagent Snapshot Commands:",
+        "",
+        "  /sessions config snapshots show              - Display snapshot pruning settings",
+        "  /sessions config snapshots set <key> <value> - Set a snapshot setting",
+        "",
+        "Available Settings:",
+        "  prune                  - Prune tool output in subagent snapshots at all (default: true)",
+        "  tool_result_max_chars  - Longer tool results keep only head and tail excerpts (default: 6000, 0 never truncates)",
+        "  excerpt_chars          - Characters kept at each end of a truncated result (default: 1500)",
+        "  dedupe_reads           - Replace repeated identical reads of a file with a marker (default: true)",
+        "  collapse_failures      - Replace a failure repeating the command's previous output with a marker (default: true)",
+        "",
+        "Examples:",
+        "  /sessions config snapshots set tool_result_max_chars 12000",
+        "  /sessions config snapshots set prune false",
+    ]
+    return "\n".join(lines)
+#!<
+
 #!> Bash read patterns handlers
 def handle_read_command(args: List[str], json_output: bool = False, from_slash: bool = False) -> Any:
     """
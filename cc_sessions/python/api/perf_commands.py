@@ -0,0 +1,1138 @@
+#!/usr/bin/env python3
+
+# ===== IMPORTS ===== #
+
+## ===== STDLIB ===== ##
+from typing import Any, List, Dict
+from contextlib import suppress
+from datetime import datetime, timezone
+from pathlib import Path
+import json, os, re, sys, time, shlex, shutil, tempfile, subprocess, platform, tracemalloc
+##-##
+
+## ===== 3RD-PARTY ===== ##
+##-##
+
+## ===== LOCAL ===== ##
+from hooks.shared_state import PROJECT_ROOT, BASH_VERDICT_CACHE_FILE, EVENT_LOG_FILE, STATUSLINE_CACHE_FILE, HOOK_LATENCY_DIR, Model, load_config, load_state, session_model_file, snapshot_store
+from hooks.event_log import EventLog
+from hooks.transcript_reader import latest_usage, context_tokens, project_transcript_dir
+from hooks.transcript_index import index_transcript, calls_edit_tool
+from hooks.transcript_chunks import chunk_text, chunk_by_tokens, SNAPSHOT_CHUNK_BYTES, SNAPSHOT_CHUNK_TOKENS
+from hooks.snapshot_store import SnapshotStore
+from hooks.snapshot_stream import snapshot_groups
+from hooks.cache_analytics import scan_cache_usage
+from hooks.hook_timing import latency_summary
+from hooks.git_meta import git_status
+from hooks.bash_classifier import BashClassifier, VerdictCache, READONLY_COMMANDS, WRITE_COMMANDS
+from api.policy_commands import CHECK_DEFAULTS, run_batch_check
+##-##
+
+#-#
+
+# ===== GLOBALS ===== #
+HOOKS_DIR = Path(__file__).resolve().parent.parent / "hooks"
+STATUSLINE_SCRIPT = HOOKS_DIR.parent / "statusline.py"
+PERF_DIR = PROJECT_ROOT / "sessions" / "perf"
+BENCH_RESULTS_FILE = PERF_DIR / "bench.jsonl"
+
+# Lines _lock() prints to stderr when it takes a lock it does not own
+FORCED_LOCK_MARKERS = ("Force-removing lock", "Removing stale lock", "Removing lock from dead process", "Removing malformed lock")
+
+# Worker run in a fresh interpreter per process, same as a hook invocation.
+# argv: hooks_dir role worker_id ops go_file
+LOCK_WORKER = r'''
+import json, os, sys, time
+sys.path.insert(0, sys.argv[1])
+from shared_state import edit_state, load_state
+role, wid, ops, go = sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5]
+while not os.path.exists(go): time.sleep(0.0005)
+waits, errors = [], 0
+start = time.perf_counter()
+for _ in range(ops):
+    t0 = time.perf_counter()
+    try:
+        if role == "writer":
+            with edit_state() as s:
+                waits.append(time.perf_counter() - t0)
+                s.metadata["bench_counter"] = s.metadata.get("bench_counter", 0) + 1
+                s.flags.subagent = not s.flags.subagent
+        else:
+            load_state()
+            waits.append(time.perf_counter() - t0)
+    except Exception as e:
+        errors += 1
+        print(f"worker error: {e!r}", file=sys.stderr)
+print(json.dumps({"role": role, "ops": ops, "waits": waits, "errors": errors, "elapsed": time.perf_counter() - start}))
+'''
+
+# State write worker: `ops` edit_state() calls that change the state, then `ops` that do not,
+# without revision history (the write alone) and with it. argv: hooks_dir ops
+STATE_WORKER = r'''
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import shared_state
+from shared_state import edit_state
+ops, results = int(sys.argv[2]), {}
+record_delta = shared_state._record_state_delta
+revisions = lambda: len(shared_state.read_state_history())
+for history in (False, True):
+    shared_state._record_state_delta = record_delta if history else (lambda *a, **k: None)
+    for kind in ("change", "noop"):
+        times, before = [], revisions()
+        for i in range(ops):
+            t0 = time.perf_counter()
+            with edit_state() as s:
+                if kind == "change": s.metadata["bench_counter"] = s.metadata.get("bench_counter", 0) + 1
+            times.append(time.perf_counter() - t0)
+        results[f"{kind}_{'history' if history else 'plain'}"] = times
+        if history and kind == "noop": results["noop_recorded"] = revisions() - before
+print(json.dumps(results))
+'''
+
+# Built-in corpus for the bash classifier benchmark: the shapes agents send in discussion mode
+BASH_CORPUS = [
+    "ls -la", "pwd", "git status", "git log --oneline -20", "git diff HEAD~1 -- src/",
+    "cat README.md", "head -n 50 src/main.py", "tail -f logs/app.log", "wc -l src/*.py",
+    "grep -rn 'def main' src/", "rg -n \"TODO|FIXME\" --type py", "find . -name '*.py' -not -path './venv/*'",
+    "find . -name '*.pyc' -delete", "find . -type f -exec grep -l foo {} +", "find . -name '*.orig' -exec rm {} \\;",
+    "cat package.json | jq '.dependencies'", "ps aux | grep python | head", "du -sh * | sort -h",
+    "ls -la && cat setup.py", "cd src && grep -r import . | sort | uniq -c", "cd /tmp || exit 1",
+    "echo $PATH", "echo \"$(date)\"", "echo $(rm -rf build)", "echo `touch marker`",
+    "ls > files.txt", "echo hello >> notes.md", "cat file.txt 2>&1", "ls 2>/dev/null", "echo hi >out.txt",
+    "cat <<EOF\nrm -rf /\nEOF", "cat > config.yml << 'EOF'\nkey: value\nEOF", "sort < input.txt",
+    "rm -rf node_modules", "mkdir -p build/out", "touch src/__init__.py", "mv a.txt b.txt", "cp -r src dst",
+    "sed -n '1,20p' file.py", "sed -i 's/foo/bar/g' file.py", "awk '{print $1}' data.csv", "awk '{print > \"out.txt\"}' data",
+    "pip list", "pip install requests", "npm ls", "npm install", "python -c 'import sys; print(sys.version)'",
+    "python -m pytest -q", "python script.py", "make test", "sudo apt-get update",
+    "FOO=1 rm -rf dist", "env rm -rf dist", "timeout 10 rm -rf dist", "/bin/rm -f x",
+    "bash -c 'rm -rf build'", "sh -c 'ls -la'", "(cd build && rm -rf *)", "{ ls; touch x; }",
+    "for f in *.py; do wc -l \"$f\"; done", "for f in $(ls *.log); do rm \"$f\"; done",
+    "if [ -f setup.py ]; then cat setup.py; fi", "while read l; do echo \"$l\"; done < list.txt",
+    "diff <(ls a) <(ls b)", "ls | tee listing.txt", "git ls-files | xargs grep -n foo", "find . -name '*.tmp' | xargs rm",
+    "grep \"a|b\" file.txt", "grep 'x && y' file.txt", "echo 'unterminated", "ls; rm -rf tmp", "sleep 1 & rm lock",
+    "x=$(touch created)", "git branch --show-current", "git commit -am 'wip'", "docker ps", "kubectl get pods",
+    "ls\xa0-la", "ls\x0b-la", "ls\x0c-la", "ls\u2003-la", "rm\xa0-rf build", "cat a.txt\xa0| grep x",
+    "echo ${HOME}", "echo ${x:-default}", "echo ${x:-$(rm y)}", "echo \"${x:-`touch y`}\"",
+]
+
+# Commands the parser must never classify as read-only (substitutions hidden in words, parameter expansions, ...)
+BASH_WRITE_CHECKS = [
+    "echo $(rm -rf build)", "echo `touch marker`", "echo \"$(rm y)\"", "diff <(rm a) b", "x=$(touch created)",
+    "echo ${x:-$(rm y)}", "echo \"${x:-$(rm y)}\"", "echo ${x:-`touch y`}", "echo ${x:=$(touch y)}",
+    "echo ${x:-${y:-$(rm z)}}", "cat ${f:-<(rm y)}", "echo ${x/a/$(rm y)}",
+]
+#-#
+
+"""
+╔══════════════════════════════════════╗
+║     ██╗██████╗ ██████╗█████╗ ██████╗ ║
+║    ██╔╝██╔══██╗██╔═══╝██╔═██╗██╔═══╝ ║
+║   ██╔╝ ██████╔╝█████╗ █████╔╝█████╗  ║
+║  ██╔╝  ██╔═══╝ ██╔══╝ ██╔═██╗██╔══╝  ║
+║ ██╔╝   ██║     ██████╗██║ ██║██║     ║
+║ ╚═╝    ╚═╝     ╚═════╝╚═╝ ╚═╝╚═╝     ║
+╚══════════════════════════════════════╝
+Performance benchmarks and reports
+"""
+
+# ===== FUNCTIONS ===== #
+
+# Event log writer: `runs` simulated hook runs, each emitting `events` events then flushing.
+# argv: hooks_dir log_path runs events max_bytes go_file
+EVENT_WORKER = r'''
+import json, os, sys, time
+sys.path.insert(0, sys.argv[1])
+from event_log import EventLog
+path, runs, events, max_bytes, go = sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]), sys.argv[6]
+while not os.path.exists(go): time.sleep(0.0005)
+for run in range(runs):
+    log = EventLog(path, max_bytes=max_bytes)
+    for i in range(events): log.emit("enforce", tool="Edit", verdict="allow", reason="bench", run=run, i=i)
+    log.flush()
+'''
+
+#!> Helpers
+def parse_bench_params(args: List[str], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse key=value arguments against a dict of typed defaults."""
+    params = dict(defaults)
+    for arg in args:
+        if arg == '--from-slash': continue
+        if '=' not in arg: raise ValueError(f"Expected key=value, got: {arg}")
+        key, value = arg.split('=', 1)
+        if key not in defaults: raise ValueError(f"Unknown parameter: {key}. Valid: {', '.join(defaults)}")
+        try: params[key] = type(defaults[key])(value)
+        except ValueError: raise ValueError(f"Invalid value for {key}: {value}")
+    return params
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values: return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+def make_temp_project() -> Path:
+    """Create a throwaway project root (with .claude and sessions/) for benchmarks."""
+    root = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    (root / ".claude").mkdir()
+    (root / "sessions").mkdir()
+    return root
+
+def record_bench_result(suite: str, params: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+    """Append a benchmark result to sessions/perf/bench.jsonl and return the record."""
+    record = {
+        "suite": suite,
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results,
+    }
+    PERF_DIR.mkdir(parents=True, exist_ok=True)
+    with BENCH_RESULTS_FILE.open("a", encoding="utf-8") as f: f.write(json.dumps(record) + "\n")
+    return record
+#!<
+
+#!> Lock contention benchmark
+def bench_locks(writers: int = 4, readers: int = 4, ops: int = 50) -> Dict[str, Any]:
+    """
+    Fork writer and reader processes against one temp project, the way hooks and
+    the statusline hit sessions-state.json together around a Task call.
+
+    Writers increment a shared counter inside edit_state(); readers call load_state().
+    Lost updates = writes that entered the lock - final counter (a forced lock removal
+    lets two writers read-modify-write the same state).
+    """
+    root = make_temp_project()
+    go_file = root / "go"
+    env = dict(os.environ, CLAUDE_PROJECT_DIR=str(root))
+    env.pop("CI", None)
+    try:
+        procs = []
+        for role, count in (("writer", writers), ("reader", readers)):
+            for i in range(count):
+                procs.append(subprocess.Popen(
+                    [sys.executable, "-c", LOCK_WORKER, str(HOOKS_DIR), role, f"{role[0]}{i}", str(ops), str(go_file)],
+                    env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True))
+        time.sleep(0.3)  # let interpreters finish importing before the start gun
+        start = time.perf_counter()
+        go_file.touch()
+
+        outputs = [p.communicate() for p in procs]
+        wall = time.perf_counter() - start
+
+        write_waits: List[float] = []
+        read_waits: List[float] = []
+        elapsed = {"writer": 0.0, "reader": 0.0}
+        errors = forced = 0
+        for stdout, stderr in outputs:
+            forced += sum(stderr.count(marker) for marker in FORCED_LOCK_MARKERS)
+            line = stdout.strip().splitlines()[-1] if stdout.strip() else ""
+            if not line: errors += ops; continue
+            result = json.loads(line)
+            errors += result["errors"]
+            elapsed[result["role"]] = max(elapsed[result["role"]], result["elapsed"])
+            (write_waits if result["role"] == "writer" else read_waits).extend(result["waits"])
+
+        final = json.loads((root / "sessions" / "sessions-state.json").read_text(encoding="utf-8"))
+        counter = final.get("metadata", {}).get("bench_counter", 0)
+        return {
+            "wall_s": round(wall, 4),
+            "write_ops": len(write_waits),
+            "read_ops": len(read_waits),
+            "write_throughput_ops_s": round(len(write_waits) / elapsed["writer"], 1) if elapsed["writer"] else 0.0,
+            "read_throughput_ops_s": round(len(read_waits) / elapsed["reader"], 1) if elapsed["reader"] else 0.0,
+            "lock_wait_p50_ms": round(percentile(write_waits, 50) * 1000, 3),
+            "lock_wait_p99_ms": round(percentile(write_waits, 99) * 1000, 3),
+            "lock_wait_max_ms": round(max(write_waits, default=0.0) * 1000, 3),
+            "read_p50_ms": round(percentile(read_waits, 50) * 1000, 3),
+            "read_p99_ms": round(percentile(read_waits, 99) * 1000, 3),
+            "forced_lock_removals": forced,
+            "lost_updates": len(write_waits) - counter,
+            "errors": errors,
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+#!<
+
+#!> State write benchmark
+def bench_state(ops: int = 200) -> Dict[str, Any]:
+    """
+    Latency of one edit_state() call in a fresh interpreter, without and with the
+    revision history it records (diff, append, periodic compaction). Writes that
+    change nothing must not touch the history file.
+    """
+    root = make_temp_project()
+    env = dict(os.environ, CLAUDE_PROJECT_DIR=str(root))
+    env.pop("CI", None)
+    try:
+        proc = subprocess.run([sys.executable, "-c", STATE_WORKER, str(HOOKS_DIR), str(ops)], env=env, capture_output=True, text=True)
+        if proc.returncode != 0: raise RuntimeError(f"State worker failed: {proc.stderr.strip()}")
+        times = json.loads(proc.stdout.strip().splitlines()[-1])
+        p50 = {key: percentile(times[key], 50) * 1000 for key in ("change_plain", "change_history", "noop_plain", "noop_history")}
+        return {
+            "change_plain_p50_ms": round(p50["change_plain"], 3),
+            "change_history_p50_ms": round(p50["change_history"], 3),
+            "change_overhead_ms": round(p50["change_history"] - p50["change_plain"], 3),
+            "change_history_p99_ms": round(percentile(times["change_history"], 99) * 1000, 3),
+            "noop_plain_p50_ms": round(p50["noop_plain"], 3),
+            "noop_history_p50_ms": round(p50["noop_history"], 3),
+            "noop_overhead_ms": round(p50["noop_history"] - p50["noop_plain"], 3),
+            "noop_revisions_recorded": times["noop_recorded"],
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+#!<
+
+#!> Bash classifier benchmark
+_LEGACY_REDIR = re.compile(r'(?:^|\s)(?:>>?|<<?|<<<)\s|(?:^|\s)\d*>&?\d*(?:\s|$)|(?:^|\s)&>')
+
+def _legacy_is_bash_read_only(command: str, readonly: set, write: set, custom_read: set, extrasafe: bool) -> bool:
+    """The regex-split + shlex classifier sessions_enforce used before hooks/bash_classifier.py
+    (kept as the benchmark baseline)."""
+    s = (command or '').strip()
+    if not s: return True
+    if _LEGACY_REDIR.search(s): return False
+    for segment in re.split(r'(?<!\|)\|(?!\|)|&&|\|\|', s):
+        segment = segment.strip()
+        if not segment: continue
+        try: parts = shlex.split(segment)
+        except ValueError: return not extrasafe
+        if not parts: continue
+        first, args = parts[0].lower(), parts[1:]
+        if first == 'cd': continue
+        if first in ('pip', 'pip3'):
+            if args and args[0].lower() in ('show', 'list', 'search', 'check', 'freeze', 'help'): continue
+            return False
+        if first in ('npm', 'yarn'):
+            if args and args[0].lower() in ('list', 'ls', 'view', 'show', 'search', 'help'): continue
+            return False
+        if first in ('python', 'python3'):
+            if args and args[0] in ('-c', '-m'): continue
+            return False
+        if first in write: return False
+        if first in ('sed', 'gsed') and any(a.startswith('-i') or a == '--in-place' for a in args): return False
+        if first in ('awk', 'gawk', 'mawk'):
+            script = ' '.join(args)
+            if re.search(r'>>?\s*["\'].*["\']', script) or any(op in script for op in ('print >', 'printf >')): return False
+        if first == 'find':
+            if '-delete' in args: return False
+            for i, arg in enumerate(args):
+                if arg in ('-exec', '-execdir') and i + 1 < len(args) and (args[i + 1].lower() in write or args[i + 1].lower() in ('rm', 'mv', 'cp', 'shred')): return False
+        if first == 'xargs':
+            if any(w in args for w in write): return False
+            if 'sed' in args and args.index('sed') + 1 < len(args) and args[args.index('sed') + 1].startswith('-i'): return False
+        if first in custom_read: continue
+        if first not in readonly and extrasafe: return False
+    return True
+
+def load_bash_corpus(path: str) -> List[str]:
+    """Load benchmark commands: a text file (one command per line) or JSONL (transcript
+    lines with Bash tool_use blocks, or objects with "command"/"tool_input.command")."""
+    commands = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip(): continue
+        if not line.lstrip().startswith('{'):
+            commands.append(line)
+            continue
+        try: obj = json.loads(line)
+        except json.JSONDecodeError: continue
+        if isinstance(obj.get("command"), str): commands.append(obj["command"])
+        elif isinstance(obj.get("tool_input"), dict) and isinstance(obj["tool_input"].get("command"), str): commands.append(obj["tool_input"]["command"])
+        content = obj.get("message", {}).get("content") if isinstance(obj.get("message"), dict) else None
+        if isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "tool_use" and block.get("name") == "Bash":
+                    command = block.get("input", {}).get("command")
+                    if isinstance(command, str): commands.append(command)
+    return commands
+
+def bench_bash(iterations: int = 200, corpus: str = "", extrasafe: int = -1) -> Dict[str, Any]:
+    """
+    Classify a command corpus with the old regex/shlex classifier and the single-pass
+    parser. Reports per-command cost for both and how verdicts compare: every
+    difference should be the parser being stricter (e.g. $(rm ...) inside echo).
+    write_checks_missed lists BASH_WRITE_CHECKS the parser let through (must be empty).
+
+    extrasafe=-1 uses the project's blocked_actions.extrasafe; 0/1 force it.
+    """
+    commands = load_bash_corpus(corpus) if corpus else list(BASH_CORPUS)
+    if not commands: raise ValueError(f"No commands found in corpus: {corpus}")
+    blocked = load_config().blocked_actions
+    safe = blocked.extrasafe if extrasafe < 0 else bool(extrasafe)
+    classifier = BashClassifier(blocked.bash_read_patterns, blocked.bash_write_patterns, safe)
+    readonly = set(READONLY_COMMANDS) | set(blocked.bash_read_patterns)
+    write = set(WRITE_COMMANDS) | set(blocked.bash_write_patterns)
+    custom_read = set(blocked.bash_read_patterns)
+
+    def legacy(cmd: str) -> bool: return _legacy_is_bash_read_only(cmd, readonly, write, custom_read, safe)
+
+    # Alternate the two in rounds and keep each one's best round, so load spikes don't pick the winner
+    timings = {"legacy": float("inf"), "parser": float("inf")}
+    rounds = 5
+    per_round = max(1, iterations // rounds)
+    for _ in range(rounds):
+        for name, func in (("legacy", legacy), ("parser", classifier.is_read_only)):
+            start = time.perf_counter()
+            for _ in range(per_round):
+                for cmd in commands: func(cmd)
+            timings[name] = min(timings[name], (time.perf_counter() - start) / (per_round * len(commands)))
+
+    # Warm verdict cache (what a repeat command costs a fresh hook process)
+    cache_dir = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    try:
+        cache = VerdictCache(cache_dir / "bash-verdicts.bin", classifier)
+        for cmd in commands: cache.is_read_only(cmd)
+        start = time.perf_counter()
+        for _ in range(per_round):
+            for cmd in commands: cache.is_read_only(cmd)
+        timings["cached"] = (time.perf_counter() - start) / (per_round * len(commands))
+    finally: shutil.rmtree(cache_dir, ignore_errors=True)
+
+    equal = stricter = 0
+    looser = []
+    for cmd in commands:
+        old, new = legacy(cmd), classifier.is_read_only(cmd)
+        if old == new: equal += 1
+        elif old: stricter += 1
+        else: looser.append(cmd)
+    return {
+        "commands": len(commands),
+        "extrasafe": safe,
+        "legacy_us_per_cmd": round(timings["legacy"] * 1e6, 2),
+        "parser_us_per_cmd": round(timings["parser"] * 1e6, 2),
+        "cached_us_per_cmd": round(timings["cached"] * 1e6, 2),
+        "speedup": round(timings["legacy"] / timings["parser"], 2) if timings["parser"] else 0.0,
+        "parser_cmds_s": round(1 / timings["parser"]) if timings["parser"] else 0,
+        "verdicts_equal": equal,
+        "verdicts_stricter": stricter,
+        "verdicts_looser": len(looser),
+        "looser_examples": looser[:5],
+        "write_checks_missed": [cmd for cmd in BASH_WRITE_CHECKS if classifier.is_read_only(cmd)],
+    }
+#!<
+
+#!> Event log benchmark
+def bench_events(runs: int = 500, events: int = 3, writers: int = 4, max_kb: int = 64, budget_us: int = 200) -> Dict[str, Any]:
+    """
+    Cost of the enforcement event log per hook run: `events` buffered emits plus the
+    single exit flush, against writing each event with its own open/append/close.
+    Then `writers` processes append concurrently with rotation at `max_kb` to check
+    that every line in every file is intact and the live file stays under the limit.
+    """
+    tmp = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    try:
+        # Buffered: what a hook pays (the emits, then one write at exit)
+        path = tmp / "buffered" / "events.ndjson"
+        emit_s = flush_s = 0.0
+        for run in range(runs):
+            log = EventLog(path)
+            t0 = time.perf_counter()
+            for i in range(events): log.emit("enforce", tool="Edit", verdict="allow", reason="bench", run=run, i=i)
+            t1 = time.perf_counter()
+            log.flush()
+            emit_s += t1 - t0; flush_s += time.perf_counter() - t1
+
+        # Unbuffered baseline: open/append/close per event
+        naive = tmp / "naive.ndjson"
+        t0 = time.perf_counter()
+        for run in range(runs):
+            for i in range(events):
+                record = {"ts": datetime.now(timezone.utc).isoformat(), "event": "enforce", "tool": "Edit", "verdict": "allow", "reason": "bench", "run": run, "i": i}
+                with naive.open("a", encoding="utf-8") as f: f.write(json.dumps(record) + "\n")
+        naive_s = time.perf_counter() - t0
+
+        # Concurrent writers with rotation
+        shared = tmp / "shared" / "events.ndjson"
+        go_file = tmp / "go"
+        max_bytes = max_kb * 1024
+        procs = [subprocess.Popen([sys.executable, "-c", EVENT_WORKER, str(HOOKS_DIR), str(shared), str(runs), str(events), str(max_bytes), str(go_file)],
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) for _ in range(writers)]
+        time.sleep(0.3)
+        start = time.perf_counter()
+        go_file.touch()
+        errors = sum(1 for p in procs if p.communicate()[1].strip())
+        wall = time.perf_counter() - start
+        checker = EventLog(shared, max_bytes=max_bytes)
+        lines = bad = 0
+        for f in checker.files():
+            for line in f.read_text(encoding="utf-8").splitlines():
+                lines += 1
+                try: json.loads(line)
+                except json.JSONDecodeError: bad += 1
+
+        per_run_us = (emit_s + flush_s) / runs * 1e6
+        return {
+            "emit_us_per_event": round(emit_s / (runs * events) * 1e6, 2),
+            "flush_us_per_run": round(flush_s / runs * 1e6, 2),
+            "buffered_us_per_run": round(per_run_us, 2),
+            "unbuffered_us_per_run": round(naive_s / runs * 1e6, 2),
+            "within_budget": per_run_us <= budget_us,
+            "concurrent_events": writers * runs * events,
+            "concurrent_wall_s": round(wall, 4),
+            "files_after_rotation": len(checker.files()),
+            "live_file_kb": round(shared.stat().st_size / 1024, 1) if shared.exists() else 0.0,
+            "lines_retained": lines,
+            "corrupt_lines": bad,
+            "writer_errors": errors,
+        }
+    finally: shutil.rmtree(tmp, ignore_errors=True)
+#!<
+
+#!> Batch policy benchmark
+POLICY_BENCH_TOOLS = ["Read", "Edit", "Write", "MultiEdit", "Grep", "Glob", "TodoWrite", "Task", "NotebookEdit", "mcp__example__tool"]
+
+def bench_policy(calls: int = 50000, workers: int = 1, distinct: int = 500) -> Dict[str, Any]:
+    """
+    Time `policy check --batch` on synthetic hook inputs: a third Bash (drawn from
+    BASH_CORPUS, `distinct` unique commands), the rest other tools across modes.
+    """
+    tmp = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    try:
+        batch = tmp / "calls.jsonl"
+        modes = ["discussion", "discussion", "implementation"]
+        with open(batch, "w", encoding="utf-8") as f:
+            for i in range(calls):
+                if i % 3 == 0: call = {"tool_name": "Bash", "tool_input": {"command": f"{BASH_CORPUS[i % len(BASH_CORPUS)]} #{i % max(1, distinct)}"}}
+                else: call = {"tool_name": POLICY_BENCH_TOOLS[i % len(POLICY_BENCH_TOOLS)], "tool_input": {"file_path": f"src/mod_{i % 50}.py"}}
+                call["mode"] = modes[i % len(modes)]
+                f.write(json.dumps(call) + "\n")
+        params = dict(CHECK_DEFAULTS, batch=str(batch), workers=workers, mode="discussion", smode="none", bypass="0")
+        results, summary = run_batch_check(params)
+    finally: shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "calls": summary["calls"],
+        "workers": summary["workers"],
+        "elapsed_s": summary["elapsed_s"],
+        "calls_per_s": summary["calls_per_s"],
+        "us_per_call": round(summary["elapsed_s"] / summary["calls"] * 1e6, 2) if summary["calls"] else 0.0,
+        "verdicts": summary["verdicts"],
+    }
+#!<
+
+#!> Transcript tail benchmark
+def write_synthetic_transcript(path: Path, size_mb: int, tail_entries: int = 20) -> Dict[str, Any]:
+    """Write a transcript of roughly `size_mb` MB: user/assistant turns with usage, tool results,
+    and subagent (sidechain) entries. The newest main-chain usage is followed by `tail_entries`
+    sidechain and tool-result entries, as it is while a Task subagent runs."""
+    target = size_mb * 1024 * 1024
+    written = turn = 0
+    usage: Dict[str, int] = {}
+    padding = "x" * 1500
+    with path.open("w", encoding="utf-8") as f:
+        def entry(record: Dict[str, Any]) -> int:
+            line = json.dumps(record) + "\n"
+            f.write(line)
+            return len(line)
+        while written < target:
+            turn += 1
+            ts = f"2025-01-01T{turn // 3600 % 24:02d}:{turn // 60 % 60:02d}:{turn % 60:02d}.000Z"
+            usage = {"input_tokens": 10 + turn % 7, "cache_read_input_tokens": 1000 + turn, "cache_creation_input_tokens": turn % 500, "output_tokens": 300}
+            written += entry({"type": "user", "timestamp": ts, "sessionId": "bench", "message": {"role": "user", "content": [{"type": "tool_result", "content": padding}]}})
+            written += entry({"type": "assistant", "timestamp": ts, "sessionId": "bench", "message": {"role": "assistant", "content": [{"type": "text", "text": padding[:400]}], "usage": usage}})
+            if turn % 5 == 0: written += entry({"type": "assistant", "isSidechain": True, "timestamp": ts, "sessionId": "bench", "message": {"role": "assistant", "usage": {"input_tokens": 1, "cache_read_input_tokens": 5}}})
+        for i in range(tail_entries):
+            sidechain = {"type": "assistant", "isSidechain": True, "timestamp": ts, "sessionId": "bench", "message": {"role": "assistant", "content": [{"type": "text", "text": padding}], "usage": {"input_tokens": 1, "cache_read_input_tokens": 5}}}
+            written += entry(sidechain if i % 2 else {"type": "user", "isSidechain": True, "timestamp": ts, "sessionId": "bench", "message": {"role": "user", "content": [{"type": "tool_result", "content": padding}]}})
+    return {"bytes": written, "turns": turn, "expected_tokens": context_tokens(usage)}
+
+def _legacy_context_length(transcript_path: Path) -> int:
+    """The full-read scan statusline.py used before transcript_reader: every line parsed, newest timestamp wins."""
+    with open(transcript_path, 'r', encoding='utf-8', errors='backslashreplace') as f: lines = f.readlines()
+    most_recent_usage = most_recent_timestamp = None
+    for line in lines:
+        try:
+            data = json.loads(line.strip())
+            if data.get('isSidechain', False): continue
+            if data.get('message', {}).get('usage'):
+                timestamp = data.get('timestamp')
+                if timestamp and (not most_recent_timestamp or timestamp > most_recent_timestamp):
+                    most_recent_timestamp = timestamp
+                    most_recent_usage = data['message']['usage']
+        except Exception: continue
+    return context_tokens(most_recent_usage)
+
+def bench_transcript(size_mb: int = 100, tail_entries: int = 20, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Time the statusline's context-usage lookup on a synthetic `size_mb` MB transcript:
+    the old full read (readlines + json.loads per line) vs the reverse tail reader, and the
+    shared transcript index: first build, then the update after one appended turn.
+    """
+    tmp = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    try:
+        path = tmp / "transcript.jsonl"
+        info = write_synthetic_transcript(path, size_mb, tail_entries)
+        start = time.perf_counter()
+        legacy = _legacy_context_length(path)
+        legacy_s = time.perf_counter() - start
+        tail_s = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tail = context_tokens(latest_usage(path))
+            tail_s = min(tail_s, time.perf_counter() - start)
+
+        sidecar = tmp / "index.json"
+        start = time.perf_counter()
+        index_transcript(path, sidecar)
+        index_build_s = time.perf_counter() - start
+        append_s = float("inf")
+        for turn in range(repeat):
+            usage = {"input_tokens": 5, "cache_read_input_tokens": 2000 + turn, "cache_creation_input_tokens": 100, "output_tokens": 300}
+            with path.open("a", encoding="utf-8") as f: f.write(json.dumps({"type": "assistant", "sessionId": "bench", "message": {"role": "assistant", "content": [], "usage": usage}}) + "\n")
+            start = time.perf_counter()
+            indexed = context_tokens(index_transcript(path, sidecar).usage)
+            append_s = min(append_s, time.perf_counter() - start)
+    finally: shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "transcript_mb": round(info["bytes"] / 1024 / 1024, 1),
+        "entries": info["turns"] * 2 + info["turns"] // 5 + tail_entries,
+        "full_read_ms": round(legacy_s * 1000, 2),
+        "tail_read_ms": round(tail_s * 1000, 3),
+        "speedup": round(legacy_s / tail_s, 1) if tail_s else 0.0,
+        "tokens_match": legacy == tail == info["expected_tokens"],
+        "context_tokens": tail,
+        "index_build_ms": round(index_build_s * 1000, 2),
+        "index_append_ms": round(append_s * 1000, 3),
+        "index_tokens_match": indexed == context_tokens(usage),
+    }
+#!<
+
+#!> Snapshot chunker benchmark
+def synthetic_snapshot_text(size_mb: int) -> str:
+    """A cleaned transcript as subagent_hooks.py writes it (json.dumps indent=2) of roughly `size_mb` MB:
+    prose with non-ASCII text, code edits, and long tool results with escaped newlines."""
+    prose = "Refactor the parser so errors carry positions — naïve approach first, then 改进 the cache ✓. "
+    code = "def handler(event):\n    return {'status': 'ok', 'items': [i for i in range(10)]}\n" * 6
+    entries, size, turn = [], 0, 0
+    while size < size_mb * 1024 * 1024:
+        turn += 1
+        batch = [
+            {"role": "user", "content": [{"type": "text", "text": prose * (1 + turn % 4)}]},
+            {"role": "assistant", "content": [{"type": "tool_use", "name": "Edit", "input": {"file_path": f"src/mod_{turn}.py", "old_string": code, "new_string": code.replace("ok", "done")}}]},
+            {"role": "user", "content": [{"type": "tool_result", "content": ("line of output " * 12 + "\n") * (20 + turn % 200)}]},
+        ]
+        entries.extend(batch)
+        size += sum(len(json.dumps(e)) for e in batch)
+    return json.dumps(entries, indent=2, ensure_ascii=False)
+
+def _legacy_chunk(text: str, max_bytes: int) -> List[str]:
+    """The character loop subagent_hooks.py used before transcript_chunks: encode per character,
+    re-sum the remainder's bytes on every flush."""
+    chunks, buf_chars, buf_bytes = [], [], 0
+    last_newline_idx = last_space_idx = None
+    for ch in text:
+        ch_b = len(ch.encode("utf-8"))
+        if buf_bytes + ch_b > max_bytes:
+            cut_idx = last_newline_idx if last_newline_idx is not None else last_space_idx
+            if cut_idx is not None and cut_idx > 0:
+                chunks.append("".join(buf_chars[:cut_idx]))
+                buf_chars = buf_chars[cut_idx:]
+                buf_bytes = sum(len(c.encode("utf-8")) for c in buf_chars)
+            else:
+                if buf_chars: chunks.append("".join(buf_chars))
+                buf_chars, buf_bytes = [], 0
+            last_newline_idx = last_space_idx = None
+        buf_chars.append(ch)
+        buf_bytes += ch_b
+        if ch == "\n": last_newline_idx = len(buf_chars); last_space_idx = None
+        elif ch == " " and last_newline_idx is None: last_space_idx = len(buf_chars)
+    if buf_chars: chunks.append("".join(buf_chars))
+    return chunks
+
+def bench_chunker(size_mb: int = 4, max_bytes: int = SNAPSHOT_CHUNK_BYTES, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Split a synthetic `size_mb` MB subagent snapshot into `max_bytes` chunks: the old character
+    loop vs the byte-buffer chunker. Checks both give the same chunks, that chunks are within the
+    limit and valid UTF-8, and that nothing is lost; a line with no break points exercises hard cuts.
+    """
+    text = synthetic_snapshot_text(size_mb)
+    start = time.perf_counter()
+    legacy = _legacy_chunk(text, max_bytes)
+    legacy_s = time.perf_counter() - start
+    chunked_s = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = chunk_text(text, max_bytes)
+        chunked_s = min(chunked_s, time.perf_counter() - start)
+    unbroken = "é" * max_bytes + "x" * 3  # Forces hard cuts inside two-byte characters
+    hard = chunk_text(unbroken, max_bytes)
+    return {
+        "snapshot_mb": round(len(text.encode("utf-8")) / 1024 / 1024, 1),
+        "chunks": len(chunks),
+        "legacy_ms": round(legacy_s * 1000, 1),
+        "chunker_ms": round(chunked_s * 1000, 2),
+        "speedup": round(legacy_s / chunked_s, 1) if chunked_s else 0.0,
+        "outputs_match": chunks == legacy,
+        "within_limit": all(len(c.encode("utf-8")) <= max_bytes for c in chunks + hard),
+        "lossless": "".join(chunks) == text and "".join(hard) == unbroken,
+    }
+#!<
+
+#!> Snapshot pipeline benchmark
+def _legacy_snapshot(path: Path, chunk_tokens: int, max_bytes: int) -> List[str]:
+    """The pipeline subagent_hooks.py used before snapshot_stream: every line parsed into memory, the
+    entries after the first edit call cleaned into a list, one json.dumps string, then chunked."""
+    with open(path, 'r', encoding='utf-8', errors='backslashreplace') as f: transcript = [json.loads(line) for line in f if line.strip()]
+    first_edit = next((i for i, entry in enumerate(transcript) if calls_edit_tool(entry)), len(transcript))
+    clean = [{'role': e['message'].get('role'), 'content': e['message'].get('content')} for e in transcript[first_edit + 1:]
+             if e.get('message') and e.get('type') in ['user', 'assistant']]
+    return chunk_by_tokens(json.dumps(clean, indent=2, ensure_ascii=False), chunk_tokens, max_bytes)
+
+def _measure(run: Any) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try: run(); peak = tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+    return {"result": result, "ms": round(elapsed * 1000, 1), "peak_mb": round(peak / 1024 / 1024, 2)}
+
+def bench_snapshot(size_mb: int = 50, chunk_tokens: int = SNAPSHOT_CHUNK_TOKENS) -> Dict[str, Any]:
+    """
+    Build the subagent snapshot of a synthetic `size_mb` MB transcript: the old in-memory pipeline
+    vs the streaming one (index cut point, line reader, packer, chunk store). Reports time and
+    peak Python memory for each, and checks both snapshots hold the same entries.
+    """
+    tmp = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    try:
+        body, path = tmp / "body.jsonl", tmp / "transcript.jsonl"
+        write_synthetic_transcript(body, size_mb)
+        edit = {"type": "assistant", "sessionId": "bench", "message": {"role": "assistant", "content": [{"type": "tool_use", "id": "e1", "name": "Edit", "input": {"file_path": "a.py"}}]}}
+        with path.open("wb") as out, body.open("rb") as src:
+            out.write((json.dumps(edit) + "\n").encode("utf-8"))
+            shutil.copyfileobj(src, out)
+        body.unlink()
+
+        def streamed() -> List[str]:
+            store, digests = SnapshotStore(tmp / "store"), []
+            index = index_transcript(path, tmp / f"index-{len(list(tmp.glob('index-*')))}.json")  # Built from scratch each run
+            with open(path, "rb") as f:
+                f.seek(index.edit_offsets[0]); f.readline()
+                for group, _, _ in snapshot_groups(f, f.tell(), index.offset, chunk_tokens): digests += [store.put(text) for text in group.texts]
+            return digests
+
+        legacy = _measure(lambda: _legacy_snapshot(path, chunk_tokens, SNAPSHOT_CHUNK_BYTES))
+        stream = _measure(streamed)
+        text, decoder, pos, entries = "".join(SnapshotStore(tmp / "store").chunk_path(d).read_text(encoding="utf-8") for d in stream["result"]), json.JSONDecoder(), 0, []
+        while pos < len(text): array, pos = decoder.raw_decode(text, pos); entries += array
+        same = entries == json.loads("".join(legacy["result"]))
+    finally: shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "transcript_mb": size_mb,
+        "chunks": len(stream["result"]),
+        "legacy_ms": legacy["ms"],
+        "stream_ms": stream["ms"],
+        "legacy_peak_mb": legacy["peak_mb"],
+        "stream_peak_mb": stream["peak_mb"],
+        "entries_match": same,
+    }
+
+def bench_prune(filler: int = 400, read_kb: int = 4) -> Dict[str, Any]:
+    """
+    Run the Task hook on a transcript that reads config.py, then `filler` ~500-token entries, then
+    reads it again unchanged: once for a haiku subagent, whose cap drops the first read, and once
+    for sonnet, which keeps everything. The second read may only become a dedupe marker while the
+    first is still in the snapshot (dangling_markers must be 0), and config.py must appear in full.
+    """
+    root = make_temp_project()
+    env = dict(os.environ, CLAUDE_PROJECT_DIR=str(root))
+    env.pop("CI", None)
+    try:
+        content = "".join(f"SETTING_{i} = {i}\n" for i in range(read_kb * 1024 // 16))
+        lines = [{"type": "assistant", "message": {"role": "assistant", "content": [{"type": "tool_use", "id": "e0", "name": "Edit", "input": {"file_path": "a.py"}}]}}]
+        for i in range(filler + 1):
+            if i in (0, filler):
+                lines.append({"type": "assistant", "message": {"role": "assistant", "content": [{"type": "tool_use", "id": f"r{i}", "name": "Read", "input": {"file_path": "config.py"}}]}})
+                lines.append({"type": "user", "message": {"role": "user", "content": [{"type": "tool_result", "tool_use_id": f"r{i}", "content": content}]}})
+            role = "assistant" if i % 2 else "user"
+            lines.append({"type": role, "message": {"role": role, "content": [{"type": "text", "text": f"filler {i} " + "lorem ipsum " * 150}]}})
+        transcript = root / "transcript.jsonl"
+        transcript.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+
+        results: Dict[str, Any] = {}
+        for model in ("haiku", "sonnet"):
+            payload = {"session_id": "bench", "transcript_path": str(transcript), "tool_name": "Task", "tool_input": {"subagent_type": model, "model": model, "prompt": "bench"}}
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, str(HOOKS_DIR / "subagent_hooks.py")], input=json.dumps(payload), capture_output=True, text=True, env=env, timeout=60)
+            elapsed = time.perf_counter() - start
+            if proc.returncode != 0: raise RuntimeError(f"Task hook failed: {proc.stderr.strip()}")
+            text = "".join(p.read_text(encoding="utf-8") for p in sorted((root / "sessions" / "transcripts" / model).glob("*.txt")))
+            full, markers = text.count(json.dumps(content)[1:-1]), text.count("same content as the earlier read of config.py")
+            results.update({f"{model}_capped": "older entries omitted" in proc.stdout, f"{model}_full_reads": full, f"{model}_markers": markers,
+                            f"{model}_dangling_markers": markers if not full else 0, f"{model}_ms": round(elapsed * 1000, 1)})
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+#!<
+
+#!> Statusline git benchmark
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.check_output(["git", "-C", str(repo), *args], stderr=subprocess.PIPE, encoding="utf-8", errors="replace")
+
+def make_bench_repo(root: Path, files: int, modified: int, staged: int, ahead: int, behind: int) -> None:
+    """Repo with `files` committed files, a local upstream `ahead`/`behind` HEAD, and staged/unstaged edits."""
+    _git(root, "init", "-q", "-b", "main")
+    _git(root, "config", "user.email", "bench@example.com"); _git(root, "config", "user.name", "bench")
+    _git(root, "config", "commit.gpgsign", "false")
+    for i in range(files):
+        d = root / f"pkg{i % 100:02d}"
+        d.mkdir(exist_ok=True)
+        (d / f"mod_{i}.py").write_text(f"VALUE = {i}\n", encoding="utf-8")
+    _git(root, "add", "-A"); _git(root, "commit", "-q", "-m", "base")
+    _git(root, "branch", "upstream")
+    _git(root, "checkout", "-q", "upstream")
+    for i in range(behind): _git(root, "commit", "-q", "--allow-empty", "-m", f"upstream {i}")
+    _git(root, "checkout", "-q", "main")
+    _git(root, "branch", "-q", "--set-upstream-to=upstream")
+    for i in range(ahead): _git(root, "commit", "-q", "--allow-empty", "-m", f"local {i}")
+    for i in range(modified): (root / f"pkg{i % 100:02d}" / f"mod_{i}.py").write_text(f"VALUE = -{i}\n", encoding="utf-8")
+    for i in range(staged): _git(root, "add", f"pkg{i % 100:02d}/mod_{i}.py")
+
+def _legacy_git_segments(repo: Path) -> Dict[str, Any]:
+    """The per-segment git calls statusline.py made before git_status(): branch, rev-list x2, diff x2."""
+    branch = _git(repo, "branch", "--show-current").strip()
+    try:
+        ahead = int(_git(repo, "rev-list", "--count", "@{u}..HEAD").strip())
+        behind = int(_git(repo, "rev-list", "--count", "HEAD..@{u}").strip())
+    except subprocess.CalledProcessError: ahead = behind = 0
+    if not branch: branch = "@" + _git(repo, "rev-parse", "--short", "HEAD").strip()
+    unstaged = len([f for f in _git(repo, "diff", "--name-only").strip().split("\n") if f])
+    staged = len([f for f in _git(repo, "diff", "--cached", "--name-only").strip().split("\n") if f])
+    return {"branch": branch, "ahead": ahead, "behind": behind, "edited": unstaged + staged}
+
+def bench_git(files: int = 20000, modified: int = 50, staged: int = 20, ahead: int = 3, behind: int = 2, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Time the statusline's git segments on a generated repo: the old five/six git
+    processes per render vs one `git status --porcelain=v2 --branch`.
+    """
+    root = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    try:
+        make_bench_repo(root, files, modified, staged, ahead, behind)
+        timings = {"legacy": float("inf"), "status": float("inf")}
+        for _ in range(repeat):
+            start = time.perf_counter(); legacy = _legacy_git_segments(root)
+            timings["legacy"] = min(timings["legacy"], time.perf_counter() - start)
+            start = time.perf_counter(); status = git_status(root)
+            timings["status"] = min(timings["status"], time.perf_counter() - start)
+        single = {"branch": status.branch or "@" + status.oid[:7], "ahead": status.ahead, "behind": status.behind, "edited": status.edited}
+    finally: shutil.rmtree(root, ignore_errors=True)
+    return {
+        "files": files,
+        "legacy_ms": round(timings["legacy"] * 1000, 2),
+        "single_status_ms": round(timings["status"] * 1000, 2),
+        "speedup": round(timings["legacy"] / timings["status"], 2) if timings["status"] else 0.0,
+        "git_processes": "5 -> 1",
+        "results_match": legacy == single,
+        "status": single,
+    }
+#!<
+
+#!> Statusline render cache benchmark
+# Runs the statusline with shared_state._lock wrapped in a counter (edit_state/edit_config go through it)
+# argv: statusline_script
+STATUSLINE_LOCK_PROBE = r'''
+import atexit, os, runpy, sys
+sys.path.insert(0, os.environ["CLAUDE_PROJECT_DIR"])
+try: import sessions.hooks.shared_state as shared_state
+except ImportError: import cc_sessions.hooks.shared_state as shared_state
+acquired = []
+_lock = shared_state._lock
+def counting_lock(*args, **kwargs):
+    acquired.append(str(args[0]) if args else "")
+    return _lock(*args, **kwargs)
+shared_state._lock = counting_lock
+atexit.register(lambda: print(f"exclusive_locks={len(acquired)}", file=sys.stderr))
+runpy.run_path(sys.argv[1], run_name="__main__")
+'''
+
+def _drop_statusline_session(session_id: str) -> None:
+    """Remove one session's entry from the statusline cache (next render is cold)."""
+    try: data = json.loads(STATUSLINE_CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError): return
+    if data.get("sessions", {}).pop(session_id, None) is not None:
+        STATUSLINE_CACHE_FILE.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+
+def bench_statusline(renders: int = 10, size_mb: int = 20) -> Dict[str, Any]:
+    """
+    Time full statusline renders (one interpreter each, as Claude Code runs it) against
+    this project and a synthetic `size_mb` MB transcript: cold (cache entry dropped before
+    every render) vs warm (nothing changed since the previous render). Also checks that a
+    render takes no exclusive state lock, even when the model differs from state.model.
+    """
+    tmp = Path(tempfile.mkdtemp(prefix="cc-sessions-bench-"))
+    session_id = "perf-bench"
+    try:
+        transcript = tmp / "transcript.jsonl"
+        write_synthetic_transcript(transcript, size_mb)
+        env = dict(os.environ, CLAUDE_PROJECT_DIR=str(PROJECT_ROOT))
+
+        def render(model: str = "Sonnet 4.5", probe: bool = False) -> tuple:
+            payload = json.dumps({"cwd": str(PROJECT_ROOT), "model": {"display_name": model}, "session_id": session_id, "transcript_path": str(transcript)})
+            command = [sys.executable, "-c", STATUSLINE_LOCK_PROBE, str(STATUSLINE_SCRIPT)] if probe else [sys.executable, str(STATUSLINE_SCRIPT)]
+            start = time.perf_counter()
+            result = subprocess.run(command, input=payload, capture_output=True, text=True, env=env, timeout=30)
+            if result.returncode != 0: raise RuntimeError(f"statusline failed: {result.stderr.strip()[-500:]}")
+            return time.perf_counter() - start, result.stdout, result.stderr
+
+        cold, warm, outputs = [], [], set()
+        for _ in range(renders):
+            _drop_statusline_session(session_id)
+            elapsed, out, _ = render(); cold.append(elapsed); outputs.add(out)
+            elapsed, out, _ = render(); warm.append(elapsed); outputs.add(out)
+
+        # Lock probe: a model other than the one in state (the old render path wrote it back under the lock)
+        other = "Haiku 4.5" if load_state().model != Model.HAIKU else "Opus 4.1"
+        locks = 0
+        for model in (other, other, "Sonnet 4.5"):
+            _, _, err = render(model, probe=True)
+            match = re.search(r"exclusive_locks=(\d+)", err)
+            locks += int(match.group(1)) if match else 1
+
+        # Interpreter start + imports, the floor neither render can go below
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import json, subprocess, datetime"], check=True)
+        startup = time.perf_counter() - start
+    finally:
+        _drop_statusline_session(session_id)
+        with suppress(OSError): session_model_file(session_id).unlink()
+        shutil.rmtree(tmp, ignore_errors=True)
+    cold_p50, warm_p50 = percentile(cold, 50), percentile(warm, 50)
+    return {
+        "renders": renders,
+        "cold_p50_ms": round(cold_p50 * 1000, 2),
+        "warm_p50_ms": round(warm_p50 * 1000, 2),
+        "saved_ms": round((cold_p50 - warm_p50) * 1000, 2),
+        "interpreter_ms": round(startup * 1000, 2),
+        "outputs_match": len(outputs) == 1,
+        "exclusive_locks": locks,
+        "lock_free": locks == 0,
+    }
+#!<
+
+#!> Benchmark registry
+BENCHMARKS = {
+    "locks": (bench_locks, {"writers": 4, "readers": 4, "ops": 50}),
+    "state": (bench_state, {"ops": 200}),
+    "bash": (bench_bash, {"iterations": 200, "corpus": "", "extrasafe": -1}),
+    "events": (bench_events, {"runs": 500, "events": 3, "writers": 4, "max_kb": 64, "budget_us": 200}),
+    "transcript": (bench_transcript, {"size_mb": 100, "tail_entries": 20, "repeat": 5}),
+    "git": (bench_git, {"files": 20000, "modified": 50, "staged": 20, "ahead": 3, "behind": 2, "repeat": 5}),
+    "policy": (bench_policy, {"calls": 50000, "workers": 1, "distinct": 500}),
+    "statusline": (bench_statusline, {"renders": 10, "size_mb": 20}),
+    "chunker": (bench_chunker, {"size_mb": 4, "max_bytes": SNAPSHOT_CHUNK_BYTES, "repeat": 3}),
+    "snapshot": (bench_snapshot, {"size_mb": 50, "chunk_tokens": SNAPSHOT_CHUNK_TOKENS}),
+    "prune": (bench_prune, {"filler": 400, "read_kb": 4}),
+}
+
+def format_bench_human(suite: str, params: Dict[str, Any], results: Dict[str, Any]) -> str:
+    lines = [f"Benchmark: {suite} ({', '.join(f'{k}={v}' for k, v in params.items())})"]
+    width = max(len(k) for k in results) if results else 0
+    for key, value in results.items(): lines.append(f"  {key:<{width}}  {value}")
+    lines.append(f"\nResult appended to {BENCH_RESULTS_FILE.relative_to(PROJECT_ROOT)}")
+    return "\n".join(lines)
+#!<
+
+#!> Prompt cache analytics
+def resolve_transcript(ref: str) -> Path:
+    """A transcript path, or a session id (prefix) among this project's transcripts."""
+    path = Path(ref).expanduser()
+    if path.is_file(): return path
+    matches = sorted(project_transcript_dir(PROJECT_ROOT).glob(f"{ref}*.jsonl"))
+    if len(matches) == 1: return matches[0]
+    if matches: raise ValueError(f"Session id '{ref}' is ambiguous ({len(matches)} transcripts)")
+    raise ValueError(f"No transcript found for '{ref}' in {project_transcript_dir(PROJECT_ROOT)}")
+
+def cache_report(ref: str = "", limit: int = 10) -> Dict[str, Any]:
+    """Prompt-cache summary per session (newest `limit` transcripts), or one session in detail."""
+    if ref:
+        path = resolve_transcript(ref)
+        stats = scan_cache_usage(path)
+        return {"session": path.stem, "transcript": str(path), **stats.summary(), "invalidation_details": stats.invalidations}
+    directory = project_transcript_dir(PROJECT_ROOT)
+    paths = sorted(directory.glob("*.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True)[:limit] if directory.is_dir() else []
+    sessions, totals = [], {"turns": 0, "cache_read_tokens": 0, "total_input": 0, "creation_cost_usd": 0.0, "invalidations": 0}
+    for path in paths:
+        stats = scan_cache_usage(path)
+        if not stats.turns: continue
+        modified = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat(timespec="seconds")
+        sessions.append({"session": path.stem, "modified": modified, **stats.summary()})
+        totals["turns"] += stats.turns
+        totals["cache_read_tokens"] += stats.cache_read_tokens
+        totals["total_input"] += stats.total_input
+        totals["creation_cost_usd"] += stats.creation_cost_usd
+        totals["invalidations"] += stats.invalidation_count
+    totals["hit_ratio"] = round(totals["cache_read_tokens"] / totals["total_input"], 4) if totals["total_input"] else 0.0
+    totals["creation_cost_usd"] = round(totals["creation_cost_usd"], 4)
+    return {"transcript_dir": str(directory), "sessions": sessions, "totals": totals}
+
+def format_cache_report_human(report: Dict[str, Any]) -> str:
+    if "sessions" not in report:
+        lines = [f"Prompt cache: session {report['session']}",
+                 f"  Turns: {report['turns']}    Hit ratio: {report['hit_ratio'] * 100:.1f}%",
+                 f"  Tokens: {report['cache_read_tokens']:,} read, {report['cache_creation_tokens']:,} written, {report['input_tokens']:,} uncached",
+                 f"  Cache writes: ${report['creation_cost_usd']:.2f} total, ${report['creation_cost_per_turn_usd']:.4f}/turn ({report['creation_tokens_per_turn']:,} tokens/turn)",
+                 f"  Cache reads saved: ${report['read_savings_usd']:.2f}",
+                 f"  Invalidations: {report['invalidations']}"]
+        for inv in report["invalidation_details"]:
+            idle = f", idle {inv['idle_s']}s" if inv.get("idle_s") is not None else ""
+            lines.append(f"    turn {inv['turn']:>4}  {(inv.get('timestamp') or '')[:19].replace('T', ' ')}  read {inv['cache_read']:,} of {inv['expected_read']:,}, "
+                         f"wrote {inv['cache_creation']:,} (${inv['creation_cost_usd']:.3f})  {inv['reason']}{idle}")
+        return "\n".join(lines)
+    if not report["sessions"]: return f"No transcripts with usage records in {report['transcript_dir']}"
+    lines = [f"Prompt cache by session ({report['transcript_dir']}):", f"  {'session':<10} {'modified':<20} {'turns':>6} {'hit':>7} {'writes $':>9} {'$/turn':>8} {'invalid':>8}"]
+    for s in report["sessions"]:
+        lines.append(f"  {s['session'][:8]:<10} {s['modified'][:19].replace('T', ' '):<20} {s['turns']:>6} {s['hit_ratio'] * 100:>6.1f}% {s['creation_cost_usd']:>9.2f} {s['creation_cost_per_turn_usd']:>8.4f} {s['invalidations']:>8}")
+    t = report["totals"]
+    lines.append(f"  {'total':<10} {'':<20} {t['turns']:>6} {t['hit_ratio'] * 100:>6.1f}% {t['creation_cost_usd']:>9.2f} {'':>8} {t['invalidations']:>8}")
+    lines.append("\nDetails for one session: sessions perf cache <session-id>")
+    return "\n".join(lines)
+#!<
+
+#!> Runtime report
+def build_perf_report() -> Dict[str, Dict[str, Any]]:
+    """Collect runtime counters the hooks maintain, one section per subsystem."""
+    blocked = load_config().blocked_actions
+    return {
+        "bash_verdict_cache": VerdictCache(BASH_VERDICT_CACHE_FILE, BashClassifier.from_blocked_actions(blocked)).stats(),
+        "event_log": event_log_summary(),
+        "hook_latency": hook_latency_summary(),
+        "snapshot_store": snapshot_store().stats(),
+    }
+
+def hook_latency_summary() -> Dict[str, Any]:
+    """p50/p95 per hook over the rolling window of the most recently active session."""
+    files = sorted(HOOK_LATENCY_DIR.glob("*.bin"), key=lambda f: f.stat().st_mtime) if HOOK_LATENCY_DIR.exists() else []
+    if not files: return {"session": ""}
+    summary = latency_summary(files[-1])
+    report: Dict[str, Any] = {"session": files[-1].stem}
+    for hook, stats in sorted(summary.items(), key=lambda kv: kv[0] != "all"):
+        report[hook] = f"p50 {stats['p50_ms']:.0f}ms  p95 {stats['p95_ms']:.0f}ms  max {stats['max_ms']:.0f}ms  (n={stats['count']})"
+    return report
+
+def event_log_summary() -> Dict[str, Any]:
+    """Event log size plus counts of logged events, blocks and mode changes."""
+    log = EventLog(EVENT_LOG_FILE)
+    files = log.files()
+    events = log.read()
+    counts: Dict[str, int] = {}
+    for record in events:
+        key = record.get("event", "?")
+        if key == "enforce": key = f"enforce_{record.get('verdict', '?')}"
+        counts[key] = counts.get(key, 0) + 1
+    blocks: Dict[str, int] = {}
+    for record in events:
+        if record.get("verdict") == "block": blocks[record.get("reason", "?")] = blocks.get(record.get("reason", "?"), 0) + 1
+    return {
+        "file": str(EVENT_LOG_FILE.relative_to(PROJECT_ROOT)),
+        "files": len(files),
+        "bytes": sum(f.stat().st_size for f in files),
+        "since": events[0].get("ts", "") if events else "",
+        "events": dict(sorted(counts.items())),
+        "blocks_by_reason": dict(sorted(blocks.items(), key=lambda kv: -kv[1])),
+    }
+
+def format_report_human(report: Dict[str, Dict[str, Any]]) -> str:
+    lines = ["Sessions Perf Report:"]
+    for section, values in report.items():
+        lines.append(f"\n  {section.replace('_', ' ').title()}:")
+        width = max(len(k) for k in values) if values else 0
+        for key, value in values.items():
+            if key == "hit_rate": value = f"{value:.1%}"
+            lines.append(f"    {key:<{width}}  {value}")
+    return "\n".join(lines)
+#!<
+
+#!> Perf command handler
+def handle_perf_command(args: List[str], json_output: bool = False, from_slash: bool = False) -> Any:
+    """
+    Handle performance benchmark and report commands.
+
+    Usage:
+        perf bench <suite> [key=value ...]  - Run a benchmark suite and record the result
+        perf bench list                     - List benchmark suites and their parameters
+        perf results [suite] [n]            - Show recorded benchmark results
+        perf report                         - Show runtime counters (cache hit rates, ...)
+        perf cache [session|path] [n]       - Prompt-cache hit ratio, write cost and invalidations
+    """
+    args = [a for a in args if a != '--from-slash']
+    if not args or args[0].lower() == 'help': return format_perf_help()
+
+    action = args[0].lower()
+
+    if action == 'bench':
+        if len(args) < 2 or args[1] == 'list':
+            suites = {name: defaults for name, (_, defaults) in BENCHMARKS.items()}
+            if json_output: return {"suites": suites}
+            return "Benchmark suites:\n" + "\n".join(f"  {name:<12} {' '.join(f'{k}={v}' for k, v in d.items())}" for name, d in suites.items())
+
+        suite = args[1]
+        if suite not in BENCHMARKS: raise ValueError(f"Unknown benchmark suite: {suite}. Valid: {', '.join(BENCHMARKS)}")
+        func, defaults = BENCHMARKS[suite]
+        params = parse_bench_params(args[2:], defaults)
+        record = record_bench_result(suite, params, func(**params))
+        if json_output: return record
+        return format_bench_human(suite, params, record["results"])
+
+    elif action == 'report':
+        report = build_perf_report()
+        if json_output: return report
+        return format_report_human(report)
+
+    elif action == 'cache':
+        ref = next((a for a in args[1:] if not a.isdigit()), "")
+        limit = next((int(a) for a in args[1:] if a.isdigit()), 10)
+        report = cache_report(ref, limit)
+        if json_output: return report
+        return format_cache_report_human(report)
+
+    elif action == 'results':
+        suite = args[1] if len(args) > 1 and not args[1].isdigit() else None
+        limit = next((int(a) for a in args[1:] if a.isdigit()), 10)
+        records = []
+        if BENCH_RESULTS_FILE.exists():
+            for line in BENCH_RESULTS_FILE.read_text(encoding="utf-8").splitlines():
+                try: record = json.loads(line)
+                except json.JSONDecodeError: continue
+                if suite is None or record.get("suite") == suite: records.append(record)
+        records = records[-limit:]
+        if json_output: return {"results": records}
+        if not records: return "No benchmark results recorded"
+        lines = []
+        for record in records:
+            lines.append(f"{record['ts'][:19].replace('T', ' ')}  {record['suite']}  {json.dumps(record['params'])}")
+            lines.append("  " + ", ".join(f"{k}={v}" for k, v in record["results"].items()))
+        return "\n".join(lines)
+
+    else:
+        if from_slash: return f"Unknown perf command: {action}\n\n{format_perf_help()}"
+        raise ValueError(f"Unknown perf command: {action}. Valid: bench, results, report, cache")
+
+def format_perf_help() -> str:
+    """Format help output for perf commands."""
+    lines = [
+        "Sessions Perf Commands:",
+        "",
+        "  perf bench list                     - List benchmark suites",
+        "  perf bench <suite> [key=value ...]  - Run a suite (results appended to sessions/perf/bench.jsonl)",
+        "  perf results [suite] [n]            - Show the last n recorded results",
+        "  perf report                         - Runtime counters (bash verdict cache hit rate, event log, ...)",
+        "  perf cache [session|path] [n]       - Prompt-cache hit ratio, write cost, invalidated turns",
+        "",
+        "Examples:",
+        "  sessions perf bench locks writers=8 readers=4 ops=100",
+        "  sessions perf bench state ops=500",
+        "  sessions perf bench bash corpus=transcript.jsonl extrasafe=1",
+        "  sessions perf bench policy calls=200000 workers=4",
+        "  sessions perf bench events runs=2000 writers=8 max_kb=16",
+        "  sessions perf bench transcript size_mb=100",
+        "  sessions perf bench git files=50000",
+        "  sessions perf bench statusline renders=20",
+        "  sessions perf cache 20",
+        "  sessions perf cache 2efd477a",
+        "  sessions perf results locks 5 --json",
+    ]
+    return "\n".join(lines)
+#!<
+
+#-#
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+# ===== IMPORTS ===== #
+
+## ===== STDLIB ===== ##
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import json, time
+##-##
+
+## ===== 3RD-PARTY ===== ##
+##-##
+
+## ===== LOCAL ===== ##
+from hooks.shared_state import load_config, load_state, Mode, SpecializedMode, SessionsConfig
+from hooks.policy import compile_policy, verify_policy_table, policy_fingerprint, Action, PolicyTable
+from hooks.bash_classifier import normalize_command
+##-##
+
+#-#
+
+# ===== GLOBALS ===== #
+BATCH_CHUNK_LINES = 5000  # Lines per process-pool task
+CHECK_DEFAULTS = {"batch": "", "out": "", "workers": 1, "mode": "", "smode": "", "bypass": "", "extrasafe": "", "read": "", "write": ""}
+
+_WORKER_TABLE: Optional[PolicyTable] = None
+#-#
+
+"""
+╔══════════════════════════════════════════════════════╗
+║     ██╗██████╗  █████╗ ██╗     ██╗ █████╗██╗   ██╗   ║
+║    ██╔╝██╔══██╗██╔══██╗██║     ██║██╔═══╝╚██╗ ██╔╝   ║
+║   ██╔╝ ██████╔╝██║  ██║██║     ██║██║     ╚████╔╝    ║
+║  ██╔╝  ██╔═══╝ ██║  ██║██║     ██║██║      ╚██╔╝     ║
+║ ██╔╝   ██║     ╚█████╔╝███████╗██║╚█████╗   ██║      ║
+║ ╚═╝    ╚═╝      ╚════╝ ╚══════╝╚═╝ ╚════╝   ╚═╝      ║
+╚══════════════════════════════════════════════════════╝
+Enforcement policy inspection and verification
+"""
+
+# ===== FUNCTIONS ===== #
+
+#!> Batch evaluation
+def parse_check_args(args: List[str]) -> Dict[str, Any]:
+    """Parse `check` arguments: key=value pairs, plus `--batch FILE` / `--out FILE` / `--workers N`."""
+    params = dict(CHECK_DEFAULTS)
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith('--') and arg[2:] in params:
+            if i + 1 >= len(args): raise ValueError(f"{arg} requires a value")
+            key, value = arg[2:], args[i + 1]
+            i += 2
+        elif '=' in arg:
+            key, value = arg.split('=', 1)
+            i += 1
+        else: raise ValueError(f"Expected key=value or --option value, got: {arg}")
+        if key not in params: raise ValueError(f"Unknown parameter: {key}. Valid: {', '.join(params)}")
+        params[key] = value
+    try: params["workers"] = max(1, int(params["workers"]))
+    except ValueError: raise ValueError(f"Invalid value for workers: {params['workers']}")
+    if not params["batch"]: raise ValueError("policy check requires --batch <calls.jsonl>")
+    return params
+
+_TRUE_FLAGS, _FALSE_FLAGS = ('1', 'true', 'yes', 'on'), ('0', 'false', 'no', 'off')
+
+def _flag(value: Any) -> bool:
+    return str(value).strip().lower() in _TRUE_FLAGS
+
+def _strict_flag(name: str, value: Any) -> bool:
+    """_flag for values in batch input lines: anything but a true/false spelling is an error, not False."""
+    text = str(value).strip().lower()
+    if text in _TRUE_FLAGS: return True
+    if text in _FALSE_FLAGS: return False
+    raise ValueError(f"Invalid {name} value: {value!r}. Use true or false")
+
+def build_check_config(params: Dict[str, Any]) -> SessionsConfig:
+    """Project config with the what-if overrides (extrasafe=, read=, write=) applied."""
+    config = load_config()
+    if params.get("extrasafe", "") != "": config.blocked_actions.extrasafe = _flag(params["extrasafe"])
+    config.blocked_actions.bash_read_patterns += [p for p in params.get("read", "").split(",") if p]
+    config.blocked_actions.bash_write_patterns += [p for p in params.get("write", "").split(",") if p]
+    return config
+
+def check_context(params: Dict[str, Any]) -> Tuple[Mode, SpecializedMode, bool]:
+    """Default (mode, specialized_mode, bypass) for calls that don't carry their own: params, else current state."""
+    state = load_state() if not (params["mode"] and params["smode"] and params["bypass"] != "") else None
+    try:
+        mode = Mode(params["mode"]) if params["mode"] else state.mode
+        smode = SpecializedMode(params["smode"]) if params["smode"] else state.specialized_mode
+    except ValueError as e: raise ValueError(f"{e}. Modes: {', '.join(m.value for m in Mode)}; specialized: {', '.join(m.value for m in SpecializedMode)}")
+    bypass = _flag(params["bypass"]) if params["bypass"] != "" else state.flags.bypass_mode
+    return mode, smode, bypass
+
+def iter_tool_calls(line: str) -> Iterator[Dict[str, Any]]:
+    """Tool calls in one input line: hook input ({"tool_name", "tool_input", ...}) or a transcript entry with tool_use blocks."""
+    obj = json.loads(line)
+    if not isinstance(obj, dict): raise ValueError(f"expected a JSON object, got {type(obj).__name__}")
+    if "tool_name" in obj:
+        yield obj
+        return
+    content = obj.get("message", {}).get("content") if isinstance(obj.get("message"), dict) else None
+    if isinstance(content, list):
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "tool_use":
+                yield {"tool_name": block.get("name", ""), "tool_input": block.get("input") or {}}
+
+def evaluate_lines(table: PolicyTable, lines: List[Tuple[int, str]], context: Tuple[Mode, SpecializedMode, bool]) -> List[Dict[str, Any]]:
+    """Evaluate numbered input lines and return one verdict record per tool call."""
+    out = []
+    verdicts: Dict[str, bool] = {}  # Repeated commands are classified once
+    for lineno, line in lines:
+        try: calls = list(iter_tool_calls(line))
+        except ValueError as e:  # Includes json.JSONDecodeError
+            out.append({"line": lineno, "verdict": "error", "reason": f"invalid input: {e}"})
+            continue
+        for call in calls:
+            tool = call.get("tool_name", "")
+            tool_input = call.get("tool_input") or {}
+            if not isinstance(tool, str) or not isinstance(tool_input, dict):
+                out.append({"line": lineno, "tool": str(tool), "verdict": "error", "reason": "invalid input: tool_name must be a string and tool_input an object"})
+                continue
+            mode, smode, bypass = context
+            try:
+                if "mode" in call: mode = Mode(call["mode"])
+                if "specialized_mode" in call: smode = SpecializedMode(call["specialized_mode"])
+                if "bypass" in call: bypass = _strict_flag("bypass", call["bypass"])
+            except ValueError as e:
+                out.append({"line": lineno, "tool": tool, "verdict": "error", "reason": str(e)})
+                continue
+            decision = table.lookup(mode, smode, bypass, tool)
+            record = {"line": lineno, "tool": tool}
+            if decision.action is Action.CLASSIFY_BASH:
+                command = str(tool_input.get("command", "")).strip()
+                key = normalize_command(command)
+                if key not in verdicts: verdicts[key] = table.classifier.is_read_only(key)
+                decision = table.decide_bash(command, is_read_only=lambda _c: verdicts[key])
+                record["command"] = command[:200]
+            record["verdict"] = decision.action.value
+            record["reason"] = decision.reason
+            out.append(record)
+    return out
+
+def _init_worker(params: Dict[str, Any]) -> None:
+    global _WORKER_TABLE
+    _WORKER_TABLE = PolicyTable(build_check_config(params)).compile()
+
+def _evaluate_chunk(args: Tuple[List[Tuple[int, str]], Tuple[str, str, bool]]) -> List[Dict[str, Any]]:
+    lines, (mode, smode, bypass) = args
+    return evaluate_lines(_WORKER_TABLE, lines, (Mode(mode), SpecializedMode(smode), bypass))
+
+def run_batch_check(params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Evaluate every call in params["batch"]; returns (verdict records, summary)."""
+    path = Path(params["batch"])
+    if not path.exists(): raise ValueError(f"Batch file not found: {path}")
+    start = time.perf_counter()
+    lines = [(n, line) for n, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1) if line.strip()]
+    context = check_context(params)
+    config = build_check_config(params)
+
+    if params["workers"] > 1 and len(lines) > BATCH_CHUNK_LINES:
+        chunks = [lines[i:i + BATCH_CHUNK_LINES] for i in range(0, len(lines), BATCH_CHUNK_LINES)]
+        plain_context = (context[0].value, context[1].value, context[2])
+        with ProcessPoolExecutor(max_workers=params["workers"], initializer=_init_worker, initargs=(params,)) as pool:
+            results = [r for chunk_out in pool.map(_evaluate_chunk, [(c, plain_context) for c in chunks]) for r in chunk_out]
+    else:
+        results = evaluate_lines(PolicyTable(config).compile(), lines, context)
+
+    elapsed = time.perf_counter() - start
+    counts: Dict[str, int] = {}
+    for record in results: counts[record["verdict"]] = counts.get(record["verdict"], 0) + 1
+    summary = {
+        "calls": len(results),
+        "verdicts": counts,
+        "elapsed_s": round(elapsed, 4),
+        "calls_per_s": round(len(results) / elapsed) if elapsed else 0,
+        "workers": params["workers"],
+        "context": {"mode": context[0].value, "specialized_mode": context[1].value, "bypass": context[2]},
+        "config": policy_fingerprint(config),
+    }
+    return results, summary
+#!<
+
+#!> Policy command handler
+def handle_policy_command(args: List[str], json_output: bool = False, from_slash: bool = False) -> Any:
+    """
+    Handle enforcement policy commands.
+
+    Usage:
+        policy verify                - Check the compiled decision table against the step-by-step rules
+        policy table [mode] [smode]  - Show compiled static decisions
+        policy check --batch FILE [out=FILE] [workers=N] [mode=..] [smode=..] [bypass=..]
+                     [extrasafe=0|1] [read=a,b] [write=c,d]
+                                     - Evaluate recorded tool calls, NDJSON verdicts
+    """
+    args = [a for a in args if a != '--from-slash']
+    if not args or args[0].lower() == 'help': return format_policy_help()
+
+    action = args[0].lower()
+
+    if action == 'verify':
+        config = load_config()
+        mismatches = verify_policy_table(config)
+        table = compile_policy(config)
+        result = {"fingerprint": policy_fingerprint(config), "rows": len(table.table), "mismatches": mismatches, "equivalent": not mismatches}
+        if json_output: return result
+        if not mismatches: return f"✓ Policy table matches the enforcement rules ({result['rows']} rows, config {result['fingerprint'][:12]})"
+        return "✗ Policy table differs from the enforcement rules:\n" + "\n".join(f"  {m}" for m in mismatches)
+
+    elif action == 'check':
+        params = parse_check_args(args[1:])
+        results, summary = run_batch_check(params)
+        if params["out"]:
+            with open(params["out"], "w", encoding="utf-8") as f:
+                for record in results: f.write(json.dumps(record) + "\n")
+            if json_output: return summary
+            return (f"Checked {summary['calls']} calls in {summary['elapsed_s']}s ({summary['calls_per_s']}/s) -> {params['out']}\n"
+                    + "  " + ", ".join(f"{k}={v}" for k, v in sorted(summary["verdicts"].items())))
+        if json_output: return {"summary": summary, "results": results}
+        return "\n".join(json.dumps(record) for record in results)
+
+    elif action == 'table':
+        try:
+            mode_filter = Mode(args[1]) if len(args) > 1 else None
+            smode_filter = SpecializedMode(args[2]) if len(args) > 2 else None
+        except ValueError as e:
+            if from_slash: return f"{e}\n\n{format_policy_help()}"
+            raise ValueError(f"{e}. Modes: {', '.join(m.value for m in Mode)}; specialized modes: {', '.join(m.value for m in SpecializedMode)}")
+        table = compile_policy(load_config())
+        rows = [
+            {"mode": mode.value, "specialized_mode": smode.value, "bypass": bypass, "tool": tool, "action": decision.action.value, "reason": decision.reason}
+            for (mode, smode, bypass, tool), decision in sorted(table.table.items(), key=lambda kv: (kv[0][0].value, kv[0][1].value, kv[0][2], kv[0][3]))
+            if (mode_filter is None or mode is mode_filter) and (smode_filter is None or smode is smode_filter)]
+        if json_output: return {"rows": rows}
+        lines = [f"{'mode':<15} {'smode':<12} {'bypass':<6} {'tool':<13} decision"]
+        for row in rows:
+            if row["action"] == Action.CONTINUE.value and row["bypass"]: continue  # Bypass rows are all "continue"
+            lines.append(f"{row['mode']:<15} {row['specialized_mode']:<12} {str(row['bypass']):<6} {row['tool']:<13} {row['action']} ({row['reason']})")
+        return "\n".join(lines)
+
+    else:
+        if from_slash: return f"Unknown policy command: {action}\n\n{format_policy_help()}"
+        raise ValueError(f"Unknown policy command: {action}. Valid: verify, table, check")
+
+def format_policy_help() -> str:
+    """Format help output for policy commands."""
+    lines = [
+        "Sessions Policy Commands:",
+        "",
+        "  policy verify                - Check the compiled decision table against the step-by-step rules",
+        "  policy table [mode] [smode]  - Show compiled decisions (bypass rows omitted; use --json for all)",
+        "  policy check --batch FILE    - Evaluate recorded tool calls, one NDJSON verdict per call",
+        "      out=FILE                 Write verdicts to FILE and print a summary",
+        "      workers=N                Evaluate across N processes",
+        "      mode= smode= bypass=     Context for calls that don't carry their own (default: current state)",
+        "      extrasafe=0|1 read=a,b write=c,d   What-if overrides on top of the project config",
+        "",
+        "Input lines are hook inputs ({\"tool_name\", \"tool_input\"}, optionally \"mode\", \"specialized_mode\",",
+        "\"bypass\") or transcript entries; verdicts are allow, block or continue (passes static rules,",
+        "subject to stateful checks such as branch enforcement).",
+        "",
+        "Examples:",
+        "  sessions policy verify",
+        "  sessions policy table discussion code_review",
+        "  sessions policy check --batch calls.jsonl mode=discussion extrasafe=1 out=verdicts.ndjson",
+    ]
+    return "\n".join(lines)
+#!<
+
+#-#
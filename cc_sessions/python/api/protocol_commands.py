@@ -13,6 +13,7 @@ from pathlib import Path
 
 ## ===== LOCAL ===== ##
 from hooks.shared_state import load_state, edit_state, TaskState, SessionsProtocol, PROJECT_ROOT
+from hooks.git_meta import build_repo_map, REPO_MAP_KEY
 ##-##
 
 #-#
@@ -147,6 +148,7 @@ def handle_startup_load(args: List[str], json_output: bool = False) -> Any:
         # Update the current task in state
         with edit_state() as s:
             s.current_task = task_data
+            s.metadata[REPO_MAP_KEY] = build_repo_map(PROJECT_ROOT)
             # Clear the startup_load permission after use
             s.api.startup_load = False
         
@@ -23,6 +23,8 @@ from api.task_commands import handle_task_command
 from api.uninstall_commands import handle_uninstall_command
 from api.learning_commands import route_learning_command
 from api.specialized_mode_commands import route_specialized_mode_command
+from api.perf_commands import handle_perf_command
+from api.policy_commands import handle_policy_command
 ##-##
 
 #-#
@@ -40,6 +42,7 @@ def handle_learnings_command(args: List[str], json_output: bool = False, from_sl
 
 def handle_specialized_mode_command(args: List[str], json_output: bool = False, from_slash: bool = False) -> Any:
     """Handle specialized mode commands"""
+    args = [a for a in args if a != '--from-slash']  # Mode arguments are stored, so drop the router's marker
     if not args:
         return HELP_MESSAGES.get("specialized_mode", "Use: sessions smode <subcommand> [args...]")
     subcmd = args[0]
@@ -60,6 +63,8 @@ COMMAND_HANDLERS = {
     'learnings': handle_learnings_command,
     'smode': handle_specialized_mode_command,
     'uninstall': handle_uninstall_command,
+    'perf': handle_perf_command,
+    'policy': handle_policy_command,
 }
 
 # Register kickstart handler only if the module is available
@@ -69,12 +74,14 @@ if _HAS_KICKSTART and callable(handle_kickstart_command):
 # Help dictionary for progressive disclosure
 HELP_MESSAGES = {
     "root": """Available subsystems:
-  state     - show, mode, task, todos, flags, update
-  config    - show, phrases, git, env, features, read, write, tools
+  state     - show, mode, task, todos, flags, update, history, undo
+  config    - show, phrases, git, env, features, statusline, snapshots, read, write, tools
   tasks     - idx, start
   learnings - list, show, add, relevant, init, enable, disable, status
   smode     - list, enter, exit, current (specialized modes)
   protocol  - startup-load
+  perf      - bench, results, report
+  policy    - verify, table, check
   uninstall - Remove cc-sessions framework""" + ("""
   kickstart - full, subagents, next, complete""" if _HAS_KICKSTART else ""),
 
@@ -84,7 +91,9 @@ HELP_MESSAGES = {
   task <action>    - Manage task (clear, show, restore <file>)
   todos <action>   - Manage todos (clear)
   flags <action>   - Manage flags (clear, clear-context)
-  update <action>  - Manage updates (status, suppress, check)""",
+  update <action>  - Manage updates (status, suppress, check)
+  history [n]      - Show the last n state revisions
+  undo [n]         - Revert the last n state revisions""",
 
     "config": """Available config commands:
   show             - Display current configuration
@@ -92,6 +101,8 @@ HELP_MESSAGES = {
   git <action>     - Manage git preferences (show, add, branch, commit, merge, push, repo)
   env <action>     - Manage environment (show, os, shell, name)
   features <action> - Manage features (show, set, toggle)
+  statusline <action> - Manage statusline settings (show, set)
+  snapshots <action> - Manage subagent snapshot pruning (show, set)
   read <action>    - Manage bash read patterns (list, add, remove)
   write <action>   - Manage bash write patterns (list, add, remove)
   tools <action>   - Manage blocked tools (list, block, unblock)""",
@@ -125,6 +136,18 @@ Valid categories: go, no, create, start, complete, compact""",
 
 Features: branch_enforcement, task_detection, auto_ultrathink, icon_style, warn_85, warn_90""",
 
+    "config.statusline": """Available statusline commands:
+  show                  - Display statusline settings and layout
+  set <key> <value>     - Set cache_ttl, render_deadline_ms or latency_warn_ms
+  segments              - List built-in and custom segments
+  layout <line> ...     - Set lines of segments (e.g. "context task" "mode edited branch"), or reset
+  custom add <name> <command> [input=<path> ...] [ttl=<seconds>] - Add a command segment (slash command only)
+  custom remove <name>  - Remove a custom segment (slash command only)""",
+
+    "config.snapshots": """Available snapshots commands:
+  show                  - Display subagent snapshot pruning settings
+  set <key> <value>     - Set prune, tool_result_max_chars, excerpt_chars, dedupe_reads or collapse_failures""",
+
     "config.read": """Available read commands:
   list              - List all bash read patterns
   add <pattern>     - Add pattern to read list
@@ -156,15 +179,28 @@ Features: branch_enforcement, task_detection, auto_ultrathink, icon_style, warn_
   disable         - Disable automatic learning loading
   status          - Show learning system status""",
 
+    "perf": """Available perf commands:
+  bench list                     - List benchmark suites and default parameters
+  bench <suite> [key=value ...]  - Run a benchmark suite and record the result
+  results [suite] [n]            - Show recorded benchmark results
+  report                         - Show runtime counters (cache hit rates, ...)""",
+
+    "policy": """Available policy commands:
+  verify                - Check the compiled decision table against the step-by-step rules
+  table [mode] [smode]  - Show compiled static decisions
+  check --batch FILE    - Evaluate recorded tool calls, NDJSON verdicts (out=, workers=, mode=, smode=, bypass=, extrasafe=, read=, write=)""",
+
     "specialized_mode": """Available specialized mode commands:
   list                     - List all available specialized modes
   enter <mode> [args...]   - Enter a specialized mode (code_review, refactor, debug, optimize, document)
+                             Path/glob args scope Write/Edit to those paths
   exit                     - Exit current specialized mode
   current                  - Show current specialized mode
 
 Examples:
   sessions smode enter code_review src/
   sessions smode enter refactor myfile.py
+  sessions smode enter refactor src/auth 'tests/*_auth.py'
   sessions smode exit""",
 }
 
@@ -226,7 +262,7 @@ def route_command(command: str, args: List[str], json_output: bool = False, from
         subsystem_args = args[1:] if len(args) > 1 else []
 
         # Route to appropriate subsystem
-        subsystems = ['tasks', 'state', 'config', 'learnings', 'uninstall']
+        subsystems = ['tasks', 'state', 'config', 'learnings', 'uninstall', 'perf', 'policy']
         if _HAS_KICKSTART: subsystems.append('kickstart')
         if subsystem in subsystems: return route_command(subsystem, subsystem_args,
                                                          json_output=json_output, from_slash=True)
@@ -246,7 +282,7 @@ def route_command(command: str, args: List[str], json_output: bool = False, from
     if from_slash:
         try:
             # Pass from_slash to commands that support it
-            if command in ['config', 'state', 'tasks', 'learnings', 'uninstall']:
+            if command in ['config', 'state', 'tasks', 'learnings', 'uninstall', 'perf', 'policy']:
                 return handler(args, json_output=json_output, from_slash=from_slash)
             else:
                 # For commands that don't support from_slash, add it to args for backward compatibility
@@ -259,7 +295,7 @@ def route_command(command: str, args: List[str], json_output: bool = False, from
             return resolve_help([command])
     else:
         # Normal API calls - let exceptions propagate
-        if command in ['config', 'state', 'tasks', 'learnings', 'uninstall']:
+        if command in ['config', 'state', 'tasks', 'learnings', 'uninstall', 'perf', 'policy']:
             return handler(args, json_output=json_output, from_slash=from_slash)
         else:
             # For commands that don't support from_slash, add it to args for backward compatibility
@@ -280,12 +316,16 @@ def format_slash_help() -> str:
         "  /sessions state task <action>   - Manage task (clear, show, restore <file>)",
         "  /sessions state todos <action>  - Manage todos (clear)",
         "  /sessions state flags <action>  - Manage flags (clear, clear-context)",
-        "  /sessions state update ...      - Manage update notifications (status, suppress, check)", "",
+        "  /sessions state update ...      - Manage update notifications (status, suppress, check)",
+        "  /sessions state history [n]     - Show recent state revisions",
+        "  /sessions state undo [n]        - Revert the last n state revisions", "",
         "### Config", "  /sessions config show           - Display current configuration",
         "  /sessions config trigger ...    - Manage trigger phrases",
         "  /sessions config git ...        - Manage git preferences",
         "  /sessions config env ...        - Manage environment settings",
         "  /sessions config features ...   - Manage feature toggles",
+        "  /sessions config statusline ... - Manage statusline settings",
+        "  /sessions config snapshots ...  - Manage subagent snapshot pruning",
         "  /sessions config read ...       - Manage bash read patterns",
         "  /sessions config write ...      - Manage bash write patterns",
         "  /sessions config tools ...      - Manage blocked tools", "",
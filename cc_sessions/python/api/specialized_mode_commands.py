@@ -7,20 +7,16 @@ import json
 from pathlib import Path
 from typing import List, Optional
 
-# Add project root to path for imports
-PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.insert(0, str(PROJECT_ROOT))
-
-from cc_sessions.python.hooks.shared_state import (
-    load_state, save_state, SpecializedMode, SPECIALIZED_MODE_CONFIGS,
-    Mode, IconStyle, get_config
+from hooks.shared_state import (
+    load_state, edit_state, SpecializedMode, SPECIALIZED_MODE_CONFIGS,
+    Mode, IconStyle, load_config, PROJECT_ROOT
 )
+from hooks.path_scope import compile_scope, SCOPE_KEY
 
 
 def cmd_list_modes(args: List[str], json_output: bool = False) -> None:
     """List all available specialized modes with descriptions."""
-    CONFIG = get_config()
+    CONFIG = load_config()
     icon_style = CONFIG.features.icon_style
 
     if json_output:
@@ -96,22 +92,27 @@ def cmd_enter_mode(args: List[str], json_output: bool = False) -> None:
         print(f"Error: No configuration found for mode '{mode_name}'.", file=sys.stderr)
         sys.exit(1)
 
+    # Path arguments fence Write/Edit to those paths (compiled once here, matched by sessions_enforce)
+    scope = compile_scope(mode_args, PROJECT_ROOT)
+
     # Update state
-    STATE = load_state()
-    STATE.specialized_mode = mode
+    with edit_state() as STATE:
+        STATE.specialized_mode = mode
 
-    # Store mode arguments in metadata if provided
-    if mode_args:
-        if 'specialized_mode_args' not in STATE.metadata:
-            STATE.metadata['specialized_mode_args'] = {}
-        STATE.metadata['specialized_mode_args'][mode.value] = mode_args
+        # Store mode arguments in metadata if provided
+        if mode_args:
+            if 'specialized_mode_args' not in STATE.metadata:
+                STATE.metadata['specialized_mode_args'] = {}
+            STATE.metadata['specialized_mode_args'][mode.value] = mode_args
 
-    save_state(STATE)
+        if scope: STATE.metadata.setdefault(SCOPE_KEY, {})[mode.value] = scope
+        elif SCOPE_KEY in STATE.metadata: STATE.metadata[SCOPE_KEY].pop(mode.value, None)
 
     if json_output:
         result = {
             "mode": mode.value,
             "arguments": mode_args,
+            "scope": scope["patterns"] if scope else None,
             "config": {
                 "description": config.description,
                 "allowed_tools": [t.value for t in config.allowed_tools],
@@ -121,7 +122,7 @@ def cmd_enter_mode(args: List[str], json_output: bool = False) -> None:
         print(json.dumps(result, indent=2))
         return
 
-    CONFIG = get_config()
+    CONFIG = load_config()
     icon_style = CONFIG.features.icon_style
 
     if icon_style == IconStyle.NERD_FONTS:
@@ -135,6 +136,8 @@ def cmd_enter_mode(args: List[str], json_output: bool = False) -> None:
     print(f"  Description: {config.description}")
     if mode_args:
         print(f"  Arguments: {' '.join(mode_args)}")
+    if scope:
+        print(f"  Scope: {', '.join(scope['patterns'])} (Write/Edit outside these paths are blocked)")
     print(f"\n  To exit this mode, use one of these phrases:")
     for phrase in config.exit_phrases:
         print(f"    - \"{phrase}\"")
@@ -143,21 +146,20 @@ def cmd_enter_mode(args: List[str], json_output: bool = False) -> None:
 
 def cmd_exit_mode(args: List[str], json_output: bool = False) -> None:
     """Exit the current specialized mode and return to normal mode."""
-    STATE = load_state()
-
-    previous_mode = STATE.specialized_mode
+    previous_mode = load_state().specialized_mode
     if previous_mode == SpecializedMode.NONE:
         if not json_output:
             print("Not currently in a specialized mode.")
         return
 
-    STATE.specialized_mode = SpecializedMode.NONE
-
-    # Clear mode arguments from metadata
-    if 'specialized_mode_args' in STATE.metadata:
-        STATE.metadata['specialized_mode_args'].pop(previous_mode.value, None)
+    with edit_state() as STATE:
+        STATE.specialized_mode = SpecializedMode.NONE
 
-    save_state(STATE)
+        # Clear mode arguments and scope from metadata
+        if 'specialized_mode_args' in STATE.metadata:
+            STATE.metadata['specialized_mode_args'].pop(previous_mode.value, None)
+        if SCOPE_KEY in STATE.metadata:
+            STATE.metadata[SCOPE_KEY].pop(previous_mode.value, None)
 
     if json_output:
         result = {
@@ -167,7 +169,7 @@ def cmd_exit_mode(args: List[str], json_output: bool = False) -> None:
         print(json.dumps(result, indent=2))
         return
 
-    CONFIG = get_config()
+    CONFIG = load_config()
     icon_style = CONFIG.features.icon_style
 
     if icon_style == IconStyle.NERD_FONTS:
@@ -185,16 +187,18 @@ def cmd_exit_mode(args: List[str], json_output: bool = False) -> None:
 def cmd_current_mode(args: List[str], json_output: bool = False) -> None:
     """Show the current specialized mode."""
     STATE = load_state()
-    CONFIG = get_config()
+    CONFIG = load_config()
     icon_style = CONFIG.features.icon_style
 
     current_mode = STATE.specialized_mode
     mode_args = STATE.metadata.get('specialized_mode_args', {}).get(current_mode.value, [])
+    scope = STATE.metadata.get(SCOPE_KEY, {}).get(current_mode.value)
 
     if json_output:
         result = {
             "mode": current_mode.value,
-            "arguments": mode_args
+            "arguments": mode_args,
+            "scope": scope["patterns"] if scope else None
         }
         if current_mode != SpecializedMode.NONE:
             config = SPECIALIZED_MODE_CONFIGS.get(current_mode)
@@ -225,6 +229,8 @@ def cmd_current_mode(args: List[str], json_output: bool = False) -> None:
         print(f"  Description: {config.description}")
     if mode_args:
         print(f"  Arguments: {' '.join(mode_args)}")
+    if scope:
+        print(f"  Scope: {', '.join(scope['patterns'])}")
     print()
 
 
@@ -12,7 +12,8 @@ import json
 ##-##
 
 ## ===== LOCAL ===== ##
-from hooks.shared_state import load_state, edit_state, Mode, TodoStatus, TaskState
+from hooks.shared_state import load_state, edit_state, Mode, TodoStatus, TaskState, PROJECT_ROOT, read_state_history, undo_state, StateError
+from hooks.git_meta import build_repo_map, REPO_MAP_KEY
 from dataclasses import asdict
 ##-##
 
@@ -49,6 +50,8 @@ def handle_state_command(args: List[str], json_output: bool = False, from_slash:
         state task <action>         - Manage current task
         state todos <action>        - Manage todos
         state flags <action>        - Manage flags
+        state history [n]           - Show the last n state revisions
+        state undo [n]              - Revert the last n state revisions
     """
     # Handle help command
     if not args or (args and args[0].lower() in ['help', '']):
@@ -71,6 +74,8 @@ def handle_state_command(args: List[str], json_output: bool = False, from_slash:
     elif section == 'todos': return handle_todos_command(section_args, json_output)
     elif section == 'flags': return handle_flags_command(section_args, json_output)
     elif section == 'update': return handle_update_command(section_args, json_output, from_slash)
+    elif section == 'history': return handle_history_command(section_args, json_output)
+    elif section == 'undo': return handle_undo_command(section_args, json_output, from_slash)
     else:
         # For backward compatibility, support direct component access
         component = section
@@ -123,6 +128,8 @@ def format_state_help() -> str:
         "  /sessions state todos <action>  - Manage todos (clear)",
         "  /sessions state flags <action>  - Manage flags (clear, clear-context)",
         "  /sessions state update ...      - Manage update notifications (see update help)",
+        "  /sessions state history [n]     - Show the last n state revisions (default 10)",
+        "  /sessions state undo [n]        - Revert the last n state revisions (default 1)",
         "",
         "Mode Aliases:",
         "  no   → discussion mode",
@@ -137,6 +144,9 @@ def format_state_help() -> str:
         "  Bypass mode:",
         "    • Deactivation: Available anytime (return to normal DAIC enforcement)",
         "    • Activation: Requires user-initiated slash command (safety mechanism)",
+        "  Undo:",
+        "    • API undo cannot restore implementation mode or bypass mode",
+        "    • Undoing a TodoWrite revert (todos + mode) requires the slash command",
         "  Permission-based operations:",
         "    • 'todos clear' requires special permission flag (api.todos_clear)",
         "    • Only available immediately after session restoration",
@@ -443,7 +453,9 @@ def handle_task_command(args: List[str], json_output: bool = False, from_slash:
             raise ValueError(f"Failed to restore task: {str(e)}")
 
         # Update state with loaded task
-        with edit_state() as s: s.current_task = task_state
+        with edit_state() as s:
+            s.current_task = task_state
+            s.metadata[REPO_MAP_KEY] = build_repo_map(PROJECT_ROOT)
 
         # Guidance message for Claude
         guidance = f"\n\nTask restored. If you don't have sessions/tasks/{task_file} in your context, read it to understand the task requirements."
@@ -459,6 +471,58 @@ def handle_task_command(args: List[str], json_output: bool = False, from_slash:
         raise ValueError(f"Unknown task action: {action}. Valid actions: {valid_actions}")
 #!<
 
+#!> History and undo handlers
+def _parse_count(args: List[str], default: int, what: str) -> int:
+    if not args: return default
+    try: n = int(args[0])
+    except ValueError: raise ValueError(f"{what} count must be a positive integer, got: {args[0]}")
+    if n < 1: raise ValueError(f"{what} count must be a positive integer, got: {args[0]}")
+    return n
+
+def _describe_ops(ops: List[dict]) -> str:
+    paths = [".".join(str(k) for k in op.get("p", [])) for op in ops]
+    if len(paths) > 4: paths = paths[:4] + [f"+{len(paths) - 4} more"]
+    return ", ".join(paths)
+
+def handle_history_command(args: List[str], json_output: bool = False) -> Any:
+    """
+    Show recorded state revisions (newest last).
+
+    Usage:
+        history [n]  - Show the last n revisions (default 10)
+    """
+    records = read_state_history(limit=_parse_count(args, 10, "History"))
+    if json_output: return {"history": records}
+    if not records: return "No state history recorded"
+
+    lines = ["State History:"]
+    for record in records:
+        ts = record.get("ts", "")[:19].replace("T", " ")
+        lines.append(f"  rev {record.get('rev'):>4}  {ts}  {record.get('src', '?'):<18} {_describe_ops(record.get('ops', []))}")
+    lines.append("")
+    lines.append("Revert with: state undo [n]")
+    return "\n".join(lines)
+
+def handle_undo_command(args: List[str], json_output: bool = False, from_slash: bool = False) -> Any:
+    """
+    Revert the last n state revisions. The undo is recorded as a new revision.
+
+    Usage:
+        undo [n]  - Revert the last n revisions (default 1)
+
+    API callers cannot restore implementation mode or bypass mode; the user can via slash command.
+    """
+    steps = _parse_count(args, 1, "Undo")
+    try: state, reverted = undo_state(steps, allow_escalation=from_slash)
+    except StateError as e:
+        if from_slash: return f"Undo failed: {e}"
+        raise ValueError(str(e))
+
+    message = f"Reverted {len(reverted)} revision(s): {', '.join(str(r) for r in reverted)}"
+    if json_output: return {"reverted": reverted, "mode": state.mode.value, "message": message}
+    return f"{message}\nMode: {state.mode.value} | Active todos: {len(state.todos.active)}"
+#!<
+
 #!> Show subsection handler
 def handle_show_command(args: List[str], json_output: bool = False) -> Any:
     """
@@ -23,6 +23,7 @@ from hooks.shared_state import (
     get_task_file_path,
     is_directory_task
 )
+from hooks.git_meta import build_repo_map, REPO_MAP_KEY
 ##-##
 
 #-#
@@ -379,6 +380,7 @@ To restore the previous task later:
             submodules=frontmatter.get('submodules')
         )
         s.current_task = task_state
+        s.metadata[REPO_MAP_KEY] = build_repo_map(PROJECT_ROOT)
         s.active_protocol = SessionsProtocol.START
         s.api.startup_load = True
         s.todos.clear_active()
@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""
+Bash Command Classifier
+
+Single-pass tokenizer/parser for the bash subset agents emit, plus the
+read-only classifier used by DAIC enforcement:
+- Parses a command string once into a command tree (lists, pipelines,
+  subshells, brace groups, $(...) / backtick / process substitutions)
+- Classifies every simple command in the tree; one write-like command
+  makes the whole command write-like
+- Any redirection (>, >>, <, <<, 2>&1, &>, heredocs) is write-like
+"""
+
+# ===== IMPORTS ===== #
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Iterable, Iterator, Optional, Union, Tuple
+from pathlib import Path
+import re, os, json, time, struct, hashlib, tempfile
+
+# ===== GLOBALS ===== #
+CLASSIFIER_VERSION = 3  # Bump when verdicts change for the same input; invalidates verdict caches
+
+READONLY_COMMANDS = frozenset({
+    # Basic file reading
+    'cat', 'less', 'more', 'head', 'tail', 'wc', 'nl', 'tac', 'rev',
+    # Text search and filtering
+    'grep', 'egrep', 'fgrep', 'rg', 'ripgrep', 'ag', 'ack',
+    # Text processing (all safe for reading)
+    'sort', 'uniq', 'cut', 'paste', 'join', 'comm', 'column',
+    'tr', 'expand', 'unexpand', 'fold', 'fmt', 'pr', 'shuf', 'tsort',
+    # Comparison
+    'diff', 'cmp', 'sdiff', 'vimdiff',
+    # Checksums
+    'md5sum', 'sha1sum', 'sha256sum', 'sha512sum', 'cksum', 'sum',
+    # Binary inspection
+    'od', 'hexdump', 'xxd', 'strings', 'file', 'readelf', 'objdump', 'nm',
+    # File system inspection
+    'ls', 'dir', 'vdir', 'pwd', 'which', 'type', 'whereis', 'locate', 'find',
+    'basename', 'dirname', 'readlink', 'realpath', 'stat',
+    # User/system info
+    'whoami', 'id', 'groups', 'users', 'who', 'w', 'last', 'lastlog',
+    'hostname', 'uname', 'arch', 'lsb_release', 'hostnamectl',
+    'date', 'cal', 'uptime', 'df', 'du', 'free', 'vmstat', 'iostat',
+    # Process monitoring
+    'ps', 'pgrep', 'pidof', 'top', 'htop', 'iotop', 'atop',
+    'lsof', 'jobs', 'pstree', 'fuser',
+    # Network monitoring
+    'netstat', 'ss', 'ip', 'ifconfig', 'route', 'arp',
+    'ping', 'traceroute', 'tracepath', 'mtr', 'nslookup', 'dig', 'host', 'whois',
+    # Environment
+    'printenv', 'env', 'set', 'export', 'alias', 'history', 'fc',
+    # Output
+    'echo', 'printf', 'yes', 'seq', 'jot',
+    # Testing
+    'test', '[', '[[', 'true', 'false',
+    # Calculation
+    'bc', 'dc', 'expr', 'factor', 'units',
+    # Modern tools
+    'jq', 'yq', 'xmlstarlet', 'xmllint', 'xsltproc',
+    'bat', 'fd', 'fzf', 'tree', 'ncdu', 'exa', 'lsd',
+    'tldr', 'cheat',
+    # Note: awk/sed are here but need special argument checking
+    'awk', 'sed', 'gawk', 'mawk', 'gsed',
+})
+
+WRITE_COMMANDS = frozenset({
+    # File operations
+    'rm', 'rmdir', 'unlink', 'shred',
+    'mv', 'rename', 'cp', 'install', 'dd',
+    'mkdir', 'mkfifo', 'mknod', 'mktemp', 'touch', 'truncate',
+    # Permissions
+    'chmod', 'chown', 'chgrp', 'umask',
+    'ln', 'link', 'symlink',
+    'setfacl', 'setfattr', 'chattr',
+    # System management
+    'useradd', 'userdel', 'usermod', 'groupadd', 'groupdel',
+    'passwd', 'chpasswd', 'systemctl', 'service',
+    # Package managers
+    'apt', 'apt-get', 'dpkg', 'snap', 'yum', 'dnf', 'rpm',
+    'pip', 'pip3', 'npm', 'yarn', 'gem', 'cargo',
+    # Build tools
+    'make', 'cmake', 'ninja', 'meson',
+    # Other dangerous
+    'sudo', 'doas', 'su', 'crontab', 'at', 'batch',
+    'kill', 'pkill', 'killall', 'tee',
+})
+
+# Commands that run another command given as their arguments
+WRAPPER_COMMANDS = frozenset({'env', 'command', 'builtin', 'exec', 'nice', 'nohup', 'time', 'timeout', 'stdbuf'})
+SHELL_COMMANDS = frozenset({'bash', 'sh', 'zsh', 'dash', 'ksh'})
+
+PIP_READ_SUBCOMMANDS = frozenset({'show', 'list', 'search', 'check', 'freeze', 'help'})
+NPM_READ_SUBCOMMANDS = frozenset({'list', 'ls', 'view', 'show', 'search', 'help'})
+
+# Reserved words that keep the parser in command position
+_PREFIX_KEYWORDS = frozenset({'!', 'if', 'then', 'else', 'elif', 'do', 'while', 'until'})
+_CLOSE_KEYWORDS = frozenset({'fi', 'done'})
+_UNSUPPORTED_KEYWORDS = frozenset({'case', 'esac', 'function', 'coproc', 'select'})
+
+_PLAIN = re.compile(r"[^ \t\r\n|&;()<>'\"\\`$]+")  # Only bash's blanks end a word (NBSP, \v, \f ... are word characters)
+_DQ_PLAIN = re.compile(r'[^"\\$`]+')
+_BRACE_PLAIN = re.compile(r'[^{}"\\$`<>]+')
+_FAST_WORD = re.compile(r"""(?:[^ \t\r\n|&;()<>'"\\`$]+|'[^']*'|"[^"\\$`]*")+""")  # words without escapes or expansions
+_QUOTED = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+_OPERATOR_START = frozenset('\n#)(;&|<>0123456789')
+_BLANK = re.compile(r"(?:[ \t\r]+|\\\n)+")
+_REDIR = re.compile(r"(?:\d+|&)?(?:>>|>\||>&|<<<|<<-|<<|<>|<&|>|<)")
+_ASSIGNMENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\[[^\]]*\])?\+?=")
+_AWK_FILE_OUTPUT = re.compile(r'>>?\s*["\'].*["\']')
+
+## ===== VERDICT CACHE ===== ##
+VERDICT_CACHE_SETS = 256
+VERDICT_CACHE_WAYS = 4       # 1024 verdicts, ~32KB on disk
+VERDICT_CACHE_MIN_KEY = 32   # Shorter commands classify faster than a cache round trip (~25us)
+VERDICT_CACHE_MAX_KEY = 4096 # Longer commands are classified without caching
+_VC_MAGIC = b"CCVC"
+_VC_HEADER = struct.Struct("<4sHHI16sQQ")  # magic, layout version, ways, sets, config fingerprint, hits, misses
+_VC_HEADER_SIZE = 64
+_VC_STATS_OFFSET = 28
+_VC_STATS = struct.Struct("<QQ")
+_VC_SLOT = struct.Struct("<16sB3xId")      # command digest, verdict, hits, last used (epoch seconds)
+_WS_SIGNIFICANT = re.compile(r"[\"'\\\n#`$]")
+_BLANK_RUN = re.compile(r"[ \t]+")
+##-##
+#-#
+
+# ===== DECLARATIONS ===== #
+
+## ===== EXCEPTIONS ===== ##
+class BashParseError(ValueError):
+    """Input is not valid bash (e.g. unterminated quote or substitution)."""
+
+class BashUnsupportedError(BashParseError):
+    """Valid bash that this parser deliberately does not model (case, functions, ...)."""
+##-##
+
+## ===== COMMAND TREE ===== ##
+@dataclass
+class SimpleCommand:
+    """One simple command: assignments, words (quotes removed), redirection operators
+    and any command lists nested in its words via substitution."""
+    words: List[str] = field(default_factory=list)
+    assignments: List[str] = field(default_factory=list)
+    redirects: List[str] = field(default_factory=list)
+    nested: List["CommandList"] = field(default_factory=list)
+
+@dataclass
+class CommandList:
+    """A sequence of commands joined by ; & && || | or newlines.
+    kind: script, subshell, group, substitution or process_substitution."""
+    kind: str = "script"
+    commands: List[Union[SimpleCommand, "CommandList"]] = field(default_factory=list)
+
+    def simple_commands(self) -> Iterator[SimpleCommand]:
+        """Yield every simple command in the tree, depth first."""
+        for node in self.commands:
+            if isinstance(node, CommandList): yield from node.simple_commands()
+            else:
+                yield node
+                for nested in node.nested: yield from nested.simple_commands()
+##-##
+
+#-#
+
+# ===== PARSER ===== #
+
+class _Parser:
+    """Recursive-descent scanner over one string; every character is visited once."""
+
+    __slots__ = ("s", "n", "pos", "heredocs")
+
+    def __init__(self, s: str):
+        self.s = s
+        self.n = len(s)
+        self.pos = 0
+        self.heredocs: List[Tuple[str, bool]] = []
+
+    def parse(self) -> CommandList:
+        tree = self.parse_list("script", None)
+        if self.pos < self.n: raise BashParseError(f"Unexpected {self.s[self.pos]!r} at {self.pos}")
+        return tree
+
+    #!> Lists and commands
+    def parse_list(self, kind: str, end: Optional[str]) -> CommandList:
+        """Parse commands until `end` (')' or '}') in command position, or EOF."""
+        s, n = self.s, self.n
+        out = CommandList(kind)
+        cmd = SimpleCommand()
+        while True:
+            m = _BLANK.match(s, self.pos)
+            if m: self.pos = m.end()
+            if self.pos >= n:
+                if end is not None: raise BashParseError(f"Missing {end!r}")
+                break
+            c = s[self.pos]
+            command_position = not cmd.words
+
+            if c not in _OPERATOR_START: pass  # plain word, the common case
+            elif c == '\n':
+                self.pos += 1
+                self.read_heredoc_bodies()
+                cmd = self.flush(out, cmd)
+                continue
+            elif c == '#':  # comment: '#' starting a token
+                nl = s.find('\n', self.pos)
+                self.pos = n if nl < 0 else nl
+                continue
+            elif c == ')':
+                if end != ')': raise BashParseError(f"Unexpected ')' at {self.pos}")
+                self.pos += 1
+                self.flush(out, cmd)
+                return out
+            elif c in ';&|':
+                if s.startswith('&>', self.pos):
+                    self.read_redirect(cmd)
+                    continue
+                if s.startswith(';;', self.pos): raise BashUnsupportedError("case clauses are not supported")
+                self.pos += 2 if s.startswith(('&&', '||', '|&'), self.pos) else 1
+                cmd = self.flush(out, cmd)
+                continue
+            elif c == '(':
+                if s.startswith('((', self.pos) and command_position:
+                    self.skip_arithmetic(self.pos + 2)  # (( expr )) has no side effects we classify
+                    continue
+                if not command_position: raise BashUnsupportedError("function definitions are not supported")
+                self.pos += 1
+                out.commands.append(self.parse_list("subshell", ')'))
+                continue
+            elif c in '<>':
+                if s.startswith(('<(', '>('), self.pos):
+                    self.pos += 2
+                    cmd.nested.append(self.parse_list("process_substitution", ')'))
+                    cmd.words.append('<(...)')
+                    continue
+                self.read_redirect(cmd)
+                continue
+            elif c.isdigit() and _REDIR.match(s, self.pos):
+                self.read_redirect(cmd)
+                continue
+
+            word, quoted = self.read_word(cmd.nested)
+            if command_position and not quoted:
+                if end == '}' and word == '}':
+                    self.flush(out, cmd)
+                    return out
+                if word in _PREFIX_KEYWORDS: continue
+                if word in _CLOSE_KEYWORDS: continue
+                if word == '{':
+                    out.commands.append(self.parse_list("group", '}'))
+                    continue
+                if word == 'for':
+                    self.skip_for_header(cmd)
+                    continue
+                if word in _UNSUPPORTED_KEYWORDS: raise BashUnsupportedError(f"{word} is not supported")
+                if _ASSIGNMENT.match(word):
+                    cmd.assignments.append(word)
+                    continue
+            cmd.words.append(word)
+        self.flush(out, cmd)
+        return out
+
+    def flush(self, out: CommandList, cmd: SimpleCommand) -> SimpleCommand:
+        if cmd.words or cmd.assignments or cmd.redirects or cmd.nested: out.commands.append(cmd)
+        return SimpleCommand()
+
+    def skip_for_header(self, cmd: SimpleCommand) -> None:
+        """Skip `for NAME [in WORDS]` (or `for ((...))`) up to the separator before `do`."""
+        s = self.s
+        self.skip_blank()
+        if s.startswith('((', self.pos):
+            self.skip_arithmetic(self.pos + 2)
+            return
+        while self.pos < self.n:
+            self.skip_blank()
+            if self.pos >= self.n or s[self.pos] in ';\n': return
+            self.read_word(cmd.nested)  # substitutions in the word list still get classified
+    #!<
+
+    #!> Tokens
+    def skip_blank(self) -> None:
+        m = _BLANK.match(self.s, self.pos)
+        if m: self.pos = m.end()
+
+    def read_redirect(self, cmd: SimpleCommand) -> None:
+        m = _REDIR.match(self.s, self.pos)
+        op = m.group()
+        cmd.redirects.append(op)
+        self.pos = m.end()
+        self.skip_blank()
+        target, quoted = self.read_word(cmd.nested)
+        if not target and not quoted: raise BashParseError(f"Missing redirection target after {op!r}")
+        if op.endswith(('<<', '<<-')): self.heredocs.append((target, op.endswith('-')))
+
+    def read_heredoc_bodies(self) -> None:
+        """After a newline, skip the bodies of pending heredocs."""
+        s = self.s
+        while self.heredocs:
+            delim, strip_tabs = self.heredocs.pop(0)
+            while self.pos < self.n:
+                nl = s.find('\n', self.pos)
+                line = s[self.pos:] if nl < 0 else s[self.pos:nl]
+                self.pos = self.n if nl < 0 else nl + 1
+                if (line.lstrip('\t') if strip_tabs else line) == delim: break
+            else: raise BashParseError(f"Unterminated heredoc {delim!r}")
+
+    def read_word(self, nested: List[CommandList]) -> Tuple[str, bool]:
+        """Read one word, removing quotes. Substitutions are parsed into `nested`.
+        Returns (text, was_quoted)."""
+        s, n = self.s, self.n
+        m = _FAST_WORD.match(s, self.pos)
+        if m and (m.end() == n or s[m.end()] not in '\\$`\'"'):
+            self.pos = m.end()
+            text = m.group()
+            if "'" not in text and '"' not in text: return text, False
+            return _QUOTED.sub(lambda q: q.group(1) if q.group(1) is not None else q.group(2), text), True
+        parts: List[str] = []
+        quoted, start = False, self.pos
+        while self.pos < n:
+            m = _PLAIN.match(s, self.pos)
+            if m:
+                parts.append(m.group()); self.pos = m.end()
+                continue
+            c = s[self.pos]
+            if c == "'":
+                close = s.find("'", self.pos + 1)
+                if close < 0: raise BashParseError("Unterminated single quote")
+                parts.append(s[self.pos + 1:close]); self.pos = close + 1; quoted = True
+            elif c == '"':
+                self.pos += 1
+                self.read_double_quoted(parts, nested); quoted = True
+            elif c == '\\':
+                if self.pos + 1 < n and s[self.pos + 1] != '\n': parts.append(s[self.pos + 1])
+                self.pos += 2; quoted = True
+            elif c == '$': self.read_dollar(parts, nested)
+            elif c == '`': self.read_backtick(parts, nested)
+            else: break
+        if self.pos == start: raise BashUnsupportedError(f"Unexpected {s[start]!r} at {start}")  # Never loop on a character nothing consumes
+        return "".join(parts), quoted
+
+    def read_double_quoted(self, parts: List[str], nested: List[CommandList]) -> None:
+        s, n = self.s, self.n
+        while self.pos < n:
+            m = _DQ_PLAIN.match(s, self.pos)
+            if m:
+                parts.append(m.group()); self.pos = m.end()
+                continue
+            c = s[self.pos]
+            if c == '"':
+                self.pos += 1
+                return
+            if c == '\\':
+                nxt = s[self.pos + 1:self.pos + 2]
+                if nxt in ('"', '\\', '$', '`'): parts.append(nxt)
+                elif nxt != '\n': parts.append('\\' + nxt)
+                self.pos += 2
+            elif c == '$': self.read_dollar(parts, nested)
+            else: self.read_backtick(parts, nested)
+        raise BashParseError("Unterminated double quote")
+
+    def read_dollar(self, parts: List[str], nested: List[CommandList]) -> None:
+        s = self.s
+        start = self.pos
+        if s.startswith('$((', start):
+            self.skip_arithmetic(start + 3)
+            parts.append(s[start:self.pos])
+        elif s.startswith('$(', start):
+            self.pos += 2
+            nested.append(self.parse_list("substitution", ')'))
+            parts.append('$(...)')
+        elif s.startswith('${', start):
+            self.pos += 2
+            self.read_braced(nested)
+            parts.append(s[start:self.pos])
+        elif s.startswith("$'", start):
+            i = start + 2
+            while i < self.n and s[i] != "'": i += 2 if s[i] == '\\' else 1
+            if i >= self.n: raise BashParseError("Unterminated $'...'")
+            parts.append(s[start + 2:i]); self.pos = i + 1
+        else:
+            parts.append('$'); self.pos += 1
+
+    def read_braced(self, nested: List[CommandList]) -> None:
+        """Skip a ${...} body to its closing brace. Substitutions in it (${x:-$(cmd)}) are parsed into `nested`."""
+        s, n = self.s, self.n
+        depth, scratch = 1, []
+        while self.pos < n:
+            m = _BRACE_PLAIN.match(s, self.pos)
+            if m:
+                self.pos = m.end()
+                continue
+            c = s[self.pos]
+            if c == '}':
+                self.pos += 1
+                depth -= 1
+                if depth == 0: return
+            elif c == '{': depth += 1; self.pos += 1
+            elif c == '\\': self.pos += 2
+            elif c == '$': self.read_dollar(scratch, nested)
+            elif c == '`': self.read_backtick(scratch, nested)
+            elif c == '"':
+                self.pos += 1
+                self.read_double_quoted(scratch, nested)
+            elif s.startswith(('<(', '>('), self.pos):
+                self.pos += 2
+                nested.append(self.parse_list("process_substitution", ')'))
+            else: self.pos += 1
+        raise BashParseError("Unterminated ${...}")
+
+    def read_backtick(self, parts: List[str], nested: List[CommandList]) -> None:
+        s = self.s
+        i = self.pos + 1
+        inner: List[str] = []
+        while i < self.n:
+            ch = s[i]
+            if ch == '`': break
+            if ch == '\\' and i + 1 < self.n and s[i + 1] in '`\\$':
+                inner.append(s[i + 1]); i += 2
+                continue
+            inner.append(ch); i += 1
+        else: raise BashParseError("Unterminated backtick substitution")
+        nested.append(parse_bash("".join(inner), kind="substitution"))
+        parts.append('`...`')
+        self.pos = i + 1
+
+    def skip_arithmetic(self, i: int) -> None:
+        """Skip to the `))` closing an arithmetic expansion that opened at i."""
+        depth = 2
+        while i < self.n:
+            ch = self.s[i]
+            if ch == '(': depth += 1
+            elif ch == ')':
+                depth -= 1
+                if depth == 0:
+                    self.pos = i + 1
+                    return
+            i += 1
+        raise BashParseError("Unterminated arithmetic expression")
+    #!<
+
+def parse_bash(command: str, kind: str = "script") -> CommandList:
+    """Parse a bash command string into a command tree.
+
+    Raises:
+        BashParseError: invalid syntax; BashUnsupportedError: syntax this parser does not model
+    """
+    tree = _Parser(command).parse()
+    tree.kind = kind
+    return tree
+
+# ===== CLASSIFIER ===== #
+
+class BashClassifier:
+    """Read-only classification for bash commands under one blocked_actions config.
+
+    Args:
+        read_patterns: Extra commands the user marked read-only (bash_read_patterns)
+        write_patterns: Extra commands the user marked write-like (bash_write_patterns)
+        extrasafe: Treat commands in neither list as write-like
+    """
+
+    def __init__(self, read_patterns: Iterable[str] = (), write_patterns: Iterable[str] = (), extrasafe: bool = False):
+        self.custom_read = frozenset(read_patterns)
+        self.custom_write = frozenset(write_patterns)
+        self.readonly = READONLY_COMMANDS | self.custom_read
+        self.write = WRITE_COMMANDS | self.custom_write
+        self.extrasafe = bool(extrasafe)
+
+    def fingerprint(self) -> bytes:
+        """Digest of everything that can change a verdict (classifier version + blocked_actions)."""
+        payload = json.dumps([CLASSIFIER_VERSION, sorted(self.custom_read), sorted(self.custom_write), self.extrasafe])
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+    @classmethod
+    def from_blocked_actions(cls, blocked_actions) -> "BashClassifier":
+        return cls(blocked_actions.bash_read_patterns, blocked_actions.bash_write_patterns, blocked_actions.extrasafe)
+
+    def is_read_only(self, command: str) -> bool:
+        """Return True if every simple command in `command` is read-only."""
+        s = (command or '').strip()
+        if not s: return True
+        try: tree = parse_bash(s)
+        except BashUnsupportedError: return False
+        except BashParseError: return not self.extrasafe  # same fallback as the old shlex path
+        return self.tree_is_read_only(tree)
+
+    def tree_is_read_only(self, tree: CommandList) -> bool:
+        for cmd in tree.simple_commands():
+            if cmd.redirects: return False
+            if cmd.words and not self.words_are_read_only(cmd.words): return False
+        return True
+
+    def words_are_read_only(self, words: List[str]) -> bool:
+        """Classify one simple command given its words (assignments already stripped)."""
+        first = words[0].lower().rsplit('/', 1)[-1]
+        args = words[1:]
+
+        if first == 'cd': return True
+
+        if first in WRAPPER_COMMANDS:
+            rest = _unwrap(first, args)
+            if rest is None: return False
+            if not rest: return True
+            return self.words_are_read_only(rest)
+
+        if first in SHELL_COMMANDS and '-c' in args:
+            idx = args.index('-c')
+            if idx + 1 >= len(args): return True
+            return self.is_read_only(args[idx + 1])
+
+        # Special case: Commands with read-only subcommands
+        if first in ('pip', 'pip3'): return bool(args) and args[0].lower() in PIP_READ_SUBCOMMANDS
+        if first in ('npm', 'yarn'): return bool(args) and args[0].lower() in NPM_READ_SUBCOMMANDS
+        if first in ('python', 'python3'): return bool(args) and args[0] in ('-c', '-m')
+
+        if first in self.write: return False
+
+        # Check command arguments for write operations
+        if not self.arguments_are_read_only(first, args): return False
+
+        # Check if command is in user's custom readonly list
+        if first in self.custom_read: return True
+
+        # If extrasafe is on and command not in readonly list, block it
+        if self.extrasafe and first not in self.readonly: return False
+
+        return True
+
+    def arguments_are_read_only(self, cmd: str, args: List[str]) -> bool:
+        """Check arguments of otherwise read-only tools for write operations."""
+        # sed in-place editing
+        if cmd in ('sed', 'gsed'):
+            return not any(arg.startswith('-i') or arg == '--in-place' for arg in args)
+
+        # awk file output inside the script
+        if cmd in ('awk', 'gawk', 'mawk'):
+            script = ' '.join(args)
+            if _AWK_FILE_OUTPUT.search(script): return False
+            return not any(op in script for op in ('print >', 'print >>', 'printf >', 'printf >>'))
+
+        # find -delete / -exec <command>
+        if cmd == 'find':
+            if '-delete' in args: return False
+            for i, arg in enumerate(args):
+                if arg in ('-exec', '-execdir', '-ok', '-okdir'):
+                    exec_words = []
+                    for word in args[i + 1:]:
+                        if word in (';', '+'): break
+                        exec_words.append(word)
+                    if not exec_words: continue
+                    if exec_words[0].lower() in ('rm', 'mv', 'cp', 'shred'): return False
+                    if not self.words_are_read_only(exec_words): return False
+            return True
+
+        # xargs runs its arguments as a command
+        if cmd == 'xargs':
+            if any(arg in self.write for arg in args): return False
+            if 'sed' in args:
+                sed_idx = args.index('sed')
+                if sed_idx + 1 < len(args) and args[sed_idx + 1].startswith('-i'): return False
+            sub = _xargs_command(args)
+            return not sub or self.words_are_read_only(sub)
+
+        return True
+
+# ===== VERDICT CACHE ===== #
+
+def normalize_command(command: str) -> str:
+    """Cache key for a command: stripped, with blank runs collapsed unless quoting,
+    escapes, expansions, comments or newlines make whitespace significant."""
+    s = (command or '').strip()
+    if _WS_SIGNIFICANT.search(s): return s
+    return _BLANK_RUN.sub(' ', s)
+
+class VerdictCache:
+    """Disk-backed, bounded LRU of read-only verdicts shared by every hook process.
+
+    Set-associative: a command's digest picks one set of VERDICT_CACHE_WAYS slots and a
+    miss evicts that set's least recently used slot. A lookup is one open and a few
+    small reads/writes, so it stays cheap from a fresh process. The header carries the
+    classifier fingerprint; a different blocked_actions config resets the file.
+    Concurrent hooks can lose a stats increment or an insert, never return a wrong verdict.
+    """
+
+    def __init__(self, path: Path, classifier: BashClassifier, sets: int = VERDICT_CACHE_SETS, ways: int = VERDICT_CACHE_WAYS):
+        self.path = Path(path)
+        self.classifier = classifier
+        self.sets = sets
+        self.ways = ways
+        self.fingerprint = classifier.fingerprint()
+
+    def is_read_only(self, command: str) -> bool:
+        key = normalize_command(command)
+        if not VERDICT_CACHE_MIN_KEY <= len(key) <= VERDICT_CACHE_MAX_KEY: return self.classifier.is_read_only(key)
+        try: return self._lookup(key)
+        except OSError: return self.classifier.is_read_only(command)
+
+    def _lookup(self, key: str) -> bool:
+        digest = hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        f, hits, misses = self._open()
+        with f:
+            offset = _VC_HEADER_SIZE + (int.from_bytes(digest[:4], "little") % self.sets) * self.ways * _VC_SLOT.size
+            f.seek(offset)
+            block = f.read(self.ways * _VC_SLOT.size)
+            victim, victim_used = 0, float("inf")
+            for way in range(self.ways):
+                slot_digest, verdict, slot_hits, used = _VC_SLOT.unpack_from(block, way * _VC_SLOT.size)
+                if slot_digest == digest:
+                    f.seek(offset + way * _VC_SLOT.size)
+                    f.write(_VC_SLOT.pack(digest, verdict, min(slot_hits + 1, 0xFFFFFFFF), time.time()))
+                    f.seek(_VC_STATS_OFFSET); f.write(_VC_STATS.pack(hits + 1, misses))
+                    return bool(verdict)
+                if used < victim_used: victim, victim_used = way, used
+            verdict = self.classifier.is_read_only(key)
+            f.seek(offset + victim * _VC_SLOT.size)
+            f.write(_VC_SLOT.pack(digest, int(verdict), 0, time.time()))
+            f.seek(_VC_STATS_OFFSET); f.write(_VC_STATS.pack(hits, misses + 1))
+            return verdict
+
+    def _open(self):
+        """Open the cache file for update, (re)creating it if missing, corrupt or built for another config."""
+        size = _VC_HEADER_SIZE + self.sets * self.ways * _VC_SLOT.size
+        for _ in range(2):
+            try:
+                f = open(self.path, "r+b", buffering=0)
+                header = f.read(_VC_HEADER.size)
+                if len(header) == _VC_HEADER.size and os.fstat(f.fileno()).st_size == size:
+                    magic, version, ways, sets, fingerprint, hits, misses = _VC_HEADER.unpack(header)
+                    if (magic, version, ways, sets, fingerprint) == (_VC_MAGIC, 1, self.ways, self.sets, self.fingerprint):
+                        return f, hits, misses
+                f.close()
+            except FileNotFoundError: pass
+            self.reset()
+        raise OSError(f"Verdict cache unusable: {self.path}")
+
+    def reset(self) -> None:
+        """Atomically replace the cache file with an empty one for the current config."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = _VC_HEADER.pack(_VC_MAGIC, 1, self.ways, self.sets, self.fingerprint, 0, 0).ljust(_VC_HEADER_SIZE, b"\0")
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name + ".")
+        try:
+            with os.fdopen(fd, "wb") as f: f.write(header + bytes(self.sets * self.ways * _VC_SLOT.size))
+            os.replace(tmp, self.path)
+        except BaseException:
+            try: os.unlink(tmp)
+            except OSError: pass
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Entries, capacity and hit rate since the cache was last reset."""
+        capacity = self.sets * self.ways
+        try: data = self.path.read_bytes()
+        except OSError: data = b""
+        if len(data) < _VC_HEADER.size: return {"entries": 0, "capacity": capacity, "hits": 0, "misses": 0, "hit_rate": 0.0, "current_config": False}
+        magic, _, ways, sets, fingerprint, hits, misses = _VC_HEADER.unpack_from(data)
+        empty = bytes(16)
+        entries = sum(1 for pos in range(_VC_HEADER_SIZE, len(data), _VC_SLOT.size) if data[pos:pos + 16] != empty)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "capacity": ways * sets if magic == _VC_MAGIC else capacity,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "current_config": fingerprint == self.fingerprint,
+        }
+
+# ===== HELPERS ===== #
+
+def _unwrap(wrapper: str, args: List[str]) -> Optional[List[str]]:
+    """Return the command a wrapper runs ([] if none), or None if it cannot be determined (env -S)."""
+    i = 0
+    if wrapper == 'env':
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-u', '--unset', '-C', '--chdir', '-S', '--split-string'):
+                if arg in ('-S', '--split-string'): return None
+                i += 2
+            elif arg.startswith('-') or '=' in arg: i += 1
+            else: break
+        return args[i:]
+    takes_value = {'nice': ('-n', '--adjustment'), 'timeout': ('-s', '--signal', '-k', '--kill-after'), 'stdbuf': ('-i', '-o', '-e')}.get(wrapper, ())
+    while i < len(args) and args[i].startswith('-') and args[i] != '-':
+        i += 2 if args[i] in takes_value else 1
+    if wrapper == 'timeout': i += 1  # duration
+    if wrapper in ('command', 'builtin') and args[:1] in (['-v'], ['-V']): return []
+    return args[i:]
+
+def _xargs_command(args: List[str]) -> List[str]:
+    """Return the command xargs would run (skipping xargs options)."""
+    takes_value = ('-a', '-d', '-E', '-I', '-L', '-n', '-P', '-s', '--arg-file', '--delimiter', '--max-args', '--max-procs', '--max-lines', '--max-chars')
+    i = 0
+    while i < len(args) and args[i].startswith('-'):
+        i += 2 if args[i] in takes_value else 1
+    return args[i:]
+
+#-#
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Prompt Cache Analytics
+
+Reads the `usage` records Claude Code writes to transcripts and reports how well the
+prompt cache is working for a session:
+- Hit ratio: cache-read tokens / all input tokens (uncached + cache read + cache write)
+- Cache-write cost per turn (writes are billed above the base input price, reads far below)
+- Invalidations: turns that read much less from the cache than the previous turn had
+  cached, i.e. the prefix was re-written (idle past the cache TTL, or the prefix changed)
+Each API response is counted once (Claude Code writes one entry per content block, all
+with the same message id and usage); subagent (sidechain) entries are skipped. Scans are
+incremental: CacheStats remembers the byte offset it has processed.
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, List, Optional, Union
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+import json, os
+
+# ===== GLOBALS ===== #
+CACHE_WRITE_5M_MULTIPLIER = 1.25  # Price of a 5-minute cache write relative to base input
+CACHE_WRITE_1H_MULTIPLIER = 2.0   # Price of a 1-hour cache write relative to base input
+CACHE_READ_MULTIPLIER = 0.1       # Price of a cache read relative to base input
+CACHE_TTL_SECONDS = 300           # Default (5-minute) cache lifetime
+INVALIDATION_RATIO = 0.5          # A turn reading less than this share of the previous cached prefix re-wrote it
+MIN_PREFIX_TOKENS = 1024          # Prefixes shorter than this are not cached at all; ignore them
+INVALIDATIONS_KEPT = 50           # Most recent invalidations kept in CacheStats
+
+# Base input price in USD per million tokens, by model family (see docs/NEW_FEATURES.md)
+INPUT_PRICE_PER_MTOK = {"haiku": 1.0, "sonnet": 3.0, "opus": 15.0}
+
+_USAGE_MARKER = b'"usage"'
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def input_price(model: Optional[str]) -> float:
+    """Base input price (USD per million tokens) for a model id such as claude-sonnet-4-5-20250929."""
+    name = (model or "").lower()
+    return next((price for family, price in INPUT_PRICE_PER_MTOK.items() if family in name), INPUT_PRICE_PER_MTOK["sonnet"])
+
+def _parse_ts(value: Optional[str]) -> Optional[float]:
+    if not value: return None
+    try: return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError: return None
+
+@dataclass
+class CacheStats:
+    """Running prompt-cache totals for one transcript (JSON round-trippable via to_dict/from_dict)."""
+    path: str = ""
+    offset: int = 0                   # Bytes of the transcript processed (complete lines only)
+    turns: int = 0
+    input_tokens: int = 0             # Uncached input
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+    output_tokens: int = 0
+    creation_cost_usd: float = 0.0    # What cache writes cost
+    read_savings_usd: float = 0.0     # What cache reads saved versus uncached input
+    invalidation_count: int = 0
+    invalidations: List[Dict[str, Any]] = field(default_factory=list)
+    last_turn: Dict[str, Any] = field(default_factory=dict)
+    last_message_id: Optional[str] = None
+    prev_prefix: int = 0              # Tokens the previous turn left in the cache (read + written)
+    prev_ts: Optional[float] = None
+
+    @property
+    def total_input(self) -> int: return self.input_tokens + self.cache_read_tokens + self.cache_creation_tokens
+
+    @property
+    def hit_ratio(self) -> float: return self.cache_read_tokens / self.total_input if self.total_input else 0.0
+
+    def feed(self, entry: Dict[str, Any]) -> None:
+        """Account one transcript entry (non-usage, sidechain and repeated entries are ignored)."""
+        if not isinstance(entry, dict) or entry.get("isSidechain", False): return
+        message = entry.get("message")
+        usage = message.get("usage") if isinstance(message, dict) else None
+        if not isinstance(usage, dict): return
+        message_id = message.get("id") or entry.get("requestId")
+        if message_id and message_id == self.last_message_id: return
+        self.last_message_id = message_id
+
+        uncached = usage.get("input_tokens", 0) or 0
+        read = usage.get("cache_read_input_tokens", 0) or 0
+        created = usage.get("cache_creation_input_tokens", 0) or 0
+        tiers = usage.get("cache_creation") if isinstance(usage.get("cache_creation"), dict) else {}
+        created_1h = min(tiers.get("ephemeral_1h_input_tokens", 0) or 0, created)
+        price = input_price(message.get("model")) / 1_000_000
+        cost = ((created - created_1h) * CACHE_WRITE_5M_MULTIPLIER + created_1h * CACHE_WRITE_1H_MULTIPLIER) * price
+        ts = _parse_ts(entry.get("timestamp"))
+
+        self.turns += 1
+        self.input_tokens += uncached
+        self.cache_read_tokens += read
+        self.cache_creation_tokens += created
+        self.output_tokens += usage.get("output_tokens", 0) or 0
+        self.creation_cost_usd += cost
+        self.read_savings_usd += read * (1 - CACHE_READ_MULTIPLIER) * price
+
+        # The previous turn left prev_prefix tokens cached; reading far less means they were re-written
+        if self.prev_prefix >= MIN_PREFIX_TOKENS and read < self.prev_prefix * INVALIDATION_RATIO:
+            gap = ts - self.prev_ts if ts is not None and self.prev_ts is not None else None
+            ttl = 3600 if created_1h else CACHE_TTL_SECONDS
+            self.invalidation_count += 1
+            self.invalidations.append({
+                "turn": self.turns, "timestamp": entry.get("timestamp"), "expected_read": self.prev_prefix,
+                "cache_read": read, "cache_creation": created, "creation_cost_usd": round(cost, 4),
+                "idle_s": round(gap) if gap is not None else None,
+                "reason": "expired" if gap is not None and gap >= ttl else "prefix_changed"})
+            del self.invalidations[:-INVALIDATIONS_KEPT]
+
+        self.last_turn = {"turn": self.turns, "input": uncached, "cache_read": read, "cache_creation": created, "creation_cost_usd": round(cost, 4)}
+        self.prev_prefix = read + created
+        self.prev_ts = ts if ts is not None else self.prev_ts
+
+    def summary(self) -> Dict[str, Any]:
+        """Rounded report fields (no scan bookkeeping)."""
+        return {
+            "turns": self.turns,
+            "hit_ratio": round(self.hit_ratio, 4),
+            "input_tokens": self.input_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_creation_tokens": self.cache_creation_tokens,
+            "creation_tokens_per_turn": round(self.cache_creation_tokens / self.turns) if self.turns else 0,
+            "creation_cost_usd": round(self.creation_cost_usd, 4),
+            "creation_cost_per_turn_usd": round(self.creation_cost_usd / self.turns, 4) if self.turns else 0.0,
+            "read_savings_usd": round(self.read_savings_usd, 4),
+            "invalidations": self.invalidation_count,
+            "last_turn": self.last_turn,
+        }
+
+    def to_dict(self) -> Dict[str, Any]: return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Any) -> "CacheStats":
+        if not isinstance(d, dict): return cls()
+        known = {k: v for k, v in d.items() if k in cls.__dataclass_fields__}
+        try: return cls(**known)
+        except TypeError: return cls()
+
+def scan_cache_usage(path: Union[str, Path], stats: Optional[CacheStats] = None) -> CacheStats:
+    """Update `stats` (or fresh stats) with the lines appended to `path` since stats.offset.
+
+    Starts over if the transcript is a different file or has shrunk (rewritten)."""
+    path = str(path)
+    if stats is None or stats.path != path: stats = CacheStats(path=path)
+    try: size = os.path.getsize(path)
+    except OSError: return stats
+    if size < stats.offset: stats = CacheStats(path=path)
+    if size == stats.offset: return stats
+    with open(path, "rb") as f:
+        f.seek(stats.offset)
+        for line in f:
+            if not line.endswith(b"\n"): break  # Partially written: finish it next time
+            stats.offset += len(line)
+            if _USAGE_MARKER not in line: continue
+            try: stats.feed(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError): continue
+    return stats
+
+#-#
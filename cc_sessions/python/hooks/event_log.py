@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Enforcement Event Log
+
+Structured NDJSON log of enforcement decisions and mode transitions:
+- Events are buffered in memory (serialized only at flush) and written at
+  process exit, or when the buffer fills, with a single write on an O_APPEND
+  handle, so concurrent hooks never interleave partial lines
+- Size-based rotation: events.ndjson -> events.ndjson.1 -> ... -> .N
+- Best-effort: logging errors are swallowed and never affect a hook
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+import atexit, json, os, sys, time
+
+# ===== GLOBALS ===== #
+EVENT_LOG_MAX_BYTES = 1024 * 1024  # Rotate once the live file would exceed this
+EVENT_LOG_BACKUPS = 3              # Rotated files kept (events.ndjson.1 .. .3)
+EVENT_BUFFER_EVENTS = 256          # Flush early if a single process buffers this many
+
+_LOGS: Dict[Path, "EventLog"] = {}
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def event_source() -> str:
+    """Name of the running hook/API entry point (e.g. "sessions_enforce", "api")."""
+    argv0 = Path(sys.argv[0]) if sys.argv and sys.argv[0] else Path("unknown")
+    return argv0.parent.name if argv0.stem == "__main__" else argv0.stem
+
+class EventLog:
+    """Buffered, rotating NDJSON event log. Use get_event_log() for the per-process instance."""
+
+    def __init__(self, path: Path, max_bytes: int = EVENT_LOG_MAX_BYTES, backups: int = EVENT_LOG_BACKUPS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.source = event_source()
+        self._buffer: List[Tuple[float, str, Dict[str, Any]]] = []
+        self._registered = False
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Queue one event; serialized and written at exit or when the buffer fills."""
+        self._buffer.append((time.time(), event, fields))
+        if not self._registered: atexit.register(self.flush); self._registered = True
+        if len(self._buffer) >= EVENT_BUFFER_EVENTS: self.flush()
+
+    def flush(self) -> None:
+        """Write buffered events in one append, rotating first if the file would grow past max_bytes."""
+        if not self._buffer: return
+        events, self._buffer = self._buffer, []
+        pid, lines = os.getpid(), []
+        for ts, event, fields in events:
+            record = {"ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds"), "event": event, "src": self.source, "pid": pid}
+            record.update(fields)
+            try: lines.append(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+            except (TypeError, ValueError): continue
+        data = "".join(lines).encode("utf-8", errors="backslashreplace")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                if size and size + len(data) > self.max_bytes and self._rotate(fd):
+                    os.close(fd)
+                    fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                os.write(fd, data)
+            finally: os.close(fd)
+        except OSError: pass
+
+    def _rotate(self, fd: int) -> bool:
+        """Shift events.ndjson -> .1 -> .2 ...; returns False if another process already rotated."""
+        try:
+            # Our handle no longer points at the live file: someone rotated between open and fstat
+            if os.stat(self.path).st_ino != os.fstat(fd).st_ino: return True
+            for i in range(self.backups - 1, 0, -1):
+                older = self.rotated_path(i)
+                if older.exists(): os.replace(older, self.rotated_path(i + 1))
+            if self.backups > 0: os.replace(self.path, self.rotated_path(1))
+            else: os.truncate(self.path, 0)
+        except OSError: return False
+        return True
+
+    def rotated_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+    def files(self) -> List[Path]:
+        """Existing log files, oldest first."""
+        candidates = [self.rotated_path(i) for i in range(self.backups, 0, -1)] + [self.path]
+        return [p for p in candidates if p.exists()]
+
+    def read(self, limit: Optional[int] = None, event: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return logged events oldest first (optionally filtered by type, newest `limit` only)."""
+        records = [r for r in self._iter_records() if event is None or r.get("event") == event]
+        return records[-limit:] if limit else records
+
+    def _iter_records(self) -> Iterator[Dict[str, Any]]:
+        for path in self.files():
+            try:
+                with path.open("r", encoding="utf-8", errors="backslashreplace") as f:
+                    for line in f:
+                        try: yield json.loads(line)
+                        except json.JSONDecodeError: continue
+            except OSError: continue
+
+def get_event_log(path: Path) -> EventLog:
+    """Per-process EventLog for `path` (one buffer and one exit flush per file)."""
+    path = Path(path)
+    log = _LOGS.get(path)
+    if log is None: log = _LOGS[path] = EventLog(path)
+    return log
+
+#-#
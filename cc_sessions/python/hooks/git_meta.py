@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Git Metadata Reader
+
+Resolves repository metadata by reading files under .git instead of spawning git:
+- .git directories, and .git files (`gitdir: ...`) used by submodules and worktrees
+- Current branch from HEAD (same output as `git branch --show-current`)
+- Repo map: every repo under the project (from .gitmodules, recursively, plus
+  nested clones at any depth) as a path trie; file -> owning repo only stats the
+  directories below the mapped owner, to catch clones made after the map was built
+- Status summary: branch, upstream ahead/behind, detached HEAD and changed
+  file counts from one `git status --porcelain=v2 --branch` call
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+from pathlib import Path
+import os, subprocess
+
+# ===== GLOBALS ===== #
+HEADS_PREFIX = "refs/heads/"
+# Written to HEAD by the reftable ref backend; the real HEAD lives in the reftable stack
+REFTABLE_HEAD = "ref: refs/heads/.invalid"
+
+REPO_MAP_KEY = "repo_map"  # Key in SessionsState.metadata
+REPO_MAP_VERSION = 1
+NESTED_REPO_SCAN_SKIP = frozenset({'node_modules', 'venv', 'env', '__pycache__', 'dist', 'build', 'target', 'vendor', 'sessions'})
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def resolve_git_dir(repo: Path) -> Optional[Path]:
+    """Return the git directory for a working tree (follows `gitdir:` files), or None."""
+    dot_git = Path(repo) / ".git"
+    if dot_git.is_dir(): return dot_git
+    try: content = dot_git.read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError): return None
+    if not content.startswith("gitdir:"): return None
+    git_dir = Path(content[len("gitdir:"):].strip())
+    return git_dir if git_dir.is_absolute() else (dot_git.parent / git_dir).resolve()
+
+def read_head_branch(repo: Path) -> Optional[str]:
+    """Current branch of `repo` read from HEAD: branch name, "" when detached, None if unreadable."""
+    git_dir = resolve_git_dir(repo)
+    if git_dir is None: return None
+    try: content = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError): return None
+    if content == REFTABLE_HEAD: return None
+    if content.startswith("ref:"):
+        ref = content[4:].strip()
+        return ref[len(HEADS_PREFIX):] if ref.startswith(HEADS_PREFIX) else ""
+    return ""  # Detached HEAD holds a commit id
+
+def current_branch(repo: Path, timeout: float = 2) -> str:
+    """Current branch of `repo`, reading .git/HEAD and only falling back to
+    `git branch --show-current` when HEAD cannot be interpreted (e.g. reftable repos).
+
+    Raises:
+        subprocess.SubprocessError: if the fallback git call fails or times out
+    """
+    branch = read_head_branch(repo)
+    if branch is not None: return branch
+    result = subprocess.run(["git", "branch", "--show-current"], cwd=str(repo), capture_output=True, text=True, timeout=timeout)
+    return result.stdout.strip()
+
+#!> Status summary
+@dataclass
+class GitStatus:
+    branch: str = ""              # "" when detached
+    oid: str = ""                 # HEAD commit ("" before the first commit)
+    upstream: Optional[str] = None
+    ahead: int = 0
+    behind: int = 0
+    staged: int = 0               # Files with index changes (git diff --cached --name-only)
+    unstaged: int = 0             # Files with worktree changes (git diff --name-only)
+
+    @property
+    def detached(self) -> bool: return not self.branch and bool(self.oid)
+
+    @property
+    def edited(self) -> int: return self.staged + self.unstaged
+
+def parse_porcelain_v2(output: str) -> GitStatus:
+    """Parse `git status --porcelain=v2 --branch` output (untracked/ignored entries are not counted)."""
+    status = GitStatus()
+    for line in output.splitlines():
+        if line.startswith("# "):
+            key, _, value = line[2:].partition(" ")
+            if key == "branch.oid": status.oid = "" if value == "(initial)" else value
+            elif key == "branch.head": status.branch = "" if value == "(detached)" else value
+            elif key == "branch.upstream": status.upstream = value
+            elif key == "branch.ab":
+                ahead, _, behind = value.partition(" ")
+                status.ahead, status.behind = int(ahead.lstrip("+")), int(behind.lstrip("-"))
+        elif line[:2] in ("1 ", "2 ", "u "):
+            xy = line[2:4]
+            if xy[0] != ".": status.staged += 1
+            if xy[1] != ".": status.unstaged += 1
+    return status
+
+def git_status(repo: Path, timeout: float = 2) -> GitStatus:
+    """Branch, upstream and change counts for `repo` in one git call.
+
+    --no-optional-locks keeps a status refresh from taking index.lock while the user runs git.
+
+    Raises:
+        subprocess.SubprocessError: if git fails or times out
+        OSError: if git cannot be run
+    """
+    output = subprocess.check_output(
+        ["git", "--no-optional-locks", "-C", str(repo), "status", "--porcelain=v2", "--branch", "--untracked-files=no"],
+        stderr=subprocess.PIPE, encoding="utf-8", errors="replace", timeout=timeout)
+    return parse_porcelain_v2(output)
+#!<
+
+#!> Repo map
+def parse_gitmodules(path: Path) -> List[str]:
+    """Return the `path = ...` entries of a .gitmodules file (posix, relative to its directory)."""
+    paths = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        key, sep, value = line.partition("=")
+        if sep and key.strip() == "path" and value.strip(): paths.append(value.strip().strip("/"))
+    return paths
+
+def _scan_nested_repos(root: Path) -> Iterable[str]:
+    """Yield relative paths of directories under `root` that contain .git (hidden and NESTED_REPO_SCAN_SKIP directories are not entered)."""
+    stack = [(str(root), "")]
+    while stack:
+        directory, rel = stack.pop()
+        try: entries = list(os.scandir(directory))
+        except OSError: continue
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name in NESTED_REPO_SCAN_SKIP: continue
+            try:
+                if not entry.is_dir(follow_symlinks=False): continue
+            except OSError: continue
+            child_rel = f"{rel}/{entry.name}" if rel else entry.name
+            if os.path.exists(os.path.join(entry.path, ".git")): yield child_rel
+            stack.append((entry.path, child_rel))
+
+def build_repo_map(root: Path) -> Dict[str, Any]:
+    """Collect every repo under `root`, for caching in state.
+
+    Returns {"version", "repos": [relative posix paths, "" = root], "sources": {".gitmodules path": stat key or None}}.
+    `sources` records each .gitmodules consulted (including missing ones in submodules
+    that are not checked out yet) so repo_map_is_current() can detect changes.
+    """
+    root = Path(root)
+    repos = {""} if (root / ".git").exists() else set()
+    sources: Dict[str, Optional[List[int]]] = {}
+    queue = [""]
+    while queue:
+        rel = queue.pop()
+        gitmodules_rel = f"{rel}/.gitmodules" if rel else ".gitmodules"
+        gitmodules = root / gitmodules_rel
+        try: sources[gitmodules_rel] = list(_stat_key(gitmodules))
+        except OSError:
+            sources[gitmodules_rel] = None
+            continue
+        try: declared = parse_gitmodules(gitmodules)
+        except (OSError, UnicodeDecodeError): continue
+        for sub in declared:
+            sub_rel = f"{rel}/{sub}" if rel else sub
+            if sub_rel not in repos:
+                repos.add(sub_rel)
+                queue.append(sub_rel)
+    repos.update(_scan_nested_repos(root))
+    return {"version": REPO_MAP_VERSION, "repos": sorted(repos), "sources": sources}
+
+def repo_map_is_current(repo_map: Optional[Dict[str, Any]], root: Path) -> bool:
+    """True if `repo_map` was built by this version and no .gitmodules it read has changed."""
+    if not isinstance(repo_map, dict) or repo_map.get("version") != REPO_MAP_VERSION: return False
+    sources = repo_map.get("sources")
+    if not isinstance(sources, dict) or not isinstance(repo_map.get("repos"), list): return False
+    for rel, key in sources.items():
+        try: current = list(_stat_key(Path(root) / rel))
+        except OSError: current = None
+        if current != key: return False
+    return True
+
+class RepoTrie:
+    """Path trie over repo roots: maps a file path to its owning repo in O(path depth)."""
+
+    _REPO = "\0"  # Marker key holding the repo's relative path
+
+    def __init__(self, root: Path, repos: Iterable[str]):
+        self.root = os.path.normpath(str(root)).rstrip(os.sep)
+        self.trie: Dict[str, Any] = {}
+        for rel in repos:
+            node = self.trie
+            for part in (rel.split("/") if rel else ()): node = node.setdefault(part, {})
+            node[self._REPO] = rel
+
+    def owner(self, path: Path, verify: bool = False) -> Optional[str]:
+        """Relative path of the innermost repo containing `path` ("" = root repo), or None.
+
+        verify: also look for .git in the directories between `path` and the mapped owner
+        (clones made since the map was built), innermost first; costs one stat per level.
+        """
+        p = os.path.normpath(os.path.join(os.getcwd(), str(path)))
+        if p == self.root: parts: List[str] = []
+        elif p.startswith(self.root + os.sep): parts = p[len(self.root) + 1:].split(os.sep)
+        else: return None
+        node = self.trie
+        found = node.get(self._REPO)
+        for part in parts:
+            node = node.get(part)
+            if node is None: break
+            found = node.get(self._REPO, found)
+        if verify and found is not None:
+            depth = len(found.split("/")) if found else 0
+            for i in range(len(parts), depth, -1):
+                if os.path.exists(os.path.join(self.root, *parts[:i], ".git")): return "/".join(parts[:i])
+        return found
+#!<
+
+#-#
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Hook Latency Timing
+
+Each hook records its own wall-clock latency, per session, in a small rolling-window file:
+- Measured from process start (interpreter startup included, where the OS reports it)
+  to exit, via atexit, so early sys.exit() paths are timed too
+- Fixed-size binary records appended with one write on an O_APPEND handle; concurrent
+  hooks never interleave partial records
+- The file is compacted to the newest HOOK_TIMING_WINDOW records once it holds twice
+  that many, so readers (the statusline) never scan more than a few KB
+- Best-effort: timing errors are swallowed and never affect a hook
+"""
+
+# ===== IMPORTS ===== #
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import atexit, os, struct, tempfile, time
+
+# ===== GLOBALS ===== #
+HOOK_TIMING_WINDOW = 256                                # Records kept per session (newest)
+ENFORCEMENT_HOOKS = ("sessions_enforce", "post_tool_use")  # Hooks on every tool call's critical path
+RECORD = struct.Struct("<df16s")                        # Finished at (unix s), duration (ms), hook name
+
+_IMPORTED = time.time()
+_TIMERS: Dict[Path, str] = {}
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def process_started() -> float:
+    """Wall-clock time this process started (Linux: from /proc, so interpreter startup counts;
+    elsewhere: when this module was imported)."""
+    try:
+        with open("/proc/self/stat", "rb") as f: fields = f.read().rsplit(b")", 1)[1].split()
+        with open("/proc/uptime", "rb") as f: uptime = float(f.read().split()[0])
+        age = uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")  # Field 22 (starttime), counted after comm
+    except (OSError, ValueError, IndexError, AttributeError): return _IMPORTED
+    return time.time() - age if 0 <= age < 600 else _IMPORTED  # Guard against clock/proc oddities
+
+def record_hook_timing(path: Path, hook: str, duration_ms: float, finished: Optional[float] = None) -> None:
+    """Append one timing record to `path` (compacting it when it has grown past twice the window)."""
+    path = Path(path)
+    record = RECORD.pack(time.time() if finished is None else finished, duration_ms, hook.encode("utf-8")[:16])
+    try:
+        fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try: size = os.fstat(fd).st_size; os.write(fd, record)
+    finally: os.close(fd)
+    if size + RECORD.size > 2 * HOOK_TIMING_WINDOW * RECORD.size: _compact(path)
+
+def _compact(path: Path) -> None:
+    # A record appended between the read and the replace is lost; that is fine for a rolling window
+    data = path.read_bytes()
+    whole = len(data) // RECORD.size * RECORD.size
+    keep = data[max(0, whole - HOOK_TIMING_WINDOW * RECORD.size):whole]
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(path.parent), prefix=".latency-") as tmp:
+        tmp.write(keep)
+        tmp_name = tmp.name
+    os.replace(tmp_name, path)
+
+def start_hook_timer(path: Path, hook: str) -> None:
+    """Record this process's latency as `hook` to `path` when it exits (once per path)."""
+    path = Path(path)
+    if path in _TIMERS: return
+    _TIMERS[path] = hook
+    started = process_started()
+    def finish() -> None:
+        try: record_hook_timing(path, hook, (time.time() - started) * 1000)
+        except Exception: pass
+    atexit.register(finish)
+
+def read_hook_timings(path: Path, window: int = HOOK_TIMING_WINDOW) -> List[Tuple[float, float, str]]:
+    """Newest `window` records in `path` as (finished, duration_ms, hook), oldest first."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size // RECORD.size * RECORD.size
+            f.seek(max(0, size - window * RECORD.size))
+            data = f.read(size - f.tell())
+    except OSError: return []
+    return [(finished, duration, name.rstrip(b"\0").decode("utf-8", "replace")) for finished, duration, name in RECORD.iter_unpack(data)]
+
+def _nearest_rank(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+def latency_summary(path: Path, window: int = HOOK_TIMING_WINDOW) -> Dict[str, Dict[str, float]]:
+    """{"all" | hook name: {"count", "p50_ms", "p95_ms", "max_ms"}} over the rolling window (empty if no records)."""
+    by_hook: Dict[str, List[float]] = {}
+    for _, duration, hook in read_hook_timings(path, window):
+        by_hook.setdefault("all", []).append(duration)
+        by_hook.setdefault(hook, []).append(duration)
+    summary = {}
+    for hook, durations in by_hook.items():
+        durations.sort()
+        summary[hook] = {"count": len(durations), "p50_ms": round(_nearest_rank(durations, 50), 1),
+                         "p95_ms": round(_nearest_rank(durations, 95), 1), "max_ms": round(durations[-1], 1)}
+    return summary
+
+#-#
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Specialized Mode Path Scope
+
+Fences file-editing tools to the paths given when entering a specialized mode
+(`sessions smode enter refactor src/auth 'tests/*_auth.py'`):
+- Literal paths go into a prefix trie: a path is in scope if any ancestor
+  (or the path itself) is a trie terminal
+- Globs are split at their first wildcard component; the literal head is a
+  trie node and the translated fnmatch patterns hang off it as one regex, so
+  only globs sharing the path's prefix are ever tried
+Matching walks the path's components once: O(path length).
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, Iterable, List, Optional
+from pathlib import Path
+import fnmatch, os, re
+
+# ===== GLOBALS ===== #
+SCOPE_KEY = "specialized_mode_scope"  # Key in SessionsState.metadata: {mode: compiled scope}
+SCOPE_VERSION = 1
+SCOPE_ALWAYS_ALLOWED = ("sessions",)  # Task files, work logs and other sessions files stay editable
+SCOPE_TOOLS = frozenset({"Write", "Edit", "MultiEdit", "NotebookEdit"})
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def _relative(path: str, root: Path) -> Optional[str]:
+    """Posix path relative to `root` ("" for the root itself), or None if outside it."""
+    root_str = os.path.normpath(str(root))
+    p = os.path.normpath(os.path.join(root_str, os.path.expanduser(path)))
+    if p == root_str: return ""
+    if not p.startswith(root_str.rstrip(os.sep) + os.sep): return None
+    return p[len(root_str.rstrip(os.sep)) + 1:].replace(os.sep, "/")
+
+def is_path_argument(arg: str, root: Path) -> bool:
+    """Mode arguments are free text too ("login fails"); only globs, paths with a separator or existing paths scope."""
+    if _GLOB_CHARS.search(arg) or "/" in arg or os.sep in arg: return True
+    return os.path.exists(os.path.join(str(root), arg))
+
+def compile_scope(args: Iterable[str], root: Path) -> Optional[Dict[str, Any]]:
+    """Turn specialized-mode arguments into a serializable scope, or None if none of them is a path.
+
+    Returns {"version", "literals": [rel paths], "globs": [rel patterns], "patterns": [original args]}.
+    Arguments outside the project root are ignored."""
+    literals: List[str] = []
+    globs: List[str] = []
+    patterns: List[str] = []
+    for arg in args:
+        if not is_path_argument(arg, root): continue
+        rel = _relative(arg.rstrip("/\\") or arg, root)
+        if rel is None: continue
+        patterns.append(arg)
+        if rel == "": return {"version": SCOPE_VERSION, "literals": [""], "globs": [], "patterns": patterns}  # Whole project
+        (globs if _GLOB_CHARS.search(rel) else literals).append(rel)
+    if not patterns: return None
+    return {"version": SCOPE_VERSION, "literals": sorted(set(literals)), "globs": sorted(set(globs)), "patterns": patterns}
+
+class PathScope:
+    """Compiled matcher for a scope from compile_scope()."""
+
+    _END = "\0"   # Marker: a literal scope path ends here
+    _GLOB = "\1"  # Marker: compiled regex of the globs whose literal head is this node
+
+    def __init__(self, root: Path, scope: Dict[str, Any]):
+        self.root = Path(root)
+        self.patterns = list(scope.get("patterns", []))
+        self.trie: Dict[str, Any] = {}
+        for rel in scope.get("literals", []): self._node(rel.split("/") if rel else [])[self._END] = True
+        for name in SCOPE_ALWAYS_ALLOWED: self._node([name])[self._END] = True
+
+        grouped: Dict[tuple, List[str]] = {}
+        for pattern in scope.get("globs", []):
+            parts = pattern.split("/")
+            head = next(i for i, part in enumerate(parts) if _GLOB_CHARS.search(part))
+            grouped.setdefault(tuple(parts[:head]), []).append(pattern)
+        for head, patterns in grouped.items():
+            # A glob also covers everything beneath what it matches (src/*/tests -> src/a/tests/x.py)
+            alternatives = [fnmatch.translate(p) for p in patterns] + [fnmatch.translate(p + "/*") for p in patterns]
+            self._node(list(head))[self._GLOB] = re.compile("|".join(alternatives))
+
+    def _node(self, parts: List[str]) -> Dict[str, Any]:
+        node = self.trie
+        for part in parts: node = node.setdefault(part, {})
+        return node
+
+    def contains(self, path: Path) -> bool:
+        """True if `path` is inside the scope (paths outside the project root never are)."""
+        rel = _relative(str(path), self.root)
+        if rel is None: return False
+        node = self.trie
+        if self._END in node: return True
+        parts = rel.split("/") if rel else []
+        for part in parts:
+            regex = node.get(self._GLOB)
+            if regex is not None and regex.match(rel): return True
+            node = node.get(part)
+            if node is None: return False
+            if self._END in node: return True
+        regex = node.get(self._GLOB)
+        return bool(regex is not None and regex.match(rel))
+
+    def describe(self) -> str:
+        return ", ".join(self.patterns)
+
+def load_scope(metadata: Dict[str, Any], mode: str, root: Path) -> Optional[PathScope]:
+    """Compiled scope stored for `mode` in state metadata, or None if the mode is not path-scoped."""
+    scope = (metadata.get(SCOPE_KEY) or {}).get(mode)
+    if not isinstance(scope, dict) or scope.get("version") != SCOPE_VERSION: return None
+    return PathScope(root, scope)
+
+#-#
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Policy Decision Table
+
+Compiles the static part of DAIC enforcement - discussion-mode tool blocking,
+specialized-mode allow/block lists, bypass - into one table keyed by
+(mode, specialized_mode, bypass, tool), derived from precomputed tool sets.
+A tool call's static decision is a single dict lookup; discussion-mode Bash
+is then resolved by the compiled bash classifier. Stateful checks (TodoWrite,
+state-file guards, branch enforcement) stay in sessions_enforce.
+"""
+
+# ===== IMPORTS ===== #
+
+## ===== STDLIB ===== ##
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from enum import Enum
+import json, hashlib, platform
+##-##
+
+## ===== LOCAL ===== ##
+try:
+    from .shared_state import SessionsConfig, Mode, SpecializedMode, CCTools, SPECIALIZED_MODE_CONFIGS
+    from .bash_classifier import BashClassifier
+except ImportError:
+    from shared_state import SessionsConfig, Mode, SpecializedMode, CCTools, SPECIALIZED_MODE_CONFIGS
+    from bash_classifier import BashClassifier
+##-##
+
+#-#
+
+# ===== GLOBALS ===== #
+# Tools subject to specialized-mode allow/block lists
+SPECIALIZED_MODE_TOOLS = {t.value: t for t in (
+    CCTools.READ, CCTools.WRITE, CCTools.EDIT, CCTools.MULTIEDIT, CCTools.NOTEBOOKEDIT,
+    CCTools.BASH, CCTools.GREP, CCTools.GLOB, CCTools.TASK)}
+
+# Bash commands that reach the sessions API are allowed in discussion mode
+SESSIONS_COMMAND_MARKERS = ('sessions ', 'python -m cc_sessions.scripts.api')
+
+_TABLE_CACHE: Dict[str, "PolicyTable"] = {}
+#-#
+
+# ===== DECLARATIONS ===== #
+
+class Action(str, Enum):
+    ALLOW = "allow"                  # Allow immediately
+    BLOCK = "block"                  # Block with message
+    CLASSIFY_BASH = "classify_bash"  # Discussion-mode Bash: depends on the command
+    CONTINUE = "continue"            # Not decided statically; run stateful checks
+
+@dataclass(frozen=True)
+class Decision:
+    action: Action
+    reason: str = ""   # Stable code for audits (e.g. "discussion_tool_blocked")
+    message: str = ""  # stderr feedback when blocked
+
+# ===== FUNCTIONS ===== #
+
+def policy_fingerprint(config: SessionsConfig) -> str:
+    """Digest of everything the compiled table depends on."""
+    payload = {
+        "blocked_actions": asdict(config.blocked_actions),
+        "specialized_modes": {m.value: asdict(c) for m, c in SPECIALIZED_MODE_CONFIGS.items()},
+        "windows": platform.system() == "Windows",
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"), digest_size=16).hexdigest()
+
+def policy_tools(config: SessionsConfig) -> List[str]:
+    """Every tool name any rule mentions (other tools get a row on first lookup)."""
+    names = {t.value for t in CCTools} | set(SPECIALIZED_MODE_TOOLS)
+    names |= {str(getattr(t, "value", t)) for t in config.blocked_actions.implementation_only_tools}
+    return sorted(names)
+
+def policy_keys(config: SessionsConfig) -> Iterator[Tuple[Mode, SpecializedMode, bool, str]]:
+    for mode in Mode:
+        for smode in SpecializedMode:
+            for bypass in (False, True):
+                for tool in policy_tools(config): yield (mode, smode, bypass, tool)
+
+#!> Messages
+def bash_blocked_message() -> str:
+    # Detect OS for correct sessions command
+    sessions_cmd = "sessions/bin/sessions.bat" if platform.system() == "Windows" else "sessions/bin/sessions"
+    return (f"[DAIC] Blocked write-like Bash command in Discussion mode. Only the user can activate implementation mode. Explain what you want to do and seek alignment and approval first.\n"
+            f"Note: Both Claude and the user can configure allowed commands:\n"
+            f"  - View allowed: {sessions_cmd} config read list\n"
+            f"  - Add command: {sessions_cmd} config read add <command>\n"
+            f"  - Remove command: {sessions_cmd} config read remove <command>")
+
+def _smode_message(smode: SpecializedMode, tool: str, blocked: bool) -> str:
+    mode_config = SPECIALIZED_MODE_CONFIGS[smode]
+    allowed = ', '.join([t.value for t in mode_config.allowed_tools])
+    exit_hint = f"\nTo exit this mode, use one of these phrases: {', '.join(mode_config.exit_phrases[:2])}..."
+    if blocked: return f"[Specialized Mode: {smode.value}] The {tool} tool is not allowed in this mode.\nThis mode only allows: {allowed}\n{exit_hint}"
+    return f"[Specialized Mode: {smode.value}] The {tool} tool is not in the allowed tools for this mode.\nAllowed tools: {allowed}\n{exit_hint}"
+#!<
+
+#!> Reference evaluation
+def evaluate_procedurally(config: SessionsConfig, mode: Mode, smode: SpecializedMode, bypass: bool, tool: str) -> Decision:
+    """The static enforcement rules, evaluated step by step in sessions_enforce order.
+    PolicyTable derives the same decisions from tool sets; verify_policy_table() checks they agree."""
+    # Discussion-mode Bash is decided by the command before any other check
+    if tool == "Bash" and mode is Mode.NO and not bypass: return Decision(Action.CLASSIFY_BASH, "discussion_bash")
+
+    # Specialized mode tool restrictions
+    if smode != SpecializedMode.NONE and not bypass:
+        mode_config = SPECIALIZED_MODE_CONFIGS.get(smode)
+        current_tool = SPECIALIZED_MODE_TOOLS.get(tool)
+        if mode_config and current_tool:
+            if current_tool in mode_config.blocked_tools: return Decision(Action.BLOCK, "specialized_mode_blocked", _smode_message(smode, tool, True))
+            if mode_config.allowed_tools and current_tool not in mode_config.allowed_tools: return Decision(Action.BLOCK, "specialized_mode_not_allowed", _smode_message(smode, tool, False))
+
+    # Discussion mode guard
+    if mode is Mode.NO and not bypass:
+        try: blocked = config.blocked_actions.is_tool_blocked(tool)
+        except ValueError: blocked = False  # Unknown tool: the hook used to crash here (exit 1, non-blocking)
+        if blocked: return Decision(Action.BLOCK, "discussion_tool_blocked", f"[DAIC: Tool Blocked] You're in discussion mode. The {tool} tool is not allowed. You need to seek alignment first.")
+        return Decision(Action.ALLOW, "discussion_tool_allowed")
+
+    return Decision(Action.CONTINUE, "stateful_checks")
+#!<
+
+#!> Compiled table
+class PolicyTable:
+    """Static enforcement decisions for one config, plus its compiled bash classifier.
+
+    Rows are derived from precomputed tool sets (independently of evaluate_procedurally)
+    and memoized; compile() fills every row up front for batch use, while a hook process
+    that makes a single decision only pays for that row.
+    """
+
+    def __init__(self, config: SessionsConfig):
+        self.config = config
+        self.classifier = BashClassifier.from_blocked_actions(config.blocked_actions)
+        self.bash_blocked = Decision(Action.BLOCK, "discussion_bash_write", bash_blocked_message())
+        self.table: Dict[Tuple[Mode, SpecializedMode, bool, str], Decision] = {}
+        # Tool names blocked in discussion mode (entries that are not CCTools never matched a real tool)
+        valid = {t.value for t in CCTools}
+        self.discussion_blocked = frozenset(v for v in (str(getattr(t, "value", t)) for t in config.blocked_actions.implementation_only_tools) if v in valid)
+        # Per specialized mode: tool name -> (reason, blocked_list_hit)
+        self.smode_denied: Dict[SpecializedMode, Dict[str, Tuple[str, bool]]] = {}
+        for smode, mode_config in SPECIALIZED_MODE_CONFIGS.items():
+            if smode == SpecializedMode.NONE: continue
+            blocked = {t.value for t in mode_config.blocked_tools} & set(SPECIALIZED_MODE_TOOLS)
+            allowed = {t.value for t in mode_config.allowed_tools}
+            denied = {name: ("specialized_mode_blocked", True) for name in blocked}
+            if allowed:
+                for name in set(SPECIALIZED_MODE_TOOLS) - allowed - blocked: denied[name] = ("specialized_mode_not_allowed", False)
+            self.smode_denied[smode] = denied
+
+    def _row(self, mode: Mode, smode: SpecializedMode, bypass: bool, tool: str) -> Decision:
+        if bypass: return Decision(Action.CONTINUE, "stateful_checks")
+        discussion = mode is Mode.NO
+        if discussion and tool == "Bash": return Decision(Action.CLASSIFY_BASH, "discussion_bash")
+        denied = self.smode_denied.get(smode, {}).get(tool)
+        if denied: return Decision(Action.BLOCK, denied[0], _smode_message(smode, tool, denied[1]))
+        if not discussion: return Decision(Action.CONTINUE, "stateful_checks")
+        if tool in self.discussion_blocked:
+            return Decision(Action.BLOCK, "discussion_tool_blocked", f"[DAIC: Tool Blocked] You're in discussion mode. The {tool} tool is not allowed. You need to seek alignment first.")
+        return Decision(Action.ALLOW, "discussion_tool_allowed")
+
+    def compile(self) -> "PolicyTable":
+        """Fill every (mode, specialized_mode, bypass, tool) row."""
+        for key in policy_keys(self.config):
+            if key not in self.table: self.table[key] = self._row(*key)
+        return self
+
+    def lookup(self, mode: Mode, smode: SpecializedMode, bypass: bool, tool: str) -> Decision:
+        """Static decision for a tool call: one dict lookup once the row exists."""
+        key = (mode, smode, bypass, tool)
+        decision = self.table.get(key)
+        if decision is None: decision = self.table[key] = self._row(mode, smode, bypass, tool)
+        return decision
+
+    def decide_bash(self, command: str, is_read_only: Optional[Callable[[str], bool]] = None) -> Decision:
+        """Resolve a CLASSIFY_BASH decision for a discussion-mode command."""
+        if command and any(marker in command for marker in SESSIONS_COMMAND_MARKERS): return Decision(Action.ALLOW, "sessions_command")
+        if (is_read_only or self.classifier.is_read_only)(command): return Decision(Action.ALLOW, "discussion_bash_read_only")
+        return self.bash_blocked
+
+    def decide(self, mode: Mode, smode: SpecializedMode, bypass: bool, tool: str, command: str = "",
+               is_read_only: Optional[Callable[[str], bool]] = None) -> Decision:
+        decision = self.lookup(mode, smode, bypass, tool)
+        if decision.action is Action.CLASSIFY_BASH: return self.decide_bash(command, is_read_only)
+        return decision
+
+def compile_policy(config: SessionsConfig) -> PolicyTable:
+    """Return the compiled table for `config`, reusing it while the config is unchanged."""
+    fingerprint = policy_fingerprint(config)
+    table = _TABLE_CACHE.get(fingerprint)
+    if table is None:
+        _TABLE_CACHE.clear()
+        table = _TABLE_CACHE[fingerprint] = PolicyTable(config).compile()
+    return table
+
+def verify_policy_table(config: SessionsConfig, tools: Optional[List[str]] = None) -> List[str]:
+    """Compare every table entry with evaluate_procedurally(); return mismatch descriptions.
+
+    Covers all (mode, specialized_mode, bypass) combinations for every tool any rule
+    mentions plus `tools` (defaults to a few names no rule mentions, e.g. MCP tools)."""
+    table = PolicyTable(config).compile()
+    extra = tools if tools is not None else ["mcp__example__tool", "SlashCommand", "FutureTool"]
+    mismatches = []
+    for mode in Mode:
+        for smode in SpecializedMode:
+            for bypass in (False, True):
+                for tool in policy_tools(config) + list(extra):
+                    expected = evaluate_procedurally(config, mode, smode, bypass, tool)
+                    actual = table.lookup(mode, smode, bypass, tool)
+                    if expected != actual: mismatches.append(f"{mode.value}/{smode.value}/bypass={bypass}/{tool}: table={actual.action.value}:{actual.reason} expected={expected.action.value}:{expected.reason}")
+    return mismatches
+#!<
+
+#-#
@@ -23,6 +23,9 @@ from shared_state import (
     list_open_tasks,
     TaskState,
     StateError,
+    time_hook,
+    register_transcript,
+    snapshot_store,
 )
 from pathlib import Path
 ##-##
@@ -48,6 +51,8 @@ if is_ci_environment():
 ##-##
 
 input_data = json.load(sys.stdin)
+time_hook(input_data.get("session_id"))
+register_transcript(input_data.get("session_id"), input_data.get("transcript_path"))
 tool_name = input_data.get("tool_name", "")
 tool_input = input_data.get("tool_input", {})
 cwd = input_data.get("cwd", "")
@@ -88,10 +93,14 @@ if tool_name == "Task" and STATE.flags.subagent:
         s.flags.subagent = False
         STATE = s
     # Clean up agent transcript directory
-    subagent_type = tool_input.get("subagent_type", "shared")
+    subagent_type = tool_input.get("subagent_type") or "shared"
     agent_dir = PROJECT_ROOT / "sessions" / "transcripts" / subagent_type
     if agent_dir.exists():
         shutil.rmtree(agent_dir)
+    # Release its manifest; stored chunks no manifest or chunk plan refers to are deleted
+    store = snapshot_store()
+    store.release(subagent_type)
+    store.collect_garbage()
     sys.exit(0)
 #!<
 
@@ -128,10 +137,9 @@ if STATE.mode is Mode.GO and tool_name == "TodoWrite" and STATE.todos.all_comple
             is_windows = platform.system() == "Windows"
             sessions_cmd = "sessions/bin/sessions.bat" if is_windows else "sessions/bin/sessions"
 
+            restored_json = json.dumps(restored, indent=2)
             print(
-                f"Your previous {num_restored} todos have been restored:\n\n{
-                    json.dumps(restored, indent=2)
-                }\n\nIf these todos are no longer relevant, you should clear them using: {sessions_cmd} todos clear\nNote: You can only use this command immediately - it will be disabled after any other tool use.\n\n",
+                f"Your previous {num_restored} todos have been restored:\n\n{restored_json}\n\nIf these todos are no longer relevant, you should clear them using: {sessions_cmd} todos clear\nNote: You can only use this command immediately - it will be disabled after any other tool use.\n\n",
                 file=sys.stderr,
             )
     else:
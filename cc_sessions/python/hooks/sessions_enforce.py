@@ -3,7 +3,7 @@
 # ===== IMPORTS ===== #
 
 ## ===== STDLIB ===== ##
-import subprocess, json, sys, re, shlex, os, platform
+import subprocess, json, sys, os
 from typing import Optional
 from pathlib import Path
 ##-##
@@ -12,7 +12,11 @@ from pathlib import Path
 ##-##
 
 ## ===== LOCAL ===== ##
-from shared_state import edit_state, load_state, Mode, PROJECT_ROOT, load_config, find_git_repo, SpecializedMode, SPECIALIZED_MODE_CONFIGS, CCTools
+from shared_state import edit_state, load_state, Mode, PROJECT_ROOT, BASH_VERDICT_CACHE_FILE, load_config, find_git_repo, log_event, time_hook, register_transcript
+from bash_classifier import VerdictCache
+from policy import PolicyTable, Action
+from git_meta import current_branch as read_current_branch, build_repo_map, repo_map_is_current, RepoTrie, REPO_MAP_KEY
+from path_scope import load_scope, SCOPE_TOOLS
 ##-##
 
 #-#
@@ -20,6 +24,8 @@ from shared_state import edit_state, load_state, Mode, PROJECT_ROOT, load_config
 # ===== GLOBALS ===== #
 # Load input
 input_data = json.load(sys.stdin)
+time_hook(input_data.get("session_id"))
+register_transcript(input_data.get("session_id"), input_data.get("transcript_path"))
 tool_name = input_data.get("tool_name", "")
 tool_input = input_data.get("tool_input", {})
 
@@ -34,82 +40,9 @@ if tool_name == "Bash": command = tool_input.get("command", "").strip()
 if tool_name == "TodoWrite": incoming_todos = tool_input.get("todos", [])
 
 ## ===== PATTERNS ===== ##
-READONLY_FIRST = {
-    # Basic file reading
-    'cat', 'less', 'more', 'head', 'tail', 'wc', 'nl', 'tac', 'rev',
-    # Text search and filtering
-    'grep', 'egrep', 'fgrep', 'rg', 'ripgrep', 'ag', 'ack',
-    # Text processing (all safe for reading)
-    'sort', 'uniq', 'cut', 'paste', 'join', 'comm', 'column',
-    'tr', 'expand', 'unexpand', 'fold', 'fmt', 'pr', 'shuf', 'tsort',
-    # Comparison
-    'diff', 'cmp', 'sdiff', 'vimdiff',
-    # Checksums
-    'md5sum', 'sha1sum', 'sha256sum', 'sha512sum', 'cksum', 'sum',
-    # Binary inspection
-    'od', 'hexdump', 'xxd', 'strings', 'file', 'readelf', 'objdump', 'nm',
-    # File system inspection
-    'ls', 'dir', 'vdir', 'pwd', 'which', 'type', 'whereis', 'locate', 'find',
-    'basename', 'dirname', 'readlink', 'realpath', 'stat',
-    # User/system info
-    'whoami', 'id', 'groups', 'users', 'who', 'w', 'last', 'lastlog',
-    'hostname', 'uname', 'arch', 'lsb_release', 'hostnamectl',
-    'date', 'cal', 'uptime', 'df', 'du', 'free', 'vmstat', 'iostat',
-    # Process monitoring
-    'ps', 'pgrep', 'pidof', 'top', 'htop', 'iotop', 'atop',
-    'lsof', 'jobs', 'pstree', 'fuser',
-    # Network monitoring
-    'netstat', 'ss', 'ip', 'ifconfig', 'route', 'arp',
-    'ping', 'traceroute', 'tracepath', 'mtr', 'nslookup', 'dig', 'host', 'whois',
-    # Environment
-    'printenv', 'env', 'set', 'export', 'alias', 'history', 'fc',
-    # Output
-    'echo', 'printf', 'yes', 'seq', 'jot',
-    # Testing
-    'test', '[', '[[', 'true', 'false',
-    # Calculation
-    'bc', 'dc', 'expr', 'factor', 'units',
-    # Modern tools
-    'jq', 'yq', 'xmlstarlet', 'xmllint', 'xsltproc',
-    'bat', 'fd', 'fzf', 'tree', 'ncdu', 'exa', 'lsd',
-    'tldr', 'cheat',
-    # Note: awk/sed are here but need special argument checking
-    'awk', 'sed', 'gawk', 'mawk', 'gsed',
-}
-
-READONLY_FIRST.update(CONFIG.blocked_actions.bash_read_patterns)
-
-WRITE_FIRST = {
-    # File operations
-    'rm', 'rmdir', 'unlink', 'shred',
-    'mv', 'rename', 'cp', 'install', 'dd',
-    'mkdir', 'mkfifo', 'mknod', 'mktemp', 'touch', 'truncate',
-    # Permissions
-    'chmod', 'chown', 'chgrp', 'umask',
-    'ln', 'link', 'symlink',
-    'setfacl', 'setfattr', 'chattr',
-    # System management
-    'useradd', 'userdel', 'usermod', 'groupadd', 'groupdel',
-    'passwd', 'chpasswd', 'systemctl', 'service',
-    # Package managers
-    'apt', 'apt-get', 'dpkg', 'snap', 'yum', 'dnf', 'rpm',
-    'pip', 'pip3', 'npm', 'yarn', 'gem', 'cargo',
-    # Build tools
-    'make', 'cmake', 'ninja', 'meson',
-    # Other dangerous
-    'sudo', 'doas', 'su', 'crontab', 'at', 'batch',
-    'kill', 'pkill', 'killall', 'tee',
-}
-
-WRITE_FIRST.update(CONFIG.blocked_actions.bash_write_patterns)
-
-# Enhanced redirection detection (includes stderr redirections)
-REDIR_PATTERNS = [
-    r'(?:^|\s)(?:>>?|<<?|<<<)\s',           # Basic redirections
-    r'(?:^|\s)\d*>&?\d*(?:\s|$)',            # File descriptor redirections (2>&1, etc)
-    r'(?:^|\s)&>',                           # Combined stdout/stderr redirect
-]
-REDIR = re.compile('|'.join(REDIR_PATTERNS))
+# Tool rules compile into policy.PolicyTable; bash command lists live in bash_classifier (user patterns extend them)
+POLICY = PolicyTable(CONFIG)
+BASH_VERDICTS = VerdictCache(BASH_VERDICT_CACHE_FILE, POLICY.classifier)
 ##-##
 
 ## ===== CI DETECTION ===== ##
@@ -150,117 +83,33 @@ Enforces DAIC (Discussion, Alignment, Implementation, Check) workflow:
 # ===== FUNCTIONS ===== #
 
 ## ===== HELPERS ===== ##
-def check_command_arguments(parts):
-    """Check if command arguments indicate write operations"""
-    if not parts: return True
-
-    cmd = parts[0].lower()
-    args = parts[1:] if len(parts) > 1 else []
-
-    # Check sed for in-place editing
-    if cmd in ['sed', 'gsed']:
-        for arg in args:
-            if arg.startswith('-i') or arg == '--in-place':
-                return False  # sed -i is a write operation
-
-    # Check awk for file output operations
-    if cmd in ['awk', 'gawk', 'mawk']:
-        script = ' '.join(args)
-        # Check for output redirection within awk script
-        if re.search(r'>\s*["\'].*["\']', script):  # > "file" or > 'file'
-            return False
-        if re.search(r'>>\s*["\'].*["\']', script):  # >> "file" or >> 'file'
-            return False
-        if 'print >' in script or 'print >>' in script:
-            return False
-        if 'printf >' in script or 'printf >>' in script:
-            return False
-
-    # Check find for dangerous operations
-    if cmd == 'find':
-        if '-delete' in args:
-            return False
-        for i, arg in enumerate(args):
-            if arg in ['-exec', '-execdir']:
-                if i + 1 < len(args):
-                    exec_cmd = args[i + 1].lower()
-                    if exec_cmd in WRITE_FIRST or exec_cmd in ['rm', 'mv', 'cp', 'shred']:
-                        return False
-
-    # Check xargs for dangerous commands
-    if cmd == 'xargs':
-        for write_cmd in WRITE_FIRST:
-            if write_cmd in args:
-                return False
-        # Check for sed -i through xargs
-        if 'sed' in args:
-            sed_idx = args.index('sed')
-            if sed_idx + 1 < len(args) and args[sed_idx + 1].startswith('-i'):
-                return False
-
-    return True
-
 # Check if a bash command is read-only (no writes, no redirections)
-def is_bash_read_only(command: str, extrasafe: bool = CONFIG.blocked_actions.extrasafe or True) -> bool:
+def is_bash_read_only(command: str) -> bool:
     """Determine if a bash command is read-only.
 
-    Enhanced to check command arguments for operations like:
+    The command is parsed once into a command tree (pipelines, lists, subshells,
+    $(...)/backtick substitutions, heredocs) and every simple command is checked,
+    including arguments that write:
     - sed -i (in-place editing)
     - awk with file output
-    - find -delete or -exec rm
+    - find -delete or -exec <write command>
     - xargs with write commands
 
+    Verdicts are cached on disk across hook runs (see VerdictCache).
+
     Args:
-        command (str): The bash command to evaluate.
-        extrasafe (bool): If True, unrecognized commands are treated as write-like."""
-    s = (command or '').strip()
-    if not s: return True
-
-    if REDIR.search(s):
-        return False
-
-    for segment in re.split(r'(?<!\|)\|(?!\|)|&&|\|\|', s):  # Split on |, && and ||
-        segment = segment.strip()
-        if not segment: continue
-        try: parts = shlex.split(segment)
-        except ValueError: return not CONFIG.blocked_actions.extrasafe
-        if not parts: continue
-
-        first = parts[0].lower()
-        if first == 'cd': continue
-
-        # Special case: Commands with read-only subcommands
-        if first in ['pip', 'pip3']:
-            subcommand = parts[1].lower() if len(parts) > 1 else ''
-            if subcommand in ['show', 'list', 'search', 'check', 'freeze', 'help']:
-                continue  # Allow read-only pip operations
-            return False  # Block write operations
-
-        if first in ['npm', 'yarn']:
-            subcommand = parts[1].lower() if len(parts) > 1 else ''
-            if subcommand in ['list', 'ls', 'view', 'show', 'search', 'help']:
-                continue  # Allow read-only npm/yarn operations
-            return False  # Block write operations
-
-        if first in ['python', 'python3']:
-            # Allow python -c for simple expressions and python -m for module execution
-            if len(parts) > 1 and parts[1] in ['-c', '-m']:
-                continue  # These are typically read-only operations in our context
-            # Block other python invocations as potentially write-like
-            return False
-
-        if first in WRITE_FIRST: return False
-
-        # Check command arguments for write operations
-        if not check_command_arguments(parts): return False
-
-        # Check if command is in user's custom readonly list
-        if first in CONFIG.blocked_actions.bash_read_patterns: continue  # Allow custom readonly commands
-
-        # If extrasafe is on and command not in readonly list, block it
-        if first not in READONLY_FIRST and CONFIG.blocked_actions.extrasafe: return False
-
-    return True
+        command (str): The bash command to evaluate."""
+    return BASH_VERDICTS.is_read_only(command)
+
+def finish(verdict: str, reason: str, message: Optional[str] = None) -> None:
+    """Log the enforcement decision, print any feedback, and exit (2 = block)."""
+    fields = {"tool": tool_name, "verdict": verdict, "reason": reason, "mode": STATE.mode.value}
+    if STATE.specialized_mode.value != "none": fields["specialized_mode"] = STATE.specialized_mode.value
+    if tool_name == "Bash": fields["command"] = command[:200]
+    elif file_path_string: fields["file"] = file_path_string
+    log_event("enforce", **fields)
+    if message: print(message, file=sys.stderr)
+    sys.exit(2 if verdict == "block" else 0)
 ##-##
 
 #-#
@@ -271,25 +120,17 @@ def is_bash_read_only(command: str, extrasafe: bool = CONFIG.blocked_actions.ext
 if is_ci_environment():
     sys.exit(0)
 
-#!> Bash command handling
-# For Bash commands, check if it's a read-only operation
-if tool_name == "Bash" and STATE.mode is Mode.NO and not STATE.flags.bypass_mode:
-    # Special case: Allow sessions.api commands in discussion mode
-    if command and ('sessions ' in command or 'python -m cc_sessions.scripts.api' in command):
-        # API commands are allowed in discussion mode for state inspection and safe config operations
-        sys.exit(0)
+#!> Static policy decision
+# One lookup in the compiled (mode, specialized_mode, bypass, tool) table; see policy.py
+DECISION = POLICY.lookup(STATE.mode, STATE.specialized_mode, STATE.flags.bypass_mode, tool_name)
+#!<
 
-    if not is_bash_read_only(command):
-        # Detect OS for correct sessions command
-        is_windows = platform.system() == "Windows"
-        sessions_cmd = "sessions/bin/sessions.bat" if is_windows else "sessions/bin/sessions"
-
-        print(f"[DAIC] Blocked write-like Bash command in Discussion mode. Only the user can activate implementation mode. Explain what you want to do and seek alignment and approval first.\n"
-              f"Note: Both Claude and the user can configure allowed commands:\n"
-              f"  - View allowed: {sessions_cmd} config read list\n"
-              f"  - Add command: {sessions_cmd} config read add <command>\n"
-              f"  - Remove command: {sessions_cmd} config read remove <command>", file=sys.stderr); sys.exit(2)  # Block with feedback
-    else: sys.exit(0)
+#!> Bash command handling
+# For Bash commands in discussion mode, check if it's a read-only operation
+if DECISION.action is Action.CLASSIFY_BASH:
+    # API commands are allowed in discussion mode for state inspection and safe config operations
+    DECISION = POLICY.decide_bash(command, is_read_only=is_bash_read_only)
+    finish(DECISION.action.value, DECISION.reason, DECISION.message)  # Block with feedback, or allow
 #!<
 
 #!> Block any attempt to modify sessions-state.json directly
@@ -299,52 +140,25 @@ if file_path and all([
     file_path.parent.name == 'sessions']):
     # Check if it's a modifying operation
     if not is_bash_read_only(command):
-        print("[Security] Direct modification of sessions-state.json is not allowed. "
-                "This file should only be modified through the TodoWrite tool and approved commands.", file=sys.stderr); sys.exit(2)
+        finish("block", "state_file_guard", "[Security] Direct modification of sessions-state.json is not allowed. "
+                "This file should only be modified through the TodoWrite tool and approved commands.")
 #!<
  
 # --- All commands beyond here contain write patterns (read patterns exit early) ---
 
-#!> Specialized mode enforcement (check tool restrictions)
-if STATE.specialized_mode != SpecializedMode.NONE and not STATE.flags.bypass_mode:
-    mode_config = SPECIALIZED_MODE_CONFIGS.get(STATE.specialized_mode)
-    if mode_config:
-        # Map tool names to CCTools enum
-        tool_enum_map = {
-            "Read": CCTools.READ,
-            "Write": CCTools.WRITE,
-            "Edit": CCTools.EDIT,
-            "MultiEdit": CCTools.MULTIEDIT,
-            "NotebookEdit": CCTools.NOTEBOOKEDIT,
-            "Bash": CCTools.BASH,
-            "Grep": CCTools.GREP,
-            "Glob": CCTools.GLOB,
-            "Task": CCTools.TASK,
-        }
-
-        current_tool = tool_enum_map.get(tool_name)
-
-        # Check if tool is in blocked list for this mode
-        if current_tool and current_tool in mode_config.blocked_tools:
-            print(f"[Specialized Mode: {STATE.specialized_mode.value}] The {tool_name} tool is not allowed in this mode.", file=sys.stderr)
-            print(f"This mode only allows: {', '.join([t.value for t in mode_config.allowed_tools])}", file=sys.stderr)
-            print(f"\nTo exit this mode, use one of these phrases: {', '.join(mode_config.exit_phrases[:2])}...", file=sys.stderr)
-            sys.exit(2)  # Block with feedback
-
-        # If tool is not in allowed list (and not explicitly in blocked list), also block
-        if current_tool and mode_config.allowed_tools and current_tool not in mode_config.allowed_tools:
-            print(f"[Specialized Mode: {STATE.specialized_mode.value}] The {tool_name} tool is not in the allowed tools for this mode.", file=sys.stderr)
-            print(f"Allowed tools: {', '.join([t.value for t in mode_config.allowed_tools])}", file=sys.stderr)
-            print(f"\nTo exit this mode, use one of these phrases: {', '.join(mode_config.exit_phrases[:2])}...", file=sys.stderr)
-            sys.exit(2)  # Block with feedback
+#!> Specialized mode tool restrictions and discussion mode guard (block write tools)
+if DECISION.action is Action.BLOCK: finish("block", DECISION.reason, DECISION.message)  # Block with feedback
+if DECISION.action is Action.ALLOW: finish("allow", DECISION.reason)  # Allow read-only tools in discussion mode
 #!<
 
-#!> Discussion mode guard (block write tools)
-if STATE.mode is Mode.NO and not STATE.flags.bypass_mode:
-    if CONFIG.blocked_actions.is_tool_blocked(tool_name):
-        print(f"[DAIC: Tool Blocked] You're in discussion mode. The {tool_name} tool is not allowed. You need to seek alignment first.", file=sys.stderr)
-        sys.exit(2)  # Block with feedback
-    else: sys.exit(0)  # Allow read-only tools
+#!> Specialized mode path scope
+# `sessions smode enter refactor src/auth` fences file edits to src/auth (scope compiled at enter time)
+if file_path and tool_name in SCOPE_TOOLS and STATE.specialized_mode.value != "none" and not STATE.flags.bypass_mode:
+    scope = load_scope(STATE.metadata, STATE.specialized_mode.value, PROJECT_ROOT)
+    if scope and not scope.contains(file_path):
+        finish("block", "specialized_mode_out_of_scope",
+               f"[Specialized Mode: {STATE.specialized_mode.value}] {file_path_string} is outside this mode's scope: {scope.describe()}\n"
+               f"Keep changes within the scope, or ask the user to re-enter the mode with a wider one.")
 #!<
 
 #!> TodoWrite tool handling
@@ -410,55 +224,53 @@ Or, feel free to yell at me or redirect me like I'm a 5 year old child.
 
 After the user approves with a trigger phrase, you may re-submit the updated todo list using TodoWrite."""
 
-            print(message, file=sys.stderr)
-            sys.exit(2)
+            finish("block", "todo_change", message)
 
     with edit_state() as s: 
-        if not s.todos.store_todos(incoming_todos): print("[TodoWrite Error] Failed to store todos - check format", file=sys.stderr); sys.exit(2)
+        if not s.todos.store_todos(incoming_todos): finish("block", "todo_invalid", "[TodoWrite Error] Failed to store todos - check format")
         else: STATE = s
 #!<
 
 #!> TodoList modification guard
 # Get the file path being edited
-if not file_path: sys.exit(0) # No file path, allow to proceed
+if not file_path: finish("allow", "no_file_path") # No file path, allow to proceed
 
 # Block direct modification of state file via Write/Edit/MultiEdit
 if all([    tool_name in ["Write", "Edit", "MultiEdit", "NotebookEdit"],
             file_path.name == 'sessions-state.json',
             file_path.parent.name == 'sessions',
             not STATE.flags.bypass_mode]):
-    print("[Security] Direct modification of sessions-state.json is not allowed. "
-        "This file should only be modified through the TodoWrite tool and approved commands.", file=sys.stderr)
-    sys.exit(2)
+    finish("block", "state_file_guard", "[Security] Direct modification of sessions-state.json is not allowed. "
+        "This file should only be modified through the TodoWrite tool and approved commands.")
 #!<
 
 #!> Git branch/task submodules enforcement
-if not (expected_branch := STATE.current_task.branch): sys.exit(0) # No branch/task info, allow to proceed
+if not (expected_branch := STATE.current_task.branch): finish("allow", "no_task_branch") # No branch/task info, allow to proceed
 
 # Check if branch enforcement is enabled
 if not CONFIG.features.branch_enforcement:
-    sys.exit(0)  # Branch enforcement disabled, allow to proceed
+    finish("allow", "branch_enforcement_disabled")  # Branch enforcement disabled, allow to proceed
 
 else:
-    repo_path = find_git_repo(file_path.parent)
+    # Owning repo from the cached repo map (trie over .gitmodules + nested clones); rebuilt if .gitmodules changed.
+    # Directories below the mapped owner are checked for .git too, so clones made since the map was built still win
+    repo_map = STATE.metadata.get(REPO_MAP_KEY)
+    if not repo_map_is_current(repo_map, PROJECT_ROOT):
+        repo_map = build_repo_map(PROJECT_ROOT)
+        with edit_state() as s: s.metadata[REPO_MAP_KEY] = repo_map
+    repo_rel = RepoTrie(PROJECT_ROOT, repo_map["repos"]).owner(file_path.parent, verify=True)
+    repo_path = PROJECT_ROOT / repo_rel if repo_rel is not None else find_git_repo(file_path.parent)
 
     if repo_path:
         try:
-            result = subprocess.run(
-                ["git", "branch", "--show-current"],
-                cwd=str(repo_path),
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            current_branch = result.stdout.strip()
-    
+            current_branch = read_current_branch(repo_path)
+
             # Extract the submodule name from the repo path
             submodule_name = repo_path.name
 
             # Check both conditions: branch status and task inclusion
             branch_correct = (current_branch == expected_branch)
-            in_task = (STATE.current_task.submodules and submodule_name in STATE.current_task.submodules)
+            in_task = (STATE.current_task.submodules and (submodule_name in STATE.current_task.submodules or repo_rel in STATE.current_task.submodules))
             if repo_path == PROJECT_ROOT: in_task = True # Root repo - always considered in task
 
             # Scenario 1: Everything is correct - allow to proceed
@@ -466,30 +278,31 @@ else:
 
             # Scenario 2: Submodule is in task but on wrong branch
             elif in_task and not branch_correct:
-                print(f"[Branch Mismatch] Submodule '{submodule_name}' is part of this task but is on branch '{current_branch}' instead of '{expected_branch}'.", file=sys.stderr)
-                print(f"Please run: cd {repo_path.relative_to(PROJECT_ROOT)} && git checkout {expected_branch}", file=sys.stderr)
-                sys.exit(2)
+                finish("block", "branch_mismatch",
+                       f"[Branch Mismatch] Submodule '{submodule_name}' is part of this task but is on branch '{current_branch}' instead of '{expected_branch}'.\n"
+                       f"Please run: cd {repo_path.relative_to(PROJECT_ROOT)} && git checkout {expected_branch}")
 
             # Scenario 3: Submodule not in task but already on correct branch
             elif not in_task and branch_correct:
-                print(f"[Submodule Not in Task] Submodule '{submodule_name}' is on the correct branch '{expected_branch}' but is not listed in the task file.", file=sys.stderr)
-                print(f"Please update the task file to include '{submodule_name}' in the submodules list.", file=sys.stderr)
-                sys.exit(2)
+                finish("block", "submodule_not_in_task",
+                       f"[Submodule Not in Task] Submodule '{submodule_name}' is on the correct branch '{expected_branch}' but is not listed in the task file.\n"
+                       f"Please update the task file to include '{submodule_name}' in the submodules list.")
 
             # Scenario 4: Submodule not in task AND on wrong branch
             else:
-                print(f"[Submodule Not in Task + Wrong Branch] Submodule '{submodule_name}' has two issues:", file=sys.stderr)
-                print(f"  1. Not listed in the task file's submodules", file=sys.stderr)
-                print(f"  2. On branch '{current_branch}' instead of '{expected_branch}'", file=sys.stderr)
-                print(f"To fix: cd {repo_path.relative_to(PROJECT_ROOT)} && git checkout -b {expected_branch}", file=sys.stderr)
-                print(f"Then update the task file to include '{submodule_name}' in the submodules list.", file=sys.stderr)
-                sys.exit(2)
+                finish("block", "submodule_not_in_task_wrong_branch",
+                       f"[Submodule Not in Task + Wrong Branch] Submodule '{submodule_name}' has two issues:\n"
+                       f"  1. Not listed in the task file's submodules\n"
+                       f"  2. On branch '{current_branch}' instead of '{expected_branch}'\n"
+                       f"To fix: cd {repo_path.relative_to(PROJECT_ROOT)} && git checkout -b {expected_branch}\n"
+                       f"Then update the task file to include '{submodule_name}' in the submodules list.")
         except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
             # Can't check branch, allow to proceed but warn
             print(f"Warning: Could not verify branch for {repo_path.name}: {e}", file=sys.stderr)
+            log_event("enforce_warning", tool=tool_name, reason="branch_unverified", repo=str(repo_path), error=str(e))
 #!<
 
 #-#
 
 # Allow tool to proceed
-sys.exit(0)
+finish("allow", "passed_checks")
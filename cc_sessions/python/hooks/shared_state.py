@@ -5,11 +5,11 @@
 ## ===== STDLIB ===== ##
 from __future__ import annotations
 
-from typing import Optional, List, Dict, Any, Iterator, Literal, Union
-from importlib.metadata import version, PackageNotFoundError
+from typing import Optional, List, Dict, Any, Iterator, Literal, Union, Tuple
 from dataclasses import dataclass, asdict, field
 from contextlib import contextmanager, suppress
-import json, os, tempfile, shutil, sys
+from datetime import datetime, timezone
+import json, os, tempfile, shutil, sys, copy
 from time import monotonic, sleep
 from pathlib import Path
 from enum import Enum
@@ -19,6 +19,16 @@ from enum import Enum
 ##-##
 
 ## ===== LOCAL ===== ##
+try: from .event_log import get_event_log, event_source
+except ImportError: from event_log import get_event_log, event_source
+try: from .hook_timing import start_hook_timer
+except ImportError: from hook_timing import start_hook_timer
+try: from .transcript_index import TranscriptIndex, index_transcript
+except ImportError: from transcript_index import TranscriptIndex, index_transcript
+try: from .transcript_reader import last_entry
+except ImportError: from transcript_reader import last_entry
+try: from .snapshot_store import SnapshotStore
+except ImportError: from snapshot_store import SnapshotStore
 ##-##
 
 #-#
@@ -36,6 +46,18 @@ PROJECT_ROOT = find_project_root()
 STATE_FILE = PROJECT_ROOT / "sessions" / "sessions-state.json"
 LOCK_DIR  = STATE_FILE.with_suffix(".lock")
 CONFIG_FILE = PROJECT_ROOT / "sessions" / "sessions-config.json"
+STATE_HISTORY_FILE = STATE_FILE.with_suffix(".history.jsonl")
+STATE_HISTORY_LIMIT = 50  # Revisions kept after compaction (file holds at most 2x this)
+CACHE_DIR = PROJECT_ROOT / "sessions" / "cache"  # Derived data only; safe to delete at any time
+BASH_VERDICT_CACHE_FILE = CACHE_DIR / "bash-verdicts.bin"
+EVENT_LOG_FILE = PROJECT_ROOT / "sessions" / "logs" / "events.ndjson"  # Enforcement decisions and mode transitions (rotated)
+STATUSLINE_CACHE_FILE = CACHE_DIR / "statusline.json"
+SESSION_MODELS_DIR = CACHE_DIR / "session-models"  # <session_id>.json: model the statusline last saw (lock-free sidecar)
+HOOK_LATENCY_DIR = CACHE_DIR / "hook-latency"  # <session_id>.bin: rolling window of hook latencies (hook_timing.py)
+TRANSCRIPT_INDEX_DIR = CACHE_DIR / "transcript-index"  # <transcript stem>.json: incremental transcript index (transcript_index.py)
+TRANSCRIPT_REGISTRY_FILE = CACHE_DIR / "transcripts.json"  # session_id -> transcript path the session is writing to
+SNAPSHOT_STORE_DIR = CACHE_DIR / "snapshots"  # Content-addressed subagent transcript chunks (snapshot_store.py)
+TRANSCRIPT_REGISTRY_SESSIONS = 64  # Sessions kept in the registry (least recently registered dropped)
 
 # Mode description strings
 DISCUSSION_MODE_MSG = "You are now in Discussion Mode and should focus on discussing and investigating with the user (no edit-based tools)"
@@ -354,6 +376,24 @@ class EnabledFeatures:
             icon_style=icon_style_value,
             context_warnings=cw
         )
+
+@dataclass
+class StatuslineSettings:
+    cache_ttl: float = 5.0  # Max seconds a cached segment is shown without recomputing (0 disables the cache)
+    render_deadline_ms: int = 500  # Segments still computing after this are shown stale (0 waits for all)
+    latency_warn_ms: int = 250  # Latency segment turns orange when an enforcement/post-tool hook's p95 exceeds this (red at 2x)
+    # Lines of segment names (built-ins: context, task, mode, edited, open_tasks, branch, plus custom ones)
+    layout: List[List[str]] = field(default_factory=lambda: [["context", "task"], ["mode", "edited", "open_tasks", "branch"]])
+    # name -> {"command": shell command, "inputs": [files whose change re-runs it], "ttl": seconds}
+    custom_segments: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+@dataclass
+class SnapshotSettings:
+    prune: bool = True  # Prune tool output in subagent transcript snapshots (the switch for everything below)
+    tool_result_max_chars: int = 6000  # Longer tool results keep only head and tail excerpts (0 never truncates)
+    excerpt_chars: int = 1500  # Size of each of those excerpts
+    dedupe_reads: bool = True  # Replace a Read identical to an earlier read of the same file with a marker
+    collapse_failures: bool = True  # Replace a failing command's output that repeats its previous failure with a marker
 #!<
 
 #!> Config object
@@ -364,6 +404,8 @@ class SessionsConfig:
     environment: SessionsEnv = field(default_factory=SessionsEnv)
     blocked_actions: BlockingPatterns = field(default_factory=BlockingPatterns)
     features: EnabledFeatures = field(default_factory=EnabledFeatures)
+    statusline: StatuslineSettings = field(default_factory=StatuslineSettings)
+    snapshots: SnapshotSettings = field(default_factory=SnapshotSettings)
 
     @classmethod
     def from_dict(cls, d: Dict[str, Any]) -> "SessionsConfig":
@@ -372,7 +414,9 @@ class SessionsConfig:
             git_preferences=GitPreferences(**d.get("git_preferences", {})),
             environment=SessionsEnv(**d.get("environment", {})),
             blocked_actions=BlockingPatterns(**d.get("blocked_actions", {})),
-            features=EnabledFeatures.from_dict(d.get("features", {})))
+            features=EnabledFeatures.from_dict(d.get("features", {})),
+            statusline=StatuslineSettings(**d.get("statusline", {})),
+            snapshots=SnapshotSettings(**d.get("snapshots", {})))
 
     def to_dict(self) -> Dict[str, Any]: return asdict(self)
 #!<
@@ -630,10 +674,19 @@ class SessionsLearnings:
             loaded_patterns=patterns
         )
 
+_PACKAGE_VERSION: Optional[str] = None
+
 def _get_package_version() -> str:
-    """Get the installed cc-sessions package version."""
-    try: return version("cc-sessions")
-    except PackageNotFoundError: return "unknown"
+    """Get the installed cc-sessions package version (looked up once per process).
+
+    importlib.metadata is imported here rather than at module level: it costs tens of
+    milliseconds, and every hook and statusline render imports this module."""
+    global _PACKAGE_VERSION
+    if _PACKAGE_VERSION is None:
+        from importlib.metadata import version, PackageNotFoundError
+        try: _PACKAGE_VERSION = version("cc-sessions")
+        except PackageNotFoundError: _PACKAGE_VERSION = "unknown"
+    return _PACKAGE_VERSION
 #!<
 
 # Default specialized mode configurations
@@ -705,8 +758,7 @@ class SessionsState:
 
     @classmethod
     def from_dict(cls, d: Dict[str, Any]) -> "SessionsState":
-        try: pkg_version = version("cc-sessions")
-        except PackageNotFoundError: pkg_version = "unknown"
+        pkg_version = _get_package_version()
 
         active_protocol = d.get("active_protocol")
         if active_protocol and isinstance(active_protocol, str): active_protocol = SessionsProtocol(active_protocol)
@@ -985,6 +1037,121 @@ def _lock(lock_dir: Path, timeout: float = 1.0, poll: float = 0.05, stale_timeou
         with suppress(Exception): shutil.rmtree(lock_dir)
 ##-##
 
+## ===== STATE HISTORY ===== ##
+_ABSENT = object()
+
+def _state_delta(old: Dict[str, Any], new: Dict[str, Any], path: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+    """Diff two state dicts into leaf ops: {"p": key path, "o": old value, "n": new value}.
+    Dicts are recursed into; lists and scalars are replaced whole. A missing "o"/"n" means the key was absent."""
+    ops = []
+    for key in (*old.keys(), *(k for k in new.keys() if k not in old)):
+        a, b = old.get(key, _ABSENT), new.get(key, _ABSENT)
+        if a == b: continue
+        if isinstance(a, dict) and isinstance(b, dict): ops.extend(_state_delta(a, b, (*path, key))); continue
+        op: Dict[str, Any] = {"p": [*path, key]}
+        if a is not _ABSENT: op["o"] = a
+        if b is not _ABSENT: op["n"] = b
+        ops.append(op)
+    return ops
+
+def _apply_state_delta(d: Dict[str, Any], ops: List[Dict[str, Any]], reverse: bool = False) -> Dict[str, Any]:
+    """Apply delta ops to a state dict in place (reverse=True restores the old values)."""
+    side = "o" if reverse else "n"
+    for op in (reversed(ops) if reverse else ops):
+        *parents, leaf = op["p"]
+        node = d
+        for key in parents: node = node.setdefault(key, {})
+        if side in op: node[leaf] = copy.deepcopy(op[side])
+        else: node.pop(leaf, None)
+    return d
+
+def _last_history_line(path: Path, block: int = 4096) -> Optional[str]:
+    """Read the last line of the history file by seeking backwards from EOF."""
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = pos = f.tell()
+        buf = b""
+        while pos > 0:
+            pos = max(0, pos - block)
+            f.seek(pos)
+            buf = f.read(end - pos)
+            if buf.rstrip(b"\n").rfind(b"\n") != -1: break
+        lines = buf.rstrip(b"\n").rsplit(b"\n", 1)
+        return lines[-1].decode("utf-8") if lines[-1] else None
+
+def _record_state_delta(before: Dict[str, Any], after: Dict[str, Any], source: Optional[str] = None) -> Optional[int]:
+    """Append the before→after delta as a new revision. Caller must hold the state lock.
+    Returns the new revision number, or None if nothing changed."""
+    if not (ops := _state_delta(before, after)): return None
+    rev = 1
+    if STATE_HISTORY_FILE.exists() and (last := _last_history_line(STATE_HISTORY_FILE)):
+        with suppress(json.JSONDecodeError, KeyError, TypeError): rev = json.loads(last)["rev"] + 1
+    if source is None:
+        argv0 = Path(sys.argv[0]) if sys.argv and sys.argv[0] else Path("unknown")
+        source = argv0.parent.name if argv0.stem == "__main__" else argv0.stem
+    record = {"rev": rev, "ts": datetime.now(timezone.utc).isoformat(), "src": source, "ops": ops}
+    with STATE_HISTORY_FILE.open("a", encoding="utf-8") as f: f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    # Amortized compaction: every LIMIT revisions, drop everything but the newest LIMIT
+    if rev % STATE_HISTORY_LIMIT == 0:
+        keep = read_state_history()[-STATE_HISTORY_LIMIT:]
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=str(STATE_HISTORY_FILE.parent), encoding="utf-8") as tmp:
+            tmp.writelines(json.dumps(r, separators=(",", ":")) + "\n" for r in keep)
+            tmp_name = tmp.name
+        os.replace(tmp_name, STATE_HISTORY_FILE)
+    return rev
+
+def log_event(event: str, **fields: Any) -> None:
+    """Queue an event for the enforcement event log (written once at process exit)."""
+    get_event_log(EVENT_LOG_FILE).emit(event, **fields)
+
+def _log_mode_transitions(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    """Log DAIC and specialized mode changes made by a state write."""
+    for key, event in (("mode", "mode_change"), ("specialized_mode", "specialized_mode_change")):
+        if before.get(key) != after.get(key): log_event(event, **{"from": before.get(key), "to": after.get(key)})
+
+def read_state_history(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Return recorded state revisions, oldest first (optionally only the newest `limit`)."""
+    if not STATE_HISTORY_FILE.exists(): return []
+    records = []
+    with STATE_HISTORY_FILE.open("r", encoding="utf-8", errors="backslashreplace") as f:
+        for line in f:
+            try: records.append(json.loads(line))
+            except json.JSONDecodeError: continue
+    return records[-limit:] if limit else records
+
+def undo_state(steps: int = 1, allow_escalation: bool = False) -> Tuple[SessionsState, List[int]]:
+    """Revert the newest `steps` revisions. The undo is itself recorded, so it can be undone.
+
+    Args:
+        steps: Number of revisions to revert
+        allow_escalation: Permit restoring implementation mode or bypass mode (user-initiated only)
+
+    Returns:
+        (restored state, reverted revision numbers newest first)
+    """
+    if steps < 1: raise ValueError("Undo steps must be a positive integer")
+    with _lock(LOCK_DIR):
+        records = read_state_history(limit=steps)
+        if not records: raise StateError("No state history to undo.")
+        before = load_state().to_dict()
+        restored = copy.deepcopy(before)
+        for record in reversed(records): _apply_state_delta(restored, record.get("ops", []), reverse=True)
+        state = SessionsState.from_dict(restored)
+
+        if not allow_escalation:
+            if state.mode is Mode.GO and before.get("mode") != Mode.GO.value:
+                raise StateError("Undo would restore implementation mode. Only the user can do that (use the slash command).")
+            if state.flags.bypass_mode and not before.get("flags", {}).get("bypass_mode"):
+                raise StateError("Undo would re-enable bypass mode. Only the user can do that (use the slash command).")
+
+        after = state.to_dict()
+        _the_ol_in_out(STATE_FILE, after)
+        reverted = [r.get("rev") for r in reversed(records)]
+        with suppress(Exception): _record_state_delta(before, after, source=f"undo:{','.join(str(r) for r in reverted)}")
+        with suppress(Exception): _log_mode_transitions(before, after)
+    return state, reverted
+##-##
+
 ## ===== GEIPI ===== ##
 def load_state() -> SessionsState:
     if not STATE_FILE.exists():
@@ -1033,9 +1200,16 @@ def edit_state() -> Iterator[SessionsState]:
     # Acquire lock, reload (so we operate on latest), yield, then save atomically
     with _lock(LOCK_DIR):
         state = load_state()
+        before = state.to_dict()
         try: yield state
         except Exception: raise
-        else: _the_ol_in_out(STATE_FILE, state.to_dict())
+        else:
+            after = state.to_dict()
+            _the_ol_in_out(STATE_FILE, after)
+            if after == before: return  # Nothing changed: no revision to diff, record or log
+            # History is best-effort; never let it break a state write
+            with suppress(Exception): _record_state_delta(before, after)
+            with suppress(Exception): _log_mode_transitions(before, after)
 
 @contextmanager
 def edit_config() -> Iterator[SessionsConfig]:
@@ -1047,4 +1221,124 @@ def edit_config() -> Iterator[SessionsConfig]:
         else: _the_ol_in_out(CONFIG_FILE, config.to_dict())
 ##-##
 
+## ===== SESSION MODEL ===== ##
+# The statusline is the only place that sees the active model. It records it per session in a
+# sidecar (atomic replace, no lock, no fsync) instead of state, so UI refreshes never contend with
+# hooks and sessions on different models don't overwrite each other.
+def _session_file_stem(session_id: str) -> str:
+    return "".join(c for c in session_id if c.isalnum() or c in "-_") or "unknown"
+
+def session_model_file(session_id: str) -> Path:
+    return SESSION_MODELS_DIR / f"{_session_file_stem(session_id)}.json"
+
+def record_session_model(session_id: str, model: Model) -> None:
+    """Write the session's model sidecar (best-effort)."""
+    path = session_model_file(session_id)
+    with suppress(OSError):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=str(path.parent), prefix=".model-", encoding="utf-8") as tmp:
+            json.dump({"model": Model(model).value, "recorded": datetime.now(timezone.utc).isoformat(timespec="seconds")}, tmp)
+            tmp_name = tmp.name
+        os.replace(tmp_name, path)
+
+def session_model(session_id: Optional[str], default: Model) -> Model:
+    """Model recorded for `session_id` by the statusline, or `default` (usually STATE.model) if unknown."""
+    if not session_id: return default
+    try: return Model(json.loads(session_model_file(session_id).read_text(encoding="utf-8"))["model"])
+    except (OSError, ValueError, KeyError, TypeError): return default
+##-##
+
+## ===== HOOK LATENCY ===== ##
+# Hooks time themselves (process start to exit) into a per-session rolling window that the
+# statusline's latency segment reads; see hook_timing.py
+def hook_latency_file(session_id: str) -> Path:
+    return HOOK_LATENCY_DIR / f"{_session_file_stem(session_id)}.bin"
+
+def time_hook(session_id: Optional[str]) -> None:
+    """Record the running hook's latency for `session_id` when the process exits (no-op without a session)."""
+    if session_id: start_hook_timer(hook_latency_file(session_id), event_source())
+##-##
+
+## ===== TRANSCRIPT INDEX ===== ##
+# The statusline, context warnings and subagent snapshots share one incremental index per
+# transcript, so each of them parses only what was appended since any of them last looked
+def transcript_index_file(transcript_path: Union[str, Path]) -> Path:
+    return TRANSCRIPT_INDEX_DIR / f"{_session_file_stem(Path(transcript_path).stem)}.json"
+
+def transcript_index(transcript_path: Union[str, Path]) -> TranscriptIndex:
+    """Up-to-date index of `transcript_path` (an empty index if it cannot be read)."""
+    return index_transcript(transcript_path, transcript_index_file(transcript_path))
+##-##
+
+## ===== TRANSCRIPT REGISTRY ===== ##
+# Hook payloads can carry a transcript path the session no longer writes to. Hooks register the
+# path they are given per session id (a newer file wins), so recovering the live transcript is a
+# lookup; the registry is derived data, written lock-free with an atomic replace.
+def _load_transcript_registry() -> Dict[str, Any]:
+    try: registry = json.loads(TRANSCRIPT_REGISTRY_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError): return {}
+    return registry if isinstance(registry, dict) else {}
+
+def _mtime(path: Union[str, Path, None]) -> float:
+    try: return os.stat(path).st_mtime if path else -1.0
+    except OSError: return -1.0
+
+def register_transcript(session_id: Optional[str], transcript_path: Optional[str]) -> None:
+    """Record `transcript_path` for `session_id` unless a more recently written transcript is already registered."""
+    if not session_id or not transcript_path: return
+    registry = _load_transcript_registry()
+    current = registry.get(session_id)
+    current_path = current.get("path") if isinstance(current, dict) else None
+    if current_path == transcript_path or _mtime(current_path) > _mtime(transcript_path): return
+    registry[session_id] = {"path": str(transcript_path), "registered": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+    if len(registry) > TRANSCRIPT_REGISTRY_SESSIONS:
+        for sid in sorted(registry, key=lambda s: str(registry[s].get("registered", "")) if isinstance(registry[s], dict) else "")[:len(registry) - TRANSCRIPT_REGISTRY_SESSIONS]: registry.pop(sid, None)
+    with suppress(OSError):
+        TRANSCRIPT_REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=str(TRANSCRIPT_REGISTRY_FILE.parent), prefix=".transcripts-", encoding="utf-8") as tmp:
+            json.dump(registry, tmp, separators=(",", ":"))
+            tmp_name = tmp.name
+        os.replace(tmp_name, TRANSCRIPT_REGISTRY_FILE)
+
+def _age_seconds(timestamp: Optional[str]) -> Optional[float]:
+    if not timestamp: return None
+    try: return (datetime.now(timezone.utc) - datetime.fromisoformat(timestamp.replace("Z", "+00:00"))).total_seconds()
+    except ValueError: return None
+
+def resolve_transcript(transcript_path: Optional[str], session_id: Optional[str], stale_threshold: float = 30) -> Optional[str]:
+    """The transcript `session_id` is currently writing to: `transcript_path` unless its newest entry is
+    older than `stale_threshold` seconds and a fresher one is known for the session.
+
+    Freshness comes from the shared transcript index. The registry is tried first; only when it has
+    nothing fresher are the 5 most recent transcripts checked, by their last line (read from EOF)."""
+    if not transcript_path or not os.path.exists(transcript_path) or not session_id: return transcript_path
+    age = _age_seconds(transcript_index(transcript_path).last_timestamp)
+    if age is None or age <= stale_threshold: return transcript_path
+
+    entry = _load_transcript_registry().get(session_id)
+    registered = entry.get("path") if isinstance(entry, dict) else None
+    if registered and registered != transcript_path and os.path.exists(registered):
+        index = transcript_index(registered)
+        registered_age = _age_seconds(index.last_timestamp)
+        if index.session_id == session_id and registered_age is not None and registered_age <= stale_threshold: return registered
+
+    try: candidates = sorted(Path(transcript_path).parent.glob("*.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True)[:5]
+    except OSError: return transcript_path
+    for candidate in candidates:
+        if str(candidate) in (transcript_path, registered): continue
+        last = last_entry(candidate) or {}
+        candidate_age = _age_seconds(last.get("timestamp"))
+        if last.get("sessionId") == session_id and candidate_age is not None and candidate_age <= stale_threshold:
+            register_transcript(session_id, str(candidate))
+            return str(candidate)
+    return transcript_path
+##-##
+
+## ===== SNAPSHOT STORE ===== ##
+# Subagent transcript snapshots are stored as content-addressed chunks; the Task hooks write and
+# release per-agent manifests, and unreferenced chunks are collected; see snapshot_store.py
+def snapshot_store() -> SnapshotStore:
+    return SnapshotStore(SNAPSHOT_STORE_DIR)
+##-##
+
 #-#
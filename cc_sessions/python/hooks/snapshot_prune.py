@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Subagent Snapshot Pruning
+
+Shrinks tool output in cleaned transcript entries before they are packed into chunks:
+- Tool results longer than `max_chars` keep a head and a tail excerpt of `excerpt_chars`
+  each; the middle is replaced by a marker saying how much was left out
+- A Read whose result is identical to an earlier read of the same file (and range) is
+  replaced by a marker (a file edited in between reads differently, so it is kept)
+- A failing Bash command whose output matches its previous failure (digits aside, so
+  timings and counts do not matter) is replaced by a marker
+Decisions depend only on earlier entries (causal), so pruning a transcript in pieces gives
+the same result as pruning it at once. The state carried between entries is small and
+JSON round-trippable, which lets stored chunk plans resume pruning where they stopped.
+Each marker points back at the entry holding the full output (its transcript offset, in
+`ref` after prune()), so a snapshot that drops that entry can be pruned again without it.
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, List, Optional
+import hashlib, re
+
+try: from .transcript_chunks import estimate_tokens
+except ImportError: from transcript_chunks import estimate_tokens
+
+# ===== GLOBALS ===== #
+PRUNE_STATE_ENTRIES = 256  # Reads, failures and pending tool calls remembered (each, newest)
+_DIGITS = re.compile(r"\d+")
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def _digest(text: str) -> str: return hashlib.blake2b(text.encode("utf-8", "replace"), digest_size=8).hexdigest()
+
+def _remember(table: Dict[str, Any], key: str, value: Any) -> None:
+    table.pop(key, None)
+    table[key] = value
+    if len(table) > PRUNE_STATE_ENTRIES: del table[next(iter(table))]
+
+def _result_text(block: Dict[str, Any]) -> Optional[str]:
+    """Text of a tool_result block, or None if it holds anything but text (images are left alone)."""
+    content = block.get("content")
+    if isinstance(content, str): return content
+    if isinstance(content, list) and all(isinstance(b, dict) and b.get("type") == "text" for b in content):
+        return "".join(str(b.get("text", "")) for b in content)
+    return None
+
+class SnapshotPruner:
+    """Prunes entries one at a time, oldest first; `state()` checkpoints it for a later `SnapshotPruner(..., state=...)`."""
+
+    def __init__(self, max_chars: int = 0, excerpt_chars: int = 0, dedupe_reads: bool = False, collapse_failures: bool = False,
+                 state: Optional[Dict[str, Any]] = None):
+        self.max_chars = max_chars  # 0 disables truncation
+        self.excerpt_chars = max(0, min(excerpt_chars, max_chars // 2))
+        self.dedupe_reads, self.collapse_failures = dedupe_reads, collapse_failures
+        state = state or {}
+        self.calls: Dict[str, List[str]] = dict(state.get("calls", {}))       # tool_use id -> [tool, read key | command]
+        self.reads: Dict[str, List[Any]] = dict(state.get("reads", {}))       # read key -> [result digest, offset of the entry showing it]
+        self.failures: Dict[str, List[Any]] = dict(state.get("failures", {}))  # command -> [normalized output digest, offset]
+        self.saved_bytes, self.saved_tokens = state.get("saved", [0, 0])
+        self.ref: Optional[int] = None  # Earliest offset the last pruned entry's markers point at (None: no markers)
+
+    @property
+    def enabled(self) -> bool: return bool(self.max_chars or self.dedupe_reads or self.collapse_failures)
+
+    def key(self) -> List[Any]:
+        """Settings that change the output (stored chunk plans are rebuilt when it changes)."""
+        return [self.max_chars, self.excerpt_chars, self.dedupe_reads, self.collapse_failures] if self.enabled else []
+
+    def state(self) -> Dict[str, Any]:
+        return {"calls": dict(self.calls), "reads": dict(self.reads), "failures": dict(self.failures), "saved": [self.saved_bytes, self.saved_tokens]}
+
+    def prune(self, entry: Dict[str, Any], offset: int = 0) -> Dict[str, Any]:
+        """`entry` ({role, content}, read at transcript `offset`) with its tool results pruned (a new dict when anything changed)."""
+        self.ref = None
+        content = entry.get("content")
+        if not self.enabled or not isinstance(content, list): return entry
+        blocks, changed = [], False
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "tool_use": self._track_call(block)
+            elif isinstance(block, dict) and block.get("type") == "tool_result":
+                text, ref = _result_text(block), self.ref
+                replacement = self._prune_result(block, text, offset) if text is not None else None
+                if replacement is not None and len(replacement) < len(text):  # A marker longer than the output saves nothing
+                    self.saved_bytes += len(text.encode("utf-8")) - len(replacement.encode("utf-8"))
+                    self.saved_tokens += estimate_tokens(text) - estimate_tokens(replacement)
+                    block, changed = {**block, "content": replacement}, True
+                else: self.ref = ref  # Output kept in full: it points at nothing
+            blocks.append(block)
+        return {**entry, "content": blocks} if changed else entry
+
+    def _track_call(self, block: Dict[str, Any]) -> None:
+        tool, tool_input = block.get("name"), block.get("input") or {}
+        if tool == "Read" and self.dedupe_reads:
+            target = f"{tool_input.get('file_path', '')}:{tool_input.get('offset', '')}:{tool_input.get('limit', '')}"
+        elif tool == "Bash" and self.collapse_failures: target = str(tool_input.get("command", ""))
+        else: return
+        if block.get("id"): _remember(self.calls, block["id"], [tool, target])
+
+    def _repeat_of(self, table: Dict[str, List[Any]], key: str, digest: str, offset: int) -> bool:
+        """True if `key` last produced `digest` (the marker then points at that entry), else remember it as shown at `offset`."""
+        seen = table.get(key)
+        if seen and seen[0] == digest:
+            _remember(table, key, seen)
+            self.ref = seen[1] if self.ref is None else min(self.ref, seen[1])
+            return True
+        _remember(table, key, [digest, offset])
+        return False
+
+    def _prune_result(self, block: Dict[str, Any], text: str, offset: int) -> Optional[str]:
+        """Replacement text for a tool result, or None to keep it as is."""
+        tool, target = self.calls.pop(str(block.get("tool_use_id")), [None, None])
+        failed = bool(block.get("is_error"))
+        if tool == "Read" and not failed:
+            if self._repeat_of(self.reads, target, _digest(text), offset):
+                return f"[snapshot: same content as the earlier read of {target.rsplit(':', 2)[0]}, {len(text):,} characters omitted]"
+        elif tool == "Bash" and failed:
+            if self._repeat_of(self.failures, target, _digest(_DIGITS.sub("#", text)), offset):
+                return f"[snapshot: failed again with the same output as its previous run, {len(text):,} characters omitted]"
+        elif tool == "Bash": self.failures.pop(target, None)
+        if self.max_chars and len(text) > self.max_chars:
+            head, tail = text[:self.excerpt_chars], text[len(text) - self.excerpt_chars:] if self.excerpt_chars else ""
+            return f"{head}\n[snapshot: {len(text) - len(head) - len(tail):,} characters omitted]\n{tail}"
+        return None
+
+#-#
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Snapshot Store
+
+Subagent transcript chunks are stored once, named by the hash of their content:
+- chunks/<sha256>.txt: written only if no chunk with that content exists yet
+- manifests/<agent>.json: the chunks one Task invocation reads, in order; the agent's
+  directory (sessions/transcripts/<agent>/) gets them as hard links (copies where the
+  filesystem cannot link), so existing chunks are never rewritten
+- plans/<transcript>.json: the closed chunk groups of a transcript and the offsets they
+  cover, so the next Task call reuses them without reading or serializing that prefix
+Garbage collection is reference counted: a chunk is deleted once no manifest and no
+plan refers to it. Plans of the least recently used transcripts are dropped first.
+Storing or reusing a chunk refreshes its mtime, and chunks used within the last
+SNAPSHOT_GC_GRACE seconds are never collected: a concurrent Task hook may hold them
+before its plan or manifest is written.
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+import hashlib, json, os, shutil, tempfile, time
+
+# ===== GLOBALS ===== #
+SNAPSHOT_STORE_VERSION = 1
+SNAPSHOT_PLANS_KEPT = 8  # Transcripts whose chunk plans are kept (most recently used)
+SNAPSHOT_GC_GRACE = 300  # Seconds a stored or reused chunk is safe from collection, referenced or not
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def _safe_name(name: str) -> str:
+    return "".join(c for c in name if c.isalnum() or c in "-_") or "unknown"
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(path.parent), prefix=".tmp-") as tmp:
+        tmp.write(data)
+        tmp_name = tmp.name
+    os.replace(tmp_name, path)
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try: data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError): return {}
+    return data if isinstance(data, dict) and data.get("version") == SNAPSHOT_STORE_VERSION else {}
+
+class SnapshotStore:
+    """Chunk store rooted at `root` (derived data: safe to delete between Task calls)."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.chunks_dir = self.root / "chunks"
+        self.manifests_dir = self.root / "manifests"
+        self.plans_dir = self.root / "plans"
+        self.written = 0  # Chunks written by this instance (the rest were already stored)
+
+    #!> Chunks
+    def chunk_path(self, digest: str) -> Path: return self.chunks_dir / f"{digest}.txt"
+
+    def claim(self, digest: str) -> bool:
+        """True if the chunk is stored; it is then marked used, so collect_garbage keeps it for the grace period."""
+        try: os.utime(self.chunk_path(digest))
+        except OSError: return False
+        return True
+
+    def put(self, text: str) -> str:
+        """Store `text` (if not stored yet, else claim it) and return its digest."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.claim(digest):
+            _write_atomic(self.chunk_path(digest), data)
+            self.written += 1
+        return digest
+    #!<
+
+    #!> Plans
+    def load_plan(self, name: str) -> Dict[str, Any]: return _read_json(self.plans_dir / f"{_safe_name(name)}.json")
+
+    def save_plan(self, name: str, plan: Dict[str, Any]) -> None:
+        _write_atomic(self.plans_dir / f"{_safe_name(name)}.json", json.dumps({"version": SNAPSHOT_STORE_VERSION, **plan}).encode("utf-8"))
+    #!<
+
+    #!> Manifests
+    def materialize(self, name: str, digests: List[str], target_dir: Path, pattern: str = "current_transcript_{:03d}.txt", **info: Any) -> None:
+        """Record the manifest for invocation `name` and fill `target_dir` (its files are replaced) with the chunks, in order."""
+        _write_atomic(self.manifests_dir / f"{_safe_name(name)}.json", json.dumps({"version": SNAPSHOT_STORE_VERSION, "chunks": digests, **info}).encode("utf-8"))
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for item in target_dir.iterdir():
+            if item.is_file(): item.unlink()
+        for idx, digest in enumerate(digests, start=1):
+            target = target_dir / pattern.format(idx)
+            try: os.link(self.chunk_path(digest), target)
+            except OSError: shutil.copyfile(self.chunk_path(digest), target)
+
+    def release(self, name: str) -> None:
+        """Drop invocation `name`'s manifest (its chunks become collectable unless referenced elsewhere)."""
+        try: (self.manifests_dir / f"{_safe_name(name)}.json").unlink()
+        except OSError: pass
+    #!<
+
+    #!> Garbage collection
+    def refcounts(self) -> Dict[str, int]:
+        """References to each chunk from manifests and plans."""
+        counts: Dict[str, int] = {}
+        for path in list(self.manifests_dir.glob("*.json")) + list(self.plans_dir.glob("*.json")):
+            data = _read_json(path)
+            digests = data.get("chunks") or [h for group in data.get("groups", []) for h in group.get("hashes", [])]
+            for digest in digests: counts[digest] = counts.get(digest, 0) + 1
+        return counts
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """Drop plans beyond SNAPSHOT_PLANS_KEPT, then every chunk nothing refers to (and not used within the grace period)."""
+        removed = freed = 0
+        cutoff = time.time() - SNAPSHOT_GC_GRACE
+        plans = sorted(self.plans_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True) if self.plans_dir.exists() else []
+        for path in plans[SNAPSHOT_PLANS_KEPT:]:
+            try: path.unlink()
+            except OSError: pass
+        counts = self.refcounts()
+        for path in self.chunks_dir.glob("*.txt") if self.chunks_dir.exists() else []:
+            if counts.get(path.stem): continue
+            try:
+                st = path.stat()
+                if st.st_mtime > cutoff: continue
+                path.unlink()
+            except OSError: continue
+            size = st.st_size
+            removed += 1
+            freed += size
+        return {"removed": removed, "bytes_freed": freed, "referenced": len(counts)}
+
+    def stats(self) -> Dict[str, Any]:
+        """Chunk, manifest and plan counts, stored bytes, and what pruning saved in the live snapshots."""
+        chunks = list(self.chunks_dir.glob("*.txt")) if self.chunks_dir.exists() else []
+        manifests = [_read_json(p) for p in self.manifests_dir.glob("*.json")] if self.manifests_dir.exists() else []
+        return {
+            "chunks": len(chunks),
+            "bytes": sum(p.stat().st_size for p in chunks),
+            "manifests": len(manifests),
+            "pruned_bytes": sum(m.get("saved_bytes", 0) for m in manifests),  # Saved by pruning, over the live manifests
+            "pruned_tokens": sum(m.get("saved_tokens", 0) for m in manifests),
+            "plans": len(list(self.plans_dir.glob("*.json"))) if self.plans_dir.exists() else 0,
+        }
+    #!<
+
+#-#
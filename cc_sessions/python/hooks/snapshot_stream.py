@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Streaming Subagent Snapshot Pipeline
+
+Builds the chunks of a subagent transcript snapshot in one pass over the transcript,
+holding one line and the chunk being packed, whatever the transcript's size:
+- Line reader: one line at a time between two byte offsets (the cut point after the
+  first edit call comes from the transcript index, so nothing before it is read)
+- Filter: user/assistant entries cleaned to {role, content}, then pruned
+- Serializer: entries packed into JSON-array chunk groups (ChunkPacker)
+- Chunk writer: the caller, handed each group as soon as it closes
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, IO, Iterator, Optional, Tuple
+import json
+
+try: from .transcript_chunks import ChunkGroup, ChunkPacker, SNAPSHOT_CHUNK_BYTES
+except ImportError: from transcript_chunks import ChunkGroup, ChunkPacker, SNAPSHOT_CHUNK_BYTES
+try: from .snapshot_prune import SnapshotPruner
+except ImportError: from snapshot_prune import SnapshotPruner
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def read_entries(f: IO[bytes], start: int, stop: int) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Cleaned user/assistant entries ({role, content}) on the lines of `f` in [start, stop), with each line's offsets."""
+    f.seek(start)
+    pos = start
+    while pos < stop:
+        line = f.readline()
+        if not line: break
+        line_start, pos = pos, pos + len(line)
+        if not line.strip(): continue
+        entry = json.loads(line.decode('utf-8', errors='backslashreplace'))
+        message = entry.get('message')
+        if message and entry.get('type') in ['user', 'assistant']:
+            yield line_start, pos, {'role': message.get('role'), 'content': message.get('content')}
+
+def snapshot_groups(f: IO[bytes], start: int, stop: int, chunk_tokens: int, max_bytes: int = SNAPSHOT_CHUNK_BYTES,
+                    pruner: Optional[SnapshotPruner] = None) -> Iterator[Tuple[ChunkGroup, Dict[str, Any], bool]]:
+    """(group, pruner state at its end, closed) for the entries in [start, stop): closed groups as they
+    close, then the open tail (closed=False; later entries may still join it)."""
+    pruner = pruner or SnapshotPruner()
+    packer = ChunkPacker(chunk_tokens, max_bytes)
+    for line_start, line_end, entry in read_entries(f, start, stop):
+        before = pruner.state()  # A group closed at line_start ends before this entry was pruned
+        entry = pruner.prune(entry, line_start)
+        for group in packer.add(entry, line_start, line_end, pruner.ref):
+            yield group, before if group.end == line_start else pruner.state(), True
+    tail = packer.finish(stop)
+    if tail: yield tail, pruner.state(), False
+
+#-#
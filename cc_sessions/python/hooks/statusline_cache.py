@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Statusline Render Cache
+
+Keeps each statusline segment's rendered value together with the inputs it was
+computed from (file stats, mostly), per session:
+- A segment is recomputed only when its own key changes or it is older than the TTL
+- A change to the global key (config file, cwd, model) drops every segment
+- Segments that need recomputing run concurrently under a render deadline; one
+  that misses it is shown from its last cached value (marked stale) and stored
+  once it finishes, after the line has been printed
+- Written back only when something was recomputed
+- Segment registry: built-in segment names, plus command segments declared in
+  sessions-config.json (statusline.custom_segments) keyed on their input files
+Steady-state renders cost one small JSON read plus the stat calls that build the keys.
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+import json, os, subprocess, tempfile, threading, time
+
+# ===== GLOBALS ===== #
+STATUSLINE_CACHE_VERSION = 2
+STATUSLINE_CACHE_SESSIONS = 8  # Sessions kept (several Claude Code windows may share a project)
+CUSTOM_SEGMENT_TIMEOUT = 2.0   # Seconds a custom segment command may run
+
+# Segments statusline.py provides; statusline.layout may use these and any custom segment
+BUILTIN_SEGMENTS = {
+    "context": "Context usage bar (tokens used / model limit)",
+    "task": "Current task",
+    "mode": "Discussion or implementation mode",
+    "edited": "Edited & uncommitted files, with upstream ahead/behind",
+    "open_tasks": "Open tasks in sessions/tasks",
+    "branch": "Git branch (or detached commit)",
+    "cache": "Prompt-cache hit ratio, cache-write cost per turn and invalidations (optional)",
+    "latency": "Hook latency p50/p95 for this session, warning on slow enforcement hooks (optional)",
+}
+DEFAULT_LAYOUT = [["context", "task"], ["mode", "edited", "open_tasks", "branch"]]
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def stat_key(path: Any) -> Optional[List[int]]:
+    """[mtime_ns, size] of `path`, or None if it does not exist."""
+    if not path: return None
+    try: st = os.stat(path)
+    except OSError: return None
+    return [st.st_mtime_ns, st.st_size]
+
+@dataclass
+class Segment:
+    name: str
+    key: Callable[[], Any]            # Inputs the value depends on (cheap: stats, not reads)
+    render: Callable[[], Any]         # Computes the value (JSON-serializable)
+    expires: bool = True              # False if the key fully describes the inputs (TTL not needed)
+    fallback: Any = None              # Shown when the render is late and nothing is cached yet
+    ttl: Optional[float] = None       # Overrides the cache's TTL for this segment
+
+def once(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Thread-safe run-once wrapper for a source several segments share (e.g. one git status)."""
+    lock, result = threading.Lock(), []
+    def wrapper() -> Any:
+        with lock:
+            if not result: result.append(fn())
+        return result[0]
+    return wrapper
+
+def custom_segment(name: str, spec: Dict[str, Any], cwd: str) -> Segment:
+    """Segment for a statusline.custom_segments entry: {"command", "inputs": [paths], "ttl": seconds}.
+
+    Shows the first line of the command's output (omitted on failure or empty output). It is
+    re-run when an input file changes, or after `ttl` (the global TTL if unset); with inputs
+    and "ttl": 0 it only re-runs on input changes."""
+    command = str(spec.get("command", ""))
+    inputs = [os.path.join(cwd, os.path.expanduser(str(p))) for p in spec.get("inputs", [])]
+    ttl = spec.get("ttl")
+    def render() -> Optional[str]:
+        if not command: return None
+        try: result = subprocess.run(command, shell=True, cwd=cwd, capture_output=True, text=True, timeout=CUSTOM_SEGMENT_TIMEOUT)
+        except (subprocess.SubprocessError, OSError): return None
+        lines = result.stdout.strip().splitlines()
+        return lines[0] if result.returncode == 0 and lines else None
+    return Segment(name, lambda: [command] + [stat_key(p) for p in inputs], render,
+                   expires=not (inputs and ttl == 0), ttl=None if ttl in (None, 0) else float(ttl))
+
+def layout_segments(layout: Any) -> List[str]:
+    """Segment names a layout uses, in order (each once)."""
+    names: List[str] = []
+    for line in layout if isinstance(layout, list) else []:
+        for name in line if isinstance(line, list) else []:
+            if isinstance(name, str) and name not in names: names.append(name)
+    return names
+
+class RenderCache:
+    """Per-session segment cache backed by one JSON file."""
+
+    def __init__(self, path: Path, session_id: str, global_key: Any, ttl: Optional[float] = None):
+        """ttl: max age in seconds of a reused segment (None = no expiry, 0 = always recompute)."""
+        self.path = Path(path)
+        self.session_id = session_id
+        self.ttl = ttl
+        self.dirty = False
+        self.recomputed: List[str] = []
+        self._late: List[Tuple[Future, Segment, float]] = []
+        self.data: Dict[str, Any] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(data, dict) and data.get("version") == STATUSLINE_CACHE_VERSION: self.data = data
+        except (OSError, ValueError): pass
+        self.data.setdefault("version", STATUSLINE_CACHE_VERSION)
+        sessions = self.data.setdefault("sessions", {})
+        entry = sessions.get(session_id)
+        if not isinstance(entry, dict) or entry.get("key") != global_key:
+            entry = sessions[session_id] = {"key": global_key, "segments": {}}
+            self.dirty = True
+        entry["used"] = time.time()
+        self.segments: Dict[str, Any] = entry["segments"]
+
+    def lookup(self, name: str, key_fn: Callable[[], Any], expires: bool = True, ttl: Optional[float] = None) -> Tuple[bool, Any]:
+        """(True, cached value) if segment `name` is still valid for key_fn() (and within the TTL), else (False, None).
+
+        ttl overrides the cache's TTL for this lookup."""
+        cached = self.segments.get(name)
+        if not isinstance(cached, dict) or cached.get("key") != key_fn(): return False, None
+        ttl = self.ttl if ttl is None else ttl
+        age = time.time() - cached.get("at", 0)
+        if not expires or ttl is None or 0 <= age < ttl: return True, cached.get("value")
+        return False, None
+
+    def store(self, name: str, key_fn: Callable[[], Any], value: Any, at: Optional[float] = None) -> None:
+        """Cache `value` for segment `name`.
+
+        The key is read after the value was computed, so a segment that changes its own inputs
+        (e.g. writes state) is not recomputed on the next render."""
+        entry = self.segments[name] = {"at": time.time() if at is None else at, "value": value}
+        entry["key"] = key_fn()
+        self.recomputed.append(name)
+        self.dirty = True
+
+    def get(self, name: str, key_fn: Callable[[], Any], compute: Callable[[], Any], expires: bool = True) -> Any:
+        """Cached value of segment `name` if still valid, else compute() it (synchronously) and cache it."""
+        hit, value = self.lookup(name, key_fn, expires)
+        if hit: return value
+        started = time.time()
+        value = compute()
+        self.store(name, key_fn, value, started)
+        return value
+
+    def render(self, segments: List[Segment], deadline: Optional[float] = None) -> Tuple[Dict[str, Any], Set[str]]:
+        """Values of all `segments`: cached ones directly, the rest computed concurrently.
+
+        Waits at most `deadline` seconds (None = no limit) for the computed ones. Late segments get
+        their last cached value (or their fallback) and are listed in the returned set; they keep
+        running and are stored by save(). Errors in on-time renders propagate."""
+        values: Dict[str, Any] = {}
+        pending: List[Segment] = []
+        for segment in segments:
+            hit, value = self.lookup(segment.name, segment.key, segment.expires, segment.ttl)
+            if hit: values[segment.name] = value
+            else: pending.append(segment)
+        if not pending: return values, set()
+
+        started = time.time()
+        pool = ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="statusline")
+        futures = {pool.submit(segment.render): segment for segment in pending}
+        pool.shutdown(wait=False)
+        done, _ = wait(futures, timeout=deadline)
+        late: Set[str] = set()
+        for future, segment in futures.items():
+            if future in done:
+                values[segment.name] = future.result()
+                self.store(segment.name, segment.key, values[segment.name], started)
+            else:
+                cached = self.peek(segment.name)
+                values[segment.name] = segment.fallback if cached is None else cached
+                late.add(segment.name)
+                self._late.append((future, segment, started))
+        return values, late
+
+    def _finish_late(self) -> None:
+        """Wait for segments that missed the render deadline and cache what they produced."""
+        for future, segment, started in self._late:
+            try: self.store(segment.name, segment.key, future.result(), started)
+            except Exception: continue  # Left to the next render
+        self._late = []
+
+    def peek(self, name: str) -> Any:
+        """Cached value of segment `name` (fresh or not), or None."""
+        cached = self.segments.get(name)
+        return cached.get("value") if isinstance(cached, dict) else None
+
+    def save(self) -> None:
+        """Write the cache back if anything changed (atomic replace; errors are ignored).
+
+        Waits for late segments first, so call it after the line has been printed."""
+        self._finish_late()
+        if not self.dirty: return
+        sessions = self.data["sessions"]
+        if len(sessions) > STATUSLINE_CACHE_SESSIONS:
+            for sid in sorted(sessions, key=lambda s: sessions[s].get("used", 0))[:len(sessions) - STATUSLINE_CACHE_SESSIONS]: sessions.pop(sid, None)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", delete=False, dir=str(self.path.parent), prefix=".statusline-", encoding="utf-8") as tmp:
+                json.dump(self.data, tmp, separators=(",", ":"))
+                tmp_name = tmp.name
+            os.replace(tmp_name, self.path)
+        except (OSError, TypeError, ValueError): pass
+
+#-#
@@ -3,102 +3,46 @@
 # ===== IMPORTS ===== #
 
 ## ===== STDLIB ===== ##
-import json, sys, math, bisect, os
-from collections import deque
+import json, sys, os
 from pathlib import Path
-from datetime import datetime, timezone
 ##-##
 
 ## ===== 3RD-PARTY ===== ##
 ##-##
 
 ## ===== LOCAL ===== ##
-from shared_state import edit_state, PROJECT_ROOT
+from shared_state import edit_state, PROJECT_ROOT, Model, session_model, time_hook, transcript_index, register_transcript, resolve_transcript, snapshot_store, load_config
+from transcript_chunks import fit_newest, snapshot_budget, SNAPSHOT_CHUNK_BYTES, SNAPSHOT_PACKING_VERSION
+from snapshot_prune import SnapshotPruner
+from snapshot_stream import snapshot_groups
 ##-##
 
 #-#
 
 # ===== FUNCTIONS ===== #
 
-def find_current_transcript(transcript_path, session_id, stale_threshold=30):
-    """
-    Detect stale transcripts and find the current one by session ID.
-
-    Args:
-        transcript_path: Path to the transcript file we received
-        session_id: Current session ID to match
-        stale_threshold: Seconds threshold for considering transcript stale
-
-    Returns:
-        Path to the current transcript (may be same as input if not stale)
-    """
-    if not transcript_path or not os.path.exists(transcript_path):
-        return transcript_path
-
-    try:
-        # Read last line of transcript to get last message timestamp
-        with open(transcript_path, 'r', encoding='utf-8', errors='backslashreplace') as f:
-            lines = f.readlines()
-            if not lines:
-                return transcript_path
-
-            last_line = lines[-1].strip()
-            if not last_line:
-                return transcript_path
-
-            last_msg = json.loads(last_line)
-            last_timestamp = last_msg.get('timestamp')
-
-            if not last_timestamp:
-                return transcript_path
-
-            # Parse ISO timestamp and compare to current time
-            last_time = datetime.fromisoformat(last_timestamp.replace('Z', '+00:00'))
-            current_time = datetime.now(timezone.utc)
-            age_seconds = (current_time - last_time).total_seconds()
-
-            # If transcript is fresh, return it
-            if age_seconds <= stale_threshold:
-                return transcript_path
-
-            # Transcript is stale - search for current one
-            transcript_dir = Path(transcript_path).parent
-            all_transcripts = sorted(
-                transcript_dir.glob('*.jsonl'),
-                key=lambda p: p.stat().st_mtime,
-                reverse=True
-            )[:5]  # Top 5 most recent
-
-            # Check each transcript for matching session ID
-            for candidate in all_transcripts:
-                try:
-                    with open(candidate, 'r', encoding='utf-8', errors='backslashreplace') as cf:
-                        candidate_lines = cf.readlines()
-                        if not candidate_lines:
-                            continue
-
-                        # Check last line for session ID
-                        candidate_last = json.loads(candidate_lines[-1].strip())
-                        candidate_session_id = candidate_last.get('sessionId')
-
-                        if candidate_session_id == session_id:
-                            # Verify this transcript is fresh
-                            candidate_timestamp = candidate_last.get('timestamp')
-                            if candidate_timestamp:
-                                candidate_time = datetime.fromisoformat(candidate_timestamp.replace('Z', '+00:00'))
-                                candidate_age = (current_time - candidate_time).total_seconds()
-
-                                if candidate_age <= stale_threshold:
-                                    return str(candidate)
-                except:
-                    continue
-
-            # No fresh transcript found, return original
-            return transcript_path
-
-    except:
-        # Any error, return original path
-        return transcript_path
+def agent_model(subagent_type):
+    """`model:` from the agent definition's frontmatter (.claude/agents/<type>.md), or None."""
+    agent_file = PROJECT_ROOT / '.claude' / 'agents' / f'{subagent_type}.md'
+    try: lines = agent_file.read_text(encoding='utf-8').splitlines()
+    except OSError: return None
+    if not lines or lines[0].strip() != '---': return None
+    for line in lines[1:]:
+        if line.strip() == '---': break
+        key, _, value = line.partition(':')
+        if key.strip() == 'model': return value.strip()
+    return None
+
+def stream_records(f, start, pruner):
+    """Stream the chunk groups of transcript bytes [start, index.offset), storing each as soon as it closes.
+    Yields (record, pruner state at its end, closed); memory holds one line and one chunk."""
+    saved = pruner.state()['saved']
+    for group, state, closed in snapshot_groups(f, start, index.offset, chunk_tokens, MAX_BYTES, pruner):
+        assert all(len(c.encode("utf-8")) <= MAX_BYTES for c in group.texts), "Chunking failed to enforce byte limit"
+        record = {'hashes': [store.put(text) for text in group.texts], 'tokens': group.tokens, 'entries': group.entries, 'end': group.end,
+                  'refs': group.refs, 'saved': [state['saved'][0] - saved[0], state['saved'][1] - saved[1]]}
+        saved = state['saved']
+        yield record, state, closed
 
 #-#
 
@@ -123,6 +67,7 @@ if is_ci_environment():
 # Load input from stdin
 try: input_data = json.load(sys.stdin)
 except json.JSONDecodeError as e: print(f"Error: Invalid JSON input: {e}", file=sys.stderr); sys.exit(1)
+time_hook(input_data.get("session_id"))
 
 # Check if this is a Task tool call
 tool_name = input_data.get("tool_name", "")
@@ -132,14 +77,15 @@ if tool_name != "Task": sys.exit(0)
 transcript_path = input_data.get("transcript_path", "")
 session_id = input_data.get("session_id", "")
 if not transcript_path: sys.exit(0)
+register_transcript(session_id, transcript_path)
 
 # Detect and recover from stale transcript
 if transcript_path:
-    transcript_path = find_current_transcript(transcript_path, session_id)
+    transcript_path = resolve_transcript(transcript_path, session_id)
 
-# Get the transcript into memory
-with open(transcript_path, 'r', encoding='utf-8', errors='backslashreplace') as f: transcript = [json.loads(line) for line in f]
-transcript = deque(transcript)
+# The shared index knows where the first edit tool call is (pre-work entries before it are dropped),
+# having scanned only the lines appended since it was last updated
+index = transcript_index(transcript_path)
 #-#
 
 """
@@ -154,8 +100,10 @@ transcript = deque(transcript)
 PreToolUse:Task:subagent_type hooks
 
 This module handles PreToolUse processing for the Task tool:
+    - Prunes bulky tool output (long results, repeated reads and failures)
     - Chunks the transcript for subagents based on token limits
-    - Saves transcript chunks to designated directories
+    - Stores chunks content-addressed, reusing those of earlier Task calls
+    - Links the chunks into designated directories
     - Sets flags to manage subagent context
 """
 
@@ -165,103 +113,81 @@ This module handles PreToolUse processing for the Task tool:
 with edit_state() as s: s.flags.subagent = True; STATE = s
 #!<
 
-#!> Trunc + clean transcript
-# Remove any pre-work transcript entries
-start_found = False
-while not start_found and transcript:
-    entry = transcript.popleft()
-    message = entry.get('message')
-    if message:
-        content = message.get('content')
-        if isinstance(content, list):
-            for block in content:
-                if block.get('type') == 'tool_use' and block.get('name') in ['Edit', 'MultiEdit', 'Write']: start_found = True
-
-# Clean the transcript
-clean_transcript = deque()
-for entry in transcript:
-    message = entry.get('message')
-    message_type = entry.get('type')
-
-    if message and message_type in ['user', 'assistant']:
-        content = message.get('content')
-        role = message.get('role')
-        clean_entry = { 'role': role, 'content': content }
-        clean_transcript.append(clean_entry)
-#!<
-
 #!> Prepare subagent dir for transcript files
-subagent_type = 'shared'
-if not clean_transcript: print("[Subagent] No relevant transcript entries found, skipping snapshot."); sys.exit(0)
-task_call = clean_transcript[-1]
-content = task_call.get('content')
-if isinstance(content, list):
-    for block in content:
-        if block.get('type') == 'tool_use' and block.get('name') == 'Task':
-            task_input = block.get('input') or {}
-            subagent_type = task_input.get('subagent_type', subagent_type)
-
-# Clear the current transcript directory
+task_input = input_data.get('tool_input') or {}  # The Task call being made
+subagent_type = task_input.get('subagent_type') or 'shared'
 BATCH_DIR = PROJECT_ROOT / 'sessions' / 'transcripts' / subagent_type
-BATCH_DIR.mkdir(parents=True, exist_ok=True)
-for item in BATCH_DIR.iterdir():
-    if item.is_file(): item.unlink()
 #!<
 
-#!> Chunk and save transcript batches
-MAX_BYTES = 24000
+#!> Size the snapshot
+MAX_BYTES = SNAPSHOT_CHUNK_BYTES
+# The subagent's model: Task `model` input, else its agent definition, else this session's model ("inherit")
+requested = str(task_input.get('model') or agent_model(subagent_type) or '').lower()
+model = next((m for m in (Model.HAIKU, Model.SONNET, Model.OPUS) if m.value in requested), None)
+if model is None: model = session_model(session_id, STATE.model)  # Recorded per session by the statusline
 # Set usable context based on model (Haiku 4.5: 200k, Sonnet 4.5: 800k with extended, Opus: 200k)
 usable_context = 200000  # Default for Haiku/Opus
-if STATE.model == "sonnet":
+if model == Model.SONNET:
     usable_context = 800000  # Sonnet with extended context
-elif STATE.model == "haiku":
+elif model == Model.HAIKU:
     usable_context = 200000  # Haiku 4.5
-clean_transcript_text = json.dumps(list(clean_transcript), indent=2, ensure_ascii=False)
-
-chunks = []
-buf_chars = []
-buf_bytes = 0
-last_newline_idx = None
-last_space_idx = None
-
-for ch in clean_transcript_text:
-    ch_b = len(ch.encode("utf-8"))
-
-    # If overflowing, flush a chunk
-    if buf_bytes + ch_b > MAX_BYTES:
-        cut_idx = None
-        if last_newline_idx is not None: cut_idx = last_newline_idx
-        elif last_space_idx is not None: cut_idx = last_space_idx
-        if cut_idx is not None and cut_idx > 0:
-            # Emit chunk up to the breakpoint
-            chunks.append("".join(buf_chars[:cut_idx]))
-            remainder = buf_chars[cut_idx:]
-            buf_chars = remainder
-            buf_bytes = sum(len(c.encode("utf-8")) for c in buf_chars)
-        else:
-            # No breakpoints, hard cut what we got
-            if buf_chars: chunks.append("".join(buf_chars))
-            buf_chars = []
-            buf_bytes = 0
-
-        last_newline_idx = None
-        last_space_idx = None
-
-    buf_chars.append(ch)
-    buf_bytes += ch_b
-
-    if ch == "\n": last_newline_idx = len(buf_chars); last_space_idx = None
-    elif ch == " " and last_newline_idx is None: last_space_idx = len(buf_chars)
-
-# Flush any remaining buffer
-if buf_chars: chunks.append("".join(buf_chars))
+snapshot_cap, chunk_tokens = snapshot_budget(usable_context)
+#!<
 
-assert all(len(c.encode("utf-8")) <= MAX_BYTES for c in chunks), "Chunking failed to enforce byte limit"
+#!> Clean, prune and chunk new transcript entries
+# Chunk groups closed by earlier Task calls on this transcript are reused as stored (their plan records
+# the offset each one ends at and the pruner's state there), so only the entries after them are read,
+# cleaned, pruned and packed
+prune = load_config().snapshots
+store = snapshot_store()
+plan_name = f"{Path(transcript_path).stem}-{chunk_tokens}"
+groups = []
+if index.edit_offsets:
+    with open(transcript_path, 'rb') as f:
+        f.seek(index.edit_offsets[0]); f.readline()  # The first edit call itself is pre-work too
+        settings = [prune.tool_result_max_chars, prune.excerpt_chars, prune.dedupe_reads, prune.collapse_failures] if prune.prune else []
+        plan_key = [index.inode, f.tell(), chunk_tokens, MAX_BYTES, SNAPSHOT_PACKING_VERSION, SnapshotPruner(*settings).key()]
+        plan = store.load_plan(plan_name)
+        if plan.get('key') == plan_key:
+            for group in plan.get('groups', []):
+                if group['end'] > index.offset or not all(store.claim(h) for h in group['hashes']): break
+                groups.append(group)
+        while groups and 'prune' not in groups[-1]: groups.pop()  # Resume where the pruner's state was kept
+        pruner = SnapshotPruner(*settings, state=groups[-1]['prune'] if groups else None)
+        # Stream the rest
+        closed, tail = 0, None
+        for record, state, final in stream_records(f, groups[-1]['end'] if groups else plan_key[1], pruner):
+            if not final: tail = record; continue  # Still open: later entries may join it, so it is not planned
+            if groups: groups[-1].pop('prune', None)  # Only the last planned group keeps the pruner's state
+            groups.append({**record, 'prune': state})
+            closed += 1
+
+    if closed: store.save_plan(plan_name, {'key': plan_key, 'transcript': transcript_path, 'groups': groups})
+    if tail: groups.append(tail)
+
+if not groups: print("[Subagent] No relevant transcript entries found, skipping snapshot."); sys.exit(0)
+#!<
 
-for idx, chunk in enumerate(chunks, start=1):
-    part_name = f"current_transcript_{idx:03d}.txt"
-    part_path = BATCH_DIR / part_name
-    with part_path.open('w', encoding='utf-8', newline="\n") as f: f.write(chunk)
+#!> Link transcript chunks into the subagent dir
+# Keep the newest chunk groups that fit the snapshot's share of the subagent's context. If a kept group has a
+# prune marker pointing at a dropped entry (the only full copy of a read or failure), the kept range is pruned
+# again from its start with a fresh pruner, so its first copy is shown in full; repeat while the cap drops more
+dropped_entries = dropped_tokens = 0
+while True:
+    kept = fit_newest([group['tokens'] for group in groups], snapshot_cap)
+    dropped, groups = groups[:len(groups) - kept], groups[len(groups) - kept:]
+    dropped_entries += sum(g['entries'] for g in dropped)
+    dropped_tokens += sum(g['tokens'] for g in dropped)
+    if not dropped or all(g.get('refs') is None or g['refs'] >= dropped[-1]['end'] for g in groups): break
+    with open(transcript_path, 'rb') as f: groups = [record for record, _, _ in stream_records(f, dropped[-1]['end'], SnapshotPruner(*settings))]
+digests = [h for group in groups for h in group['hashes']]
+if dropped_entries:
+    note = {'role': 'note', 'content': f"{dropped_entries} older transcript entries (~{dropped_tokens:,} tokens) were omitted to fit your context budget."}
+    digests.insert(0, store.put(json.dumps([note], indent=2, ensure_ascii=False)))
+    print(f"[Subagent] Snapshot capped at ~{snapshot_cap:,} tokens for {model.value}: {dropped_entries} older entries omitted.")
+saved_bytes, saved_tokens = (sum(g['saved'][i] for g in groups) for i in (0, 1))
+if saved_bytes: print(f"[Subagent] Snapshot pruning saved {saved_bytes / 1024:,.0f}KB (~{saved_tokens:,} tokens) of tool output.")
+store.materialize(subagent_type, digests, BATCH_DIR, transcript=transcript_path, saved_bytes=saved_bytes, saved_tokens=saved_tokens)
 #!<
 
 #-#
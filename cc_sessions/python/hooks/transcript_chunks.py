@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Transcript Snapshot Chunking
+
+Splits the cleaned transcript subagents read into files of at most `max_bytes` UTF-8 bytes:
+- Works on the encoded buffer: each chunk is one slice, its break point found with a
+  bounded rfind, so the cost is linear in the snapshot size (no per-character work)
+- Cuts after the last newline that fits; with no newline, after the last space; with
+  neither, a hard cut moved back to a UTF-8 character boundary
+Same limit and break preferences as the character loop it replaces (kept as the
+baseline in `sessions perf bench chunker`).
+
+Sized in estimated tokens against the subagent's context budget:
+- The snapshot may fill SNAPSHOT_CONTEXT_SHARE of the model's usable context; the
+  oldest chunks are dropped first (the newest, holding the Task call, is always kept)
+- Chunks target a token count derived from that cap, never above max_bytes
+
+Packing for the content-addressed store (ChunkPacker): entries are packed whole into
+JSON-array chunks, and a chunk is closed by the first entry that does not fit. The same
+entries therefore always give the same chunks, so an unchanged prefix of the session
+maps to chunks that are already stored.
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import json, math
+
+# ===== GLOBALS ===== #
+SNAPSHOT_CHUNK_BYTES = 24000   # Max bytes per current_transcript_NNN.txt (comfortably one Read)
+SNAPSHOT_CHUNK_TOKENS = 6000    # Token target per chunk for large budgets
+SNAPSHOT_CONTEXT_SHARE = 0.5    # Share of the subagent's usable context the snapshot may take
+SNAPSHOT_MIN_CHUNK_TOKENS = 500
+ASCII_CHARS_PER_TOKEN = 4       # Estimate: ~4 ASCII characters per token, ~1 token per other character
+SNAPSHOT_PACKING_VERSION = 2    # Bump when packing output changes (stored chunk plans are then rebuilt)
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def _char_boundary(data: bytes, cut: int, floor: int) -> int:
+    """Largest position <= cut (and > floor) that does not split a UTF-8 sequence."""
+    while cut > floor + 1 and (data[cut] & 0xC0) == 0x80: cut -= 1
+    return cut
+
+def chunk_text(text: str, max_bytes: int = SNAPSHOT_CHUNK_BYTES) -> List[str]:
+    """Split `text` into chunks of at most `max_bytes` UTF-8 bytes, preferring newline, then space breaks."""
+    if max_bytes < 4: raise ValueError("max_bytes must fit any UTF-8 character (>= 4)")
+    data = text.encode("utf-8")
+    chunks: List[str] = []
+    start, size = 0, len(data)
+    while size - start > max_bytes:
+        end = start + max_bytes
+        cut = data.rfind(b"\n", start, end) + 1
+        if cut <= start: cut = data.rfind(b" ", start, end) + 1
+        if cut <= start: cut = _char_boundary(data, end, start)
+        chunks.append(data[start:cut].decode("utf-8"))
+        start = cut
+    if start < size: chunks.append(data[start:].decode("utf-8"))
+    return chunks
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ASCII at ~4 characters per token, anything else (CJK, emoji, ...) ~1 each."""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars / ASCII_CHARS_PER_TOKEN) + len(text) - ascii_chars
+
+def snapshot_budget(usable_context: int) -> Tuple[int, int]:
+    """(snapshot cap, chunk target) in estimated tokens for a subagent with `usable_context` tokens."""
+    cap = int(usable_context * SNAPSHOT_CONTEXT_SHARE)
+    return cap, max(SNAPSHOT_MIN_CHUNK_TOKENS, min(SNAPSHOT_CHUNK_TOKENS, cap // 16))
+
+def fit_newest(token_counts: List[int], cap_tokens: int) -> int:
+    """How many of the newest items (given oldest first) fit in `cap_tokens`; always at least one."""
+    kept, used = 0, 0
+    for size in reversed(token_counts):
+        if kept and used + size > cap_tokens: break
+        kept, used = kept + 1, used + size
+    return kept
+
+def chunk_by_tokens(text: str, chunk_tokens: int, max_bytes: int = SNAPSHOT_CHUNK_BYTES) -> List[str]:
+    """Split `text` into chunks of about `chunk_tokens` estimated tokens (and at most `max_bytes` bytes)."""
+    size = len(text.encode("utf-8"))
+    tokens = estimate_tokens(text)
+    if not tokens: return chunk_text(text, max_bytes)
+    return chunk_text(text, max(4, min(max_bytes, int(chunk_tokens * size / tokens))))
+
+_ENTRY_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+def format_entry(entry: Dict[str, Any]) -> str:
+    """An entry exactly as it appears inside json.dumps(entries, indent=2, ensure_ascii=False)."""
+    return "  " + _ENTRY_ENCODER.encode(entry).replace("\n", "\n  ")
+
+@dataclass
+class ChunkGroup:
+    texts: List[str]     # One chunk, or the pieces of an entry too large for one
+    tokens: int
+    entries: int
+    end: int             # Transcript offset the next group starts reading from
+    refs: Optional[int] = None  # Earliest transcript offset its prune markers point at (None: no markers)
+
+@dataclass
+class ChunkPacker:
+    """Packs entries into JSON-array chunks of about `chunk_tokens` estimated tokens (at most `max_bytes`)."""
+    chunk_tokens: int
+    max_bytes: int = SNAPSHOT_CHUNK_BYTES
+    parts: List[str] = field(default_factory=list)
+    tokens: int = 0
+    size: int = 0
+    refs: Optional[int] = None
+
+    def _close(self, end: int) -> ChunkGroup:
+        group = ChunkGroup(["[\n" + ",\n".join(self.parts) + "\n]"], self.tokens, len(self.parts), end, self.refs)
+        self.parts, self.tokens, self.size, self.refs = [], 0, 0, None
+        return group
+
+    def add(self, entry: Dict[str, Any], start: int, end: int, ref: Optional[int] = None) -> List[ChunkGroup]:
+        """Add the entry read from transcript bytes [start, end) (its prune markers pointing back to `ref`);
+        returns the groups this closed."""
+        part = format_entry(entry)
+        tokens, size = estimate_tokens(part), len(part.encode("utf-8"))
+        closed = []
+        if self.parts and (self.tokens + tokens > self.chunk_tokens or self.size + size + 2 + 4 > self.max_bytes): closed.append(self._close(start))
+        if tokens > self.chunk_tokens or size + 4 > self.max_bytes:
+            # Too large for any chunk: split it on its own so it never shifts the chunks around it
+            closed.append(ChunkGroup(chunk_by_tokens("[\n" + part + "\n]", self.chunk_tokens, self.max_bytes), tokens, 1, end, ref))
+            return closed
+        self.parts.append(part)
+        if ref is not None: self.refs = ref if self.refs is None else min(self.refs, ref)
+        self.tokens += tokens
+        self.size += size + (2 if len(self.parts) > 1 else 0)
+        return closed
+
+    def finish(self, end: int) -> Optional[ChunkGroup]:
+        """The open chunk (None if empty). It is not final: later entries may still join it."""
+        return self._close(end) if self.parts else None
+
+#-#
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Incremental Transcript Index
+
+One sidecar per transcript recording what the hooks and the statusline need from it, so
+each consumer parses only the lines appended since the last one looked:
+- Byte offset processed (complete lines only; a partially written line waits)
+- Latest main-chain `message.usage` (context length)
+- Session id and timestamp of the newest entry
+- Byte offsets of entries with an Edit/MultiEdit/Write tool call (where work started)
+Lines are classified on raw bytes; only candidates are JSON-parsed (the newest usage
+line, edit tool calls, the last line). A transcript that shrinks or is replaced is
+indexed again from the start. Total work over a session is O(transcript bytes); memory
+is one line plus a bounded number of offsets, however long the transcript.
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, IO, List, Optional, Union
+from dataclasses import dataclass, field, asdict
+from collections import deque
+from pathlib import Path
+import json, os, tempfile
+
+# ===== GLOBALS ===== #
+TRANSCRIPT_INDEX_VERSION = 1
+EDIT_OFFSETS_KEPT = 1000  # Newest edit offsets kept (the first one is always kept)
+USAGE_CANDIDATES = 16     # Newest usage lines per scan tried, newest first, for a main-chain usage
+EDIT_TOOLS = ("Edit", "MultiEdit", "Write")
+
+_USAGE_MARKER = b'"usage"'
+_SIDECHAIN_MARKER = b'"isSidechain":true'
+_TOOL_USE_MARKER = b'"tool_use"'
+_EDIT_MARKERS = tuple(f'"{name}"'.encode() for name in EDIT_TOOLS)
+#-#
+
+# ===== FUNCTIONS ===== #
+
+@dataclass
+class TranscriptIndex:
+    """What is known about a transcript up to `offset` (JSON round-trippable via to_dict/from_dict)."""
+    path: str = ""
+    inode: int = 0
+    offset: int = 0                   # Bytes processed (complete lines only)
+    lines: int = 0
+    session_id: Optional[str] = None
+    last_timestamp: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None   # Newest main-chain message.usage
+    edit_offsets: List[int] = field(default_factory=list)  # Line offsets of entries calling an edit tool
+    version: int = TRANSCRIPT_INDEX_VERSION
+
+    def to_dict(self) -> Dict[str, Any]: return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Any) -> "TranscriptIndex":
+        if not isinstance(d, dict) or d.get("version") != TRANSCRIPT_INDEX_VERSION: return cls()
+        known = {k: v for k, v in d.items() if k in cls.__dataclass_fields__}
+        try: return cls(**known)
+        except TypeError: return cls()
+
+def _parse(line: bytes) -> Optional[Dict[str, Any]]:
+    try: entry = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError): return None
+    return entry if isinstance(entry, dict) else None
+
+def _entry_at(f: IO[bytes], offset: int) -> Optional[Dict[str, Any]]:
+    f.seek(offset)
+    return _parse(f.readline())
+
+def _main_chain_usage(entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not entry or entry.get("isSidechain", False): return None
+    message = entry.get("message")
+    usage = message.get("usage") if isinstance(message, dict) else None
+    return usage if isinstance(usage, dict) and usage else None
+
+def calls_edit_tool(entry: Optional[Dict[str, Any]]) -> bool:
+    """True if the entry's message has an Edit/MultiEdit/Write tool_use block."""
+    message = entry.get("message") if entry else None
+    content = message.get("content") if isinstance(message, dict) else None
+    if not isinstance(content, list): return False
+    return any(isinstance(block, dict) and block.get("type") == "tool_use" and block.get("name") in EDIT_TOOLS for block in content)
+
+def scan_transcript(path: Union[str, Path], index: Optional[TranscriptIndex] = None) -> TranscriptIndex:
+    """Update `index` (or a fresh one) with the lines appended to `path` since index.offset."""
+    path = str(path)
+    try: st = os.stat(path)
+    except OSError: return index if index is not None and index.path == path else TranscriptIndex(path=path)
+    if index is None or index.path != path or index.inode != st.st_ino or st.st_size < index.offset:
+        index = TranscriptIndex(path=path, inode=st.st_ino)
+    if st.st_size == index.offset: return index
+
+    usage_at: deque = deque(maxlen=USAGE_CANDIDATES)
+    last_at = None
+    with open(path, "rb") as f:
+        f.seek(index.offset)
+        pos = index.offset
+        for line in f:
+            if not line.endswith(b"\n"): break  # Partially written: finish it next time
+            start, pos = pos, pos + len(line)
+            index.lines += 1
+            if not line.strip(): continue
+            last_at = start
+            if _USAGE_MARKER in line and _SIDECHAIN_MARKER not in line: usage_at.append(start)
+            if _TOOL_USE_MARKER in line and any(marker in line for marker in _EDIT_MARKERS) and calls_edit_tool(_parse(line)):
+                index.edit_offsets.append(start)
+                if len(index.edit_offsets) > 2 * EDIT_OFFSETS_KEPT: del index.edit_offsets[1:-EDIT_OFFSETS_KEPT]
+        index.offset = pos
+
+        # Confirm candidates by parsing: newest usage first, then the last line
+        for start in reversed(usage_at):
+            usage = _main_chain_usage(_entry_at(f, start))
+            if usage: index.usage = usage; break
+        if last_at is not None:
+            last = _entry_at(f, last_at) or {}
+            index.session_id = last.get("sessionId") or index.session_id
+            index.last_timestamp = last.get("timestamp") or index.last_timestamp
+    if len(index.edit_offsets) > EDIT_OFFSETS_KEPT + 1: del index.edit_offsets[1:-EDIT_OFFSETS_KEPT]
+    return index
+
+def index_transcript(path: Union[str, Path], sidecar: Path) -> TranscriptIndex:
+    """Index of `path`, brought up to date from its sidecar (rewritten when anything new was read)."""
+    sidecar = Path(sidecar)
+    try: previous = TranscriptIndex.from_dict(json.loads(sidecar.read_text(encoding="utf-8")))
+    except (OSError, ValueError): previous = None
+    before = (previous.inode, previous.offset) if previous else None
+    index = scan_transcript(path, previous)
+    if (index.inode, index.offset) == before or not index.offset: return index
+    try:
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=str(sidecar.parent), prefix=".index-", encoding="utf-8") as tmp:
+            json.dump(index.to_dict(), tmp, separators=(",", ":"))
+            tmp_name = tmp.name
+        os.replace(tmp_name, sidecar)
+    except (OSError, TypeError, ValueError): pass
+    return index
+
+#-#
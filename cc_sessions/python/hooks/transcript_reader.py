@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Transcript Tail Reader
+
+Reads Claude Code transcripts (.jsonl) from the end instead of the start:
+- Reverse block reader: seeks from EOF and yields lines newest first
+- Latest main-chain usage: parses backwards until the first non-sidechain
+  entry with `message.usage`, skipping lines that cannot contain one
+Cost is proportional to the tail that has to be read, not to session length.
+Also locates a project's transcripts (~/.claude/projects/<escaped project path>/).
+"""
+
+# ===== IMPORTS ===== #
+from typing import Any, Dict, Iterator, Optional, Union
+from pathlib import Path
+import json, os, re
+
+# ===== GLOBALS ===== #
+TAIL_BLOCK_SIZE = 64 * 1024
+_USAGE_MARKER = b'"usage"'
+#-#
+
+# ===== FUNCTIONS ===== #
+
+def iter_lines_reversed(path: Union[str, Path], block_size: int = TAIL_BLOCK_SIZE) -> Iterator[bytes]:
+    """Yield the file's non-empty lines (without newline) from last to first."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        pieces = []  # Blocks of a line whose start has not been read yet (newest first)
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            cut = block.rfind(b"\n")
+            if cut == -1: pieces.append(block); continue  # Still inside one long line
+            line = block[cut + 1:] + b"".join(reversed(pieces))
+            if line.strip(): yield line
+            lines = block[:cut].split(b"\n")
+            pieces = [lines[0]]  # May continue in the previous block
+            for line in reversed(lines[1:]):
+                if line.strip(): yield line
+        line = b"".join(reversed(pieces))
+        if line.strip(): yield line
+
+def last_entry(path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """The last parseable JSON entry of a transcript, or None."""
+    try:
+        for line in iter_lines_reversed(path):
+            try: return json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError): continue
+    except OSError: pass
+    return None
+
+def latest_usage(path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """`message.usage` of the newest main-chain (non-sidechain) entry, or None."""
+    try:
+        for line in iter_lines_reversed(path):
+            if _USAGE_MARKER not in line: continue
+            try: entry = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError): continue
+            if not isinstance(entry, dict) or entry.get("isSidechain", False): continue
+            message = entry.get("message")
+            usage = message.get("usage") if isinstance(message, dict) else None
+            if usage: return usage
+    except OSError: pass
+    return None
+
+def project_transcript_dir(project_root: Union[str, Path]) -> Path:
+    """Directory Claude Code writes this project's transcripts to (honours CLAUDE_CONFIG_DIR)."""
+    config_dir = Path(os.environ.get("CLAUDE_CONFIG_DIR") or Path.home() / ".claude")
+    return config_dir / "projects" / re.sub(r"[^A-Za-z0-9]", "-", str(project_root))
+
+def context_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    """Context length from a usage record: input plus cache tokens (output is not context yet)."""
+    if not usage: return 0
+    return usage.get("input_tokens", 0) + usage.get("cache_read_input_tokens", 0) + usage.get("cache_creation_input_tokens", 0)
+
+#-#
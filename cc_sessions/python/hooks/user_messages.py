@@ -20,10 +20,14 @@ if 'CLAUDE_PROJECT_DIR' in os.environ:
 
 try:
     # Try direct import (works with sessions in path or package install)
-    from shared_state import load_state, edit_state, Mode, PROJECT_ROOT, CCTodo, load_config, SessionsProtocol, is_directory_task, is_subtask, is_parent_task, SpecializedMode, SPECIALIZED_MODE_CONFIGS
+    from shared_state import load_state, edit_state, Mode, Model, PROJECT_ROOT, CCTodo, load_config, SessionsProtocol, is_directory_task, is_subtask, is_parent_task, SpecializedMode, SPECIALIZED_MODE_CONFIGS, log_event, session_model, time_hook, transcript_index, register_transcript
+    from path_scope import SCOPE_KEY
+    from transcript_reader import context_tokens
 except ImportError:
     # Fallback to package import
-    from cc_sessions.hooks.shared_state import load_state, edit_state, Mode, PROJECT_ROOT, CCTodo, load_config, SessionsProtocol, is_directory_task, is_subtask, is_parent_task, SpecializedMode, SPECIALIZED_MODE_CONFIGS
+    from cc_sessions.hooks.shared_state import load_state, edit_state, Mode, Model, PROJECT_ROOT, CCTodo, load_config, SessionsProtocol, is_directory_task, is_subtask, is_parent_task, SpecializedMode, SPECIALIZED_MODE_CONFIGS, log_event, session_model, time_hook, transcript_index, register_transcript
+    from cc_sessions.hooks.path_scope import SCOPE_KEY
+    from cc_sessions.hooks.transcript_reader import context_tokens
 ##-##
 
 #-#
@@ -47,6 +51,8 @@ if is_ci_environment():
 ##-##
 
 input_data = json.load(sys.stdin)
+time_hook(input_data.get("session_id"))
+register_transcript(input_data.get("session_id"), input_data.get("transcript_path"))
 prompt = input_data.get("prompt", "")
 transcript_path = input_data.get("transcript_path", "")
 
@@ -124,38 +130,9 @@ def format_todos_for_protocol(todos):
     return "\n".join(lines)
 
 def get_context_length_from_transcript(transcript_path):
-    """Get current context length from the most recent main-chain message in transcript"""
-    try:
-        with open(transcript_path, 'r', encoding='utf-8', errors='backslashreplace') as f: lines = f.readlines()
-
-        most_recent_usage = None
-        most_recent_timestamp = None
-        # Parse each JSONL entry
-        for line in lines:
-            try:
-                data = json.loads(line.strip())
-                # Skip sidechain entries (subagent calls)
-                if data.get('isSidechain', False): continue
-
-                # Check if this entry has usage data
-                if data.get('message', {}).get('usage'):
-                    entry_time = data.get('timestamp')
-                    # Track the most recent main-chain entry with usage
-                    if entry_time and (not most_recent_timestamp or entry_time > most_recent_timestamp):
-                        most_recent_timestamp = entry_time
-                        most_recent_usage = data['message']['usage']
-            except json.JSONDecodeError: continue
-
-        # Calculate context length from most recent usage
-        if most_recent_usage:
-            context_length = (
-                most_recent_usage.get('input_tokens', 0) +
-                most_recent_usage.get('cache_read_input_tokens', 0) +
-                most_recent_usage.get('cache_creation_input_tokens', 0)
-            )
-            return context_length
-    except Exception: pass
-    return 0
+    """Get current context length from the most recent main-chain message in transcript (shared incremental index)"""
+    try: return context_tokens(transcript_index(transcript_path).usage)
+    except Exception: return 0
 #-#
 
 # ===== EXECUTION ===== #
@@ -169,9 +146,11 @@ if transcript_path and os.path.exists(transcript_path):
         # Calculate percentage of usable context before auto-compact
         # Haiku 4.5: 200k, Sonnet 4.5: 200k (800k with extended context), Opus: 200k
         usable_tokens = 200000  # Default for Haiku/Opus
-        if STATE.model == "sonnet":
+        # Model this session's statusline recorded (state.model is only a fallback for older installs)
+        model = session_model(input_data.get("session_id"), STATE.model)
+        if model == Model.SONNET:
             usable_tokens = 800000  # Sonnet with extended context
-        elif STATE.model == "haiku":
+        elif model == Model.HAIKU:
             usable_tokens = 200000  # Haiku 4.5
         usable_percentage = (context_length / usable_tokens) * 100
 
@@ -191,9 +170,11 @@ if not is_api_command and specialized_mode_exit_detected:
     previous_mode = STATE.specialized_mode
     with edit_state() as s:
         s.specialized_mode = SpecializedMode.NONE
-        # Clear mode arguments from metadata
+        # Clear mode arguments and path scope from metadata
         if 'specialized_mode_args' in s.metadata:
             s.metadata['specialized_mode_args'].pop(previous_mode.value, None)
+        if SCOPE_KEY in s.metadata:
+            s.metadata[SCOPE_KEY].pop(previous_mode.value, None)
         STATE = s
     context += f"[Specialized Mode: Exited {previous_mode.value}]\nYou have exited {previous_mode.value} mode and returned to normal operation. All tool restrictions from that mode have been lifted.\n"
 #!<
@@ -215,14 +196,9 @@ CRITICAL RULES:
 
 # Emergency stop (works in any mode)
 if STATE.mode is Mode.GO and discussion_phrase_detected:  # Case sensitive
-    # DEBUG: Log what triggered this
-    import datetime
-    debug_log_path = PROJECT_ROOT / "sessions" / "mode-revert-debug.log"
-    with open(debug_log_path, "a", encoding='utf-8', errors='backslashreplace') as log:
-        log.write(f"\n[{datetime.datetime.now().isoformat()}] EMERGENCY STOP TRIGGERED\n")
-        log.write(f"  Prompt: {prompt[:200]}...\n")
-        log.write(f"  discussion_phrase_detected: {discussion_phrase_detected}\n")
-        log.write(f"  Trigger phrases: {CONFIG.trigger_phrases.discussion_mode}\n")
+    # Record what triggered this (the mode change itself is logged by edit_state)
+    matched = [phrase for phrase in CONFIG.trigger_phrases.discussion_mode if phrase_matches(phrase, prompt)]
+    log_event("emergency_stop", trigger_phrases=matched, prompt=prompt[:200])
 
     with edit_state() as s: s.mode = Mode.NO; s.todos.clear_active(); STATE = s
     context += "[DAIC: EMERGENCY STOP] All tools locked. You are now in discussion mode. Re-align with your pair programmer.\n"
@@ -3,7 +3,6 @@
 ## ===== STDLIB ===== ##
 import json, sys, subprocess, os
 from pathlib import Path
-from datetime import datetime, timezone
 ##-##
 
 ## ===== WINDOWS UTF-8 STDOUT FIX ===== ##
@@ -23,89 +22,24 @@ if 'CLAUDE_PROJECT_DIR' in os.environ:
     PROJECT_ROOT = Path(os.environ['CLAUDE_PROJECT_DIR']).resolve()
     sys.path.insert(0, str(PROJECT_ROOT))
     # Use local symlinked sessions package when in development mode
-    from sessions.hooks.shared_state import edit_state, Model, Mode, find_git_repo, load_state, IconStyle
+    from sessions.hooks.shared_state import Model, Mode, find_git_repo, load_state, load_config, IconStyle, STATE_FILE, CONFIG_FILE, STATUSLINE_CACHE_FILE, record_session_model, session_model_file, hook_latency_file, transcript_index, resolve_transcript
+    from sessions.hooks.transcript_reader import context_tokens
+    from sessions.hooks.git_meta import git_status, resolve_git_dir, read_head_branch
+    from sessions.hooks.cache_analytics import CacheStats, scan_cache_usage
+    from sessions.hooks.hook_timing import latency_summary, ENFORCEMENT_HOOKS
+    from sessions.hooks.statusline_cache import RenderCache, Segment, stat_key, once, custom_segment, layout_segments, DEFAULT_LAYOUT
 else:
     # Use installed cc-sessions package in production
-    from cc_sessions.hooks.shared_state import edit_state, Model, Mode, find_git_repo, load_state, IconStyle
+    from cc_sessions.hooks.shared_state import Model, Mode, find_git_repo, load_state, load_config, IconStyle, STATE_FILE, CONFIG_FILE, STATUSLINE_CACHE_FILE, record_session_model, session_model_file, hook_latency_file, transcript_index, resolve_transcript
+    from cc_sessions.hooks.transcript_reader import context_tokens
+    from cc_sessions.hooks.git_meta import git_status, resolve_git_dir, read_head_branch
+    from cc_sessions.hooks.cache_analytics import CacheStats, scan_cache_usage
+    from cc_sessions.hooks.hook_timing import latency_summary, ENFORCEMENT_HOOKS
+    from cc_sessions.hooks.statusline_cache import RenderCache, Segment, stat_key, once, custom_segment, layout_segments, DEFAULT_LAYOUT
 ##-##
 
 #-#
 
-# ===== FUNCTIONS ===== #
-
-def find_current_transcript(transcript_path, session_id, stale_threshold=30):
-    """
-    Detect stale transcripts and find the current one by session ID.
-
-    Args:
-        transcript_path: Path to the transcript file we received
-        session_id: Current session ID to match
-        stale_threshold: Seconds threshold for considering transcript stale
-
-    Returns:
-        Path to the current transcript (may be same as input if not stale)
-    """
-    if not transcript_path or not os.path.exists(transcript_path):
-        return transcript_path
-
-    try:
-        # Read last line of transcript to get last message timestamp
-        with open(transcript_path, 'r', encoding='utf-8', errors='backslashreplace') as f:
-            lines = f.readlines()
-            if not lines: return transcript_path
-
-            last_line = lines[-1].strip()
-            if not last_line: return transcript_path
-
-            last_msg = json.loads(last_line)
-            last_timestamp = last_msg.get('timestamp')
-
-            if not last_timestamp: return transcript_path
-
-            # Parse ISO timestamp and compare to current time
-            last_time = datetime.fromisoformat(last_timestamp.replace('Z', '+00:00'))
-            current_time = datetime.now(timezone.utc)
-            age_seconds = (current_time - last_time).total_seconds()
-
-            # If transcript is fresh, return it
-            if age_seconds <= stale_threshold: return transcript_path
-
-            # Transcript is stale - search for current one
-            transcript_dir = Path(transcript_path).parent
-            all_transcripts = sorted(
-                transcript_dir.glob('*.jsonl'),
-                key=lambda p: p.stat().st_mtime,
-                reverse=True
-            )[:5]  # Top 5 most recent
-
-            # Check each transcript for matching session ID
-            for candidate in all_transcripts:
-                try:
-                    with open(candidate, 'r', encoding='utf-8', errors='backslashreplace') as cf:
-                        candidate_lines = cf.readlines()
-                        if not candidate_lines: continue
-
-                        # Check last line for session ID
-                        candidate_last = json.loads(candidate_lines[-1].strip())
-                        candidate_session_id = candidate_last.get('sessionId')
-
-                        if candidate_session_id == session_id:
-                            # Verify this transcript is fresh
-                            candidate_timestamp = candidate_last.get('timestamp')
-                            if candidate_timestamp:
-                                candidate_time = datetime.fromisoformat(candidate_timestamp.replace('Z', '+00:00'))
-                                candidate_age = (current_time - candidate_time).total_seconds()
-
-                                if candidate_age <= stale_threshold: return str(candidate)
-                except: continue
-
-            # No fresh transcript found, return original
-            return transcript_path
-
-    except: return transcript_path # Any error, return original path
-
-#-#
-
 # ===== GLOBALS ===== #
 
 #!> Parse input + set constants
@@ -201,18 +135,42 @@ else:
     curr_model = Model.UNKNOWN
 #!<
 
-#!> Update model in shared state
-STATE = load_state()
-if not STATE or STATE.model != curr_model:
-    with edit_state() as s: s.model = curr_model; STATE = s
+#!> Render cache
+# Every segment below is cached with the inputs it was rendered from; a config, cwd or model change drops them all
+RENDER_CACHE = RenderCache(STATUSLINE_CACHE_FILE, session_id, [cwd, model_name, stat_key(CONFIG_FILE)])
+
+def load_settings():
+    config = load_config()
+    if not config: return {"icon_style": IconStyle.NERD_FONTS.value, "ttl": None, "deadline_ms": 0, "layout": DEFAULT_LAYOUT, "custom": {}, "latency_warn_ms": 250}
+    return {"icon_style": IconStyle(config.features.icon_style).value, "ttl": config.statusline.cache_ttl, "deadline_ms": config.statusline.render_deadline_ms,
+            "layout": config.statusline.layout, "custom": config.statusline.custom_segments, "latency_warn_ms": config.statusline.latency_warn_ms}
+
+# Config file stat is part of the cache key, so settings never expire on their own
+SETTINGS = RENDER_CACHE.get("settings", lambda: None, load_settings, expires=False)
+icon_style = IconStyle(SETTINGS["icon_style"])
+RENDER_CACHE.ttl = SETTINGS["ttl"]
+RENDER_DEADLINE = SETTINGS["deadline_ms"] / 1000 if SETTINGS["deadline_ms"] else None
+#!<
 
-# Load config for icon style preference
-if 'CLAUDE_PROJECT_DIR' in os.environ:
-    from sessions.hooks.shared_state import load_config
-else:
-    from cc_sessions.hooks.shared_state import load_config
-CONFIG = load_config()
-icon_style = CONFIG.features.icon_style if CONFIG else IconStyle.NERD_FONTS
+#!> Record model for this session
+# Sidecar instead of state: a render never takes the state lock. Rewritten when the model
+# (part of the cache key) changes or the sidecar is removed.
+def record_model():
+    record_session_model(session_id, curr_model)
+    return curr_model.value
+RENDER_CACHE.get("model", lambda: [stat_key(session_model_file(session_id))], record_model, expires=False)
+#!<
+
+#!> Segment registry
+# name -> Segment; the layout in sessions-config.json (statusline.layout) picks and orders them
+SEGMENTS = {}
+
+def segment(name, key, expires=True, fallback=None):
+    """Register a render function as a statusline segment. `key` returns the inputs it depends on."""
+    def register(render):
+        SEGMENTS[name] = Segment(name, key, render, expires=expires, fallback=fallback)
+        return render
+    return register
 #!<
 
 #-#
@@ -227,97 +185,88 @@ icon_style = CONFIG.features.icon_style if CONFIG else IconStyle.NERD_FONTS
 ║ ╚═════╝  ╚═╝  ╚═╝  ╚═╝  ╚═╝   ╚═══╝ ╚═════╝╚══════╝╚═════╝╚═╝ ╚══╝╚═════╝ ║
 ╚═══════════════════════════════════════════════════════════════════════════╝
 Sessions default status line script
-Shows:
-- Context usage progress bar (with Ayu Dark colors)
-- Current task name
-- Current mode (Discussion or Implementation)
-- Count of edited & uncommitted files in the current git repo
-- Count of open tasks in sessions/tasks (files + dirs)
+Segments (arranged by statusline.layout; custom command segments from statusline.custom_segments):
+- context: Context usage progress bar (with Ayu Dark colors)
+- task: Current task name
+- mode: Current mode (Discussion or Implementation)
+- edited: Count of edited & uncommitted files in the current git repo (+ upstream ahead/behind)
+- open_tasks: Count of open tasks in sessions/tasks (files + dirs)
+- branch: Current git branch
+- cache: Prompt-cache hit ratio, cache-write cost per turn, invalidated turns (not in the default layout)
+Only segments in the layout are computed. Each is re-rendered only when its inputs change
+(or after statusline.cache_ttl seconds); those that need it are rendered concurrently, and one
+that misses statusline.render_deadline_ms is shown from its last cached value, marked stale (~).
 """
 
 # ===== EXECUTION ===== #
 
 ## ===== PROGRESS BAR ===== ##
-
-#!> Pull context length from transcript
-context_length = None
 transcript_path = data.get('transcript_path', None)
 
-# Detect and recover from stale transcript
-if transcript_path:
-    transcript_path = find_current_transcript(transcript_path, session_id)
-
-if transcript_path:
-    try:
-        with open(transcript_path, 'r', encoding='utf-8', errors='backslashreplace') as f: lines = f.readlines()
-        most_recent_usage = None
-        most_recent_timestamp = None
-
-        for line in lines:
-            try:
-                data = json.loads(line.strip())
-                # Skip sidechain entries (subagent calls)
-                if data.get('isSidechain', False): continue
-
-                # Check for usage data in main-chain messages
-                if data.get('message', {}).get('usage'):
-                    timestamp = data.get('timestamp')
-                    if timestamp and (not most_recent_timestamp or timestamp > most_recent_timestamp):
-                        most_recent_timestamp = timestamp
-                        most_recent_usage = data['message']['usage']
-            except: continue
-
-        # Calculate context length (input + cache tokens only, NOT output)
-        if most_recent_usage:
-            context_length = (most_recent_usage.get('input_tokens', 0) + most_recent_usage.get('cache_read_input_tokens', 0) + most_recent_usage.get('cache_creation_input_tokens', 0))
-    except Exception as e:
-        pass
-#!<
-
-#!> Use context_length and context_limit to calculate context percentage
-if context_length and context_length < 17000: context_length = 17000
-if context_length and context_limit:
-    pct = (context_length * 100) / context_limit
-    progress_pct = f"{pct:.1f}"
-    progress_pct_int = int(pct)
-    if progress_pct_int > 100: progress_pct = "100.0"; progress_pct_int = 100
-else:
-    progress_pct = "0.0"
-    progress_pct_int = 0
-#!<
-
-#!> Formatting and styling
-# Format token counts in 'k'
-formatted_tokens = f"{context_length // 1000}k" if context_length else "17k"
-formatted_limit = f"{context_limit // 1000}k" if context_limit else "160k"
-
-# Progress bar blocks (0-10)
-filled_blocks = min(progress_pct_int // 10, 10)
-empty_blocks = 10 - filled_blocks
-
-# Ayu Dark colors (referencing from memory)
-# TODO: Verify Ayu Dark code conversions
-if progress_pct_int < 50: bar_color =  green
-elif progress_pct_int < 80: bar_color = orange
-else: bar_color = red
-#!<
-
-#!> Construct progress bar string
-# Build progress bar string
-progress_bar = []
-if icon_style == IconStyle.NERD_FONTS:
-    context_icon = "󱃖 "
-elif icon_style == IconStyle.EMOJI:
-    context_icon = ""
-else:  # ASCII
-    context_icon = ""
-progress_bar.append(f"{reset}{l_gray}{context_icon} ")
-progress_bar.append(bar_color + ("█" * filled_blocks))
-progress_bar.append(gray + ("░" * empty_blocks))
-progress_bar.append(reset + f" {l_gray}{progress_pct}% ({formatted_tokens}/{formatted_limit}){reset}")
-
-progress_bar_str = "".join(progress_bar)
-#!<
+def context_key():
+    # Input transcript, plus the fresher one resolve_transcript() switched to (if any)
+    followed = (RENDER_CACHE.peek("context") or {}).get("transcript")
+    return [transcript_path, stat_key(transcript_path), stat_key(followed) if followed != transcript_path else None]
+
+@segment("context", context_key, fallback={"transcript": None, "text": f"{gray}No context usage data{reset}"})
+def render_context():
+    #!> Pull context length from transcript
+    context_length = None
+    current_transcript = transcript_path
+
+    # Detect and recover from stale transcript
+    if current_transcript:
+        current_transcript = resolve_transcript(current_transcript, session_id)
+
+    if current_transcript:
+        # Newest main-chain usage from the shared transcript index (only appended lines are scanned)
+        # Context length = input + cache tokens only, NOT output
+        context_length = context_tokens(transcript_index(current_transcript).usage) or None
+    #!<
+
+    #!> Use context_length and context_limit to calculate context percentage
+    if context_length and context_length < 17000: context_length = 17000
+    if context_length and context_limit:
+        pct = (context_length * 100) / context_limit
+        progress_pct = f"{pct:.1f}"
+        progress_pct_int = int(pct)
+        if progress_pct_int > 100: progress_pct = "100.0"; progress_pct_int = 100
+    else:
+        progress_pct = "0.0"
+        progress_pct_int = 0
+    #!<
+
+    #!> Formatting and styling
+    # Format token counts in 'k'
+    formatted_tokens = f"{context_length // 1000}k" if context_length else "17k"
+    formatted_limit = f"{context_limit // 1000}k" if context_limit else "160k"
+
+    # Progress bar blocks (0-10)
+    filled_blocks = min(progress_pct_int // 10, 10)
+    empty_blocks = 10 - filled_blocks
+
+    # Ayu Dark colors (referencing from memory)
+    # TODO: Verify Ayu Dark code conversions
+    if progress_pct_int < 50: bar_color =  green
+    elif progress_pct_int < 80: bar_color = orange
+    else: bar_color = red
+    #!<
+
+    #!> Construct progress bar string
+    # Build progress bar string
+    progress_bar = []
+    if icon_style == IconStyle.NERD_FONTS:
+        context_icon = "󱃖 "
+    elif icon_style == IconStyle.EMOJI:
+        context_icon = ""
+    else:  # ASCII
+        context_icon = ""
+    progress_bar.append(f"{reset}{l_gray}{context_icon} ")
+    progress_bar.append(bar_color + ("█" * filled_blocks))
+    progress_bar.append(gray + ("░" * empty_blocks))
+    progress_bar.append(reset + f" {l_gray}{progress_pct}% ({formatted_tokens}/{formatted_limit}){reset}")
+    #!<
+    return {"transcript": current_transcript, "text": "".join(progress_bar)}
 ##-##
 
 ## ===== GIT REPOSITORY ===== ##
@@ -325,140 +274,203 @@ progress_bar_str = "".join(progress_bar)
 git_path = find_git_repo(Path(cwd))
 ##-##
 
-## ===== GIT BRANCH & UPSTREAM TRACKING ===== ##
-git_branch_info = None
-upstream_info = None
-if git_path:
+## ===== GIT STATUS ===== ##
+def git_key():
+    # HEAD (branch switch), index (stage/commit) and the branch ref (commit); worktree-only edits wait for the TTL
+    if not git_path: return None
+    git_dir = resolve_git_dir(git_path)
+    if git_dir is None: return [str(git_path)]
+    branch = read_head_branch(git_path)
+    ref = stat_key(git_dir / "refs" / "heads" / branch) if branch else None
+    return [str(git_path), stat_key(git_dir / "HEAD"), stat_key(git_dir / "index"), ref]
+
+@once
+def git_info():
+    # One `git status --porcelain=v2 --branch` call shared by the edited and branch segments:
+    # branch, upstream ahead/behind, detached HEAD, changed files
+    if not git_path: return None
     try:
-        # Get current branch
         # Use absolute paths to avoid Windows path issues
-        cwd_abs = str(Path(cwd).resolve())
-        branch_cmd = ["git", "-C", cwd_abs, "branch", "--show-current"]
-        branch = subprocess.check_output(branch_cmd, stderr=subprocess.PIPE, encoding='utf-8', errors='replace').strip()
-
-        if branch:
-            if icon_style == IconStyle.NERD_FONTS:
-                branch_icon = "󰘬 "
-            elif icon_style == IconStyle.EMOJI:
-                branch_icon = "Branch: "
-            else:  # ASCII
-                branch_icon = "Branch: "
-            git_branch_info = f"{l_gray}{branch_icon}{branch}{reset}"
-
-            # Get upstream tracking status
-            try:
-                ahead_cmd = ["git", "-C", cwd_abs, "rev-list", "--count", "@{u}..HEAD"]
-                ahead = int(subprocess.check_output(ahead_cmd, stderr=subprocess.PIPE, encoding='utf-8', errors='replace').strip())
-
-                behind_cmd = ["git", "-C", cwd_abs, "rev-list", "--count", "HEAD..@{u}"]
-                behind = int(subprocess.check_output(behind_cmd, stderr=subprocess.PIPE, encoding='utf-8', errors='replace').strip())
-
-                upstream_parts = []
-                if ahead > 0:
-                    upstream_parts.append(f"↑ {ahead}")
-                if behind > 0:
-                    upstream_parts.append(f"↓ {behind}")
-                if upstream_parts:
-                    upstream_info = f"{orange}{''.join(upstream_parts)}{reset}"
-            except:
-                # No upstream or error getting upstream status
-                upstream_info = None
-        else:
-            # Detached HEAD - show commit hash with detached indicator
-            commit_cmd = ["git", "-C", cwd_abs, "rev-parse", "--short", "HEAD"]
-            commit = subprocess.check_output(commit_cmd, stderr=subprocess.PIPE, encoding='utf-8', errors='replace').strip()
-            if commit:
-                if icon_style == IconStyle.NERD_FONTS:
-                    # Broken link icon to indicate detached
-                    git_branch_info = f"{l_gray}󰌺 @{commit}{reset}"
-                else:  # EMOJI or ASCII
-                    git_branch_info = f"{l_gray}@{commit} [detached]{reset}"
-    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        return git_status(Path(cwd).resolve())
+    except (subprocess.SubprocessError, OSError, ValueError):
         # Git command failed - common on Windows if git not in PATH or repo issues
-        git_branch_info = None
+        return None
+
+@segment("branch", git_key)
+def render_branch():
+    GIT = git_info()
+    if GIT and GIT.branch:
+        if icon_style == IconStyle.NERD_FONTS:
+            branch_icon = "󰘬 "
+        elif icon_style == IconStyle.EMOJI:
+            branch_icon = "Branch: "
+        else:  # ASCII
+            branch_icon = "Branch: "
+        return f"{l_gray}{branch_icon}{GIT.branch}{reset}"
+    elif GIT and GIT.detached:
+        # Detached HEAD - show commit hash with detached indicator
+        commit = GIT.oid[:7]
+        if icon_style == IconStyle.NERD_FONTS:
+            # Broken link icon to indicate detached
+            return f"{l_gray}󰌺 @{commit}{reset}"
+        else:  # EMOJI or ASCII
+            return f"{l_gray}@{commit} [detached]{reset}"
+    return None
+
+@segment("edited", git_key, fallback=f"{orange}✎ ?{reset}")
+def render_edited():
+    GIT = git_info()
+    # Edited and uncommitted files (unstaged + staged, as `git diff --name-only` + `git diff --cached --name-only`)
+    total_edited = GIT.edited if GIT else 0
+    uncommitted_parts = [f"{orange}✎ {total_edited}{reset}"]
+
+    # Upstream tracking status (no upstream -> no indicators)
+    upstream_parts = []
+    if GIT and GIT.branch and GIT.ahead > 0:
+        upstream_parts.append(f"↑ {GIT.ahead}")
+    if GIT and GIT.branch and GIT.behind > 0:
+        upstream_parts.append(f"↓ {GIT.behind}")
+    if upstream_parts:
+        uncommitted_parts.append(f"{orange}{''.join(upstream_parts)}{reset}")
+    return " ".join(uncommitted_parts)
 ##-##
 
-## ===== CURRENT TASK ===== ##
-curr_task = STATE.current_task.name if STATE else None
+## ===== CURRENT TASK & MODE ===== ##
+# Keyed on the state file itself: any state write (task, mode) re-renders
+state_key = lambda: [stat_key(STATE_FILE)]
+load_shared_state = once(load_state)
+
+@segment("task", state_key, fallback=f"{cyan}…{reset}")
+def render_task():
+    STATE = load_shared_state()
+    curr_task = STATE.current_task.name if STATE else None
+    if icon_style == IconStyle.NERD_FONTS:
+        task_icon = "󰒓 "
+    elif icon_style == IconStyle.EMOJI:
+        task_icon = "⚙️ "
+    else:  # ASCII
+        task_icon = "Task: "
+    return f"{cyan}{task_icon}{curr_task}{reset}" if curr_task else f"{cyan}{task_icon}{gray}No Task{reset}"
+
+@segment("mode", state_key, fallback=f"{purple}…{reset}")
+def render_mode():
+    STATE = load_shared_state()
+    curr_mode = "Implement" if STATE.mode == Mode.GO else "Discuss"
+    if icon_style == IconStyle.NERD_FONTS:
+        mode_icon = "󰷫 " if STATE.mode == Mode.GO else "󰭹 "
+    elif icon_style == IconStyle.EMOJI:
+        mode_icon = "🛠️: " if STATE.mode == Mode.GO else "💬:"
+    else:  # ASCII
+        mode_icon = "Mode:"
+    return f"{purple}{mode_icon} {curr_mode}{reset}"
 ##-##
 
-## ===== CURRENT MODE ===== ##
-curr_mode = "Implement" if STATE.mode == Mode.GO else "Discuss"
-if icon_style == IconStyle.NERD_FONTS:
-    mode_icon = "󰷫 " if STATE.mode == Mode.GO else "󰭹 "
-elif icon_style == IconStyle.EMOJI:
-    mode_icon = "🛠️: " if STATE.mode == Mode.GO else "💬:"
-else:  # ASCII
-    mode_icon = "Mode:"
+## ===== COUNT OPEN TASKS ===== ##
+# Adding, removing or moving a task (to done/) changes the directory's mtime
+@segment("open_tasks", lambda: [stat_key(task_dir)], fallback=f"{cyan}… open{reset}")
+def render_open_tasks():
+    open_task_count = 0
+    open_task_dir_count = 0
+
+    if task_dir.exists() and task_dir.is_dir():
+        for file in task_dir.iterdir():
+            if file.is_file() and file.name != "TEMPLATE.md" and file.suffix == ".md": open_task_count += 1
+            if file.is_dir() and file.name not in ("done", "indexes"): open_task_dir_count += 1
+
+    if icon_style == IconStyle.NERD_FONTS:
+        tasks_icon = "󰈙 "
+    elif icon_style == IconStyle.EMOJI:
+        tasks_icon = "💼 "
+    else:  # ASCII
+        tasks_icon = ""
+    return f"{cyan}{tasks_icon} {open_task_count + open_task_dir_count} open{reset}"
 ##-##
 
-## ===== COUNT EDITED & UNCOMMITTED ===== ##
-# Use subprocess to count edited and uncommitted files (unstaged or staged)
-total_edited = 0
-if git_path:
-    try:
-        # Use absolute paths for Windows compatibility
-        cwd_abs = str(Path(cwd).resolve())
-
-        # Count unstaged changes
-        unstaged_cmd = ["git", "-C", cwd_abs, "diff", "--name-only"]
-        unstaged_files = subprocess.check_output(unstaged_cmd, stderr=subprocess.PIPE, encoding='utf-8', errors='replace').strip().split('\n')
-        unstaged_count = len([f for f in unstaged_files if f])  # Filter out empty strings
-
-        # Count staged changes
-        staged_cmd = ["git", "-C", cwd_abs, "diff", "--cached", "--name-only"]
-        staged_files = subprocess.check_output(staged_cmd, stderr=subprocess.PIPE, encoding='utf-8', errors='replace').strip().split('\n')
-        staged_count = len([f for f in staged_files if f])  # Filter out empty strings
-
-        total_edited = unstaged_count + staged_count
-    except (subprocess.CalledProcessError, OSError, ValueError):
-        # Git command failed - set to 0 and continue
-        total_edited = 0
+## ===== PROMPT CACHE ===== ##
+# Picks up from the previous render's totals and byte offset: only appended lines are parsed
+@segment("cache", lambda: [transcript_path, stat_key(transcript_path)])
+def render_cache():
+    if not transcript_path: return None
+    previous = RENDER_CACHE.peek("cache") or {}
+    stats = scan_cache_usage(transcript_path, CacheStats.from_dict(previous.get("stats")))
+    stored = stats.to_dict(); stored["invalidations"] = []  # Counted in invalidation_count; details via `sessions perf cache`
+    if not stats.turns: return {"text": None, "stats": stored}
+
+    pct = stats.hit_ratio * 100
+    if pct >= 80: ratio_color = green
+    elif pct >= 50: ratio_color = orange
+    else: ratio_color = red
+    if icon_style == IconStyle.NERD_FONTS:
+        cache_icon = "󰆼 "
+    elif icon_style == IconStyle.EMOJI:
+        cache_icon = "♻️ "
+    else:  # ASCII
+        cache_icon = "Cache: "
+    parts = [f"{ratio_color}{cache_icon}{pct:.0f}% hit{reset}", f"{gray}${stats.creation_cost_usd / stats.turns:.3f}/turn writes{reset}"]
+    if stats.invalidation_count: parts.append(f"{orange}⟲ {stats.invalidation_count}{reset}")
+    return {"text": " ".join(parts), "stats": stored}
 ##-##
 
-## ===== COUNT OPEN TASKS ===== ##
-open_task_count = 0
-open_task_dir_count = 0
+## ===== HOOK LATENCY ===== ##
+# Hooks append their own timings to a small per-session rolling window; only that file is read
+HOOK_LABELS = {"sessions_enforce": "enforce", "post_tool_use": "post-tool"}
+
+@segment("latency", lambda: [stat_key(hook_latency_file(session_id))], expires=False)
+def render_latency():
+    summary = latency_summary(hook_latency_file(session_id))
+    if not summary: return None
+    warn_ms = SETTINGS.get("latency_warn_ms") or 0
+    slow = [(hook, summary[hook]["p95_ms"]) for hook in ENFORCEMENT_HOOKS if hook in summary and warn_ms and summary[hook]["p95_ms"] > warn_ms]
+    worst = max((p95 for _, p95 in slow), default=0)
+    if worst > 2 * warn_ms: latency_color = red
+    elif slow: latency_color = orange
+    else: latency_color = gray
+    if icon_style == IconStyle.NERD_FONTS:
+        latency_icon = "󱎫 "
+    elif icon_style == IconStyle.EMOJI:
+        latency_icon = "⏱️ "
+    else:  # ASCII
+        latency_icon = "Hooks: "
+    text = f"{latency_color}{latency_icon}{summary['all']['p50_ms']:.0f}/{summary['all']['p95_ms']:.0f}ms{reset}"
+    for hook, p95 in slow: text += f" {latency_color}{HOOK_LABELS.get(hook, hook)} p95 {p95:.0f}ms{reset}"
+    return text
+##-##
+
+## ===== CUSTOM SEGMENTS ===== ##
+# statusline.custom_segments: command segments (test status, build time, ...), cached on their input files
+for name, spec in (SETTINGS["custom"] or {}).items():
+    if name not in SEGMENTS and isinstance(spec, dict): SEGMENTS[name] = custom_segment(name, spec, cwd)
+##-##
 
-if task_dir.exists() and task_dir.is_dir():
-    for file in task_dir.iterdir():
-        if file.is_file() and file.name != "TEMPLATE.md" and file.suffix == ".md": open_task_count += 1
-        if file.is_dir() and file.name not in ("done", "indexes"): open_task_dir_count += 1
+## ===== RENDER ===== ##
+# Only segments the layout uses are computed
+LAYOUT = SETTINGS["layout"] or DEFAULT_LAYOUT
+VALUES, LATE = RENDER_CACHE.render([SEGMENTS[name] for name in layout_segments(LAYOUT) if name in SEGMENTS], RENDER_DEADLINE)
+
+def segment_text(name):
+    """Display text of a rendered segment; a segment that missed the render deadline is marked stale."""
+    value = VALUES.get(name)
+    text = value.get("text") if isinstance(value, dict) else value
+    if not text: return None
+    return f"{text}{gray}~{reset}" if name in LATE else text
 ##-##
 
 ## ===== FINAL OUTPUT ===== ##
-# Line 1 - Progress bar | Task
-context_part = progress_bar_str if progress_bar_str else f"{gray}No context usage data{reset}"
-if icon_style == IconStyle.NERD_FONTS:
-    task_icon = "󰒓 "
-elif icon_style == IconStyle.EMOJI:
-    task_icon = "⚙️ "
-else:  # ASCII
-    task_icon = "Task: "
-task_part = f"{cyan}{task_icon}{curr_task}{reset}" if curr_task else f"{cyan}{task_icon}{gray}No Task{reset}"
-print(f"{context_part} | {task_part}")
-
-# Line 2 - Mode | Edited & Uncommitted with upstream | Open Tasks | Git branch
-if icon_style == IconStyle.NERD_FONTS:
-    tasks_icon = "󰈙 "
-elif icon_style == IconStyle.EMOJI:
-    tasks_icon = "💼 "
-else:  # ASCII
-    tasks_icon = ""
-# Build uncommitted section with optional upstream indicators
-uncommitted_parts = [f"{orange}✎ {total_edited}{reset}"]
-if upstream_info:
-    uncommitted_parts.append(upstream_info)
-uncommitted_str = " ".join(uncommitted_parts)
-
-line2_parts = [
-    f"{purple}{mode_icon} {curr_mode}{reset}",
-    uncommitted_str,
-    f"{cyan}{tasks_icon} {open_task_count + open_task_dir_count} open{reset}"
-]
-if git_branch_info:
-    line2_parts.append(git_branch_info)
-print(" | ".join(line2_parts))
+# Default layout: Progress bar | Task, then Mode | Edited & Uncommitted with upstream | Open Tasks | Git branch
+for line in LAYOUT:
+    parts = [text for text in (segment_text(name) for name in line) if text]
+    if parts: print(" | ".join(parts))
+##-##
+
+## ===== CACHE WRITE-BACK ===== ##
+if LATE:
+    # Hand the line over now: point stdout at devnull so Claude Code sees EOF, then let
+    # late segments finish so the next render finds them cached
+    sys.stdout.flush()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
+RENDER_CACHE.save()
 ##-##
 
 #-#